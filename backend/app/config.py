@@ -8,6 +8,28 @@ class Settings(BaseSettings):
 
     # Database
     database_url: str = "sqlite:///./customer_data.db"
+    # Async driver URL for the API; derived from database_url when empty
+    async_database_url: str = ""
+    # Connection pool for the async engine
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    # SQLite storage profile: "performance" (WAL, tuned pragmas) or "default" (SQLite's own settings)
+    sqlite_profile: str = "performance"
+    sqlite_cache_size_mb: int = 64
+    sqlite_mmap_size_mb: int = 256
+    # How long a connection waits for a lock before failing with "database is locked"
+    sqlite_busy_timeout_ms: int = 5000
+    # WAL checkpoint + PRAGMA optimize interval for the API process
+    sqlite_checkpoint_interval_seconds: float = 300.0
+    # Comma separated read replica URLs; the API's GET handlers read from them
+    read_replica_urls: str = ""
+    # After a successful write, that client's reads go to the primary for this long
+    read_your_writes_seconds: float = 5.0
+    # Replicas are probed this often; a failed replica is retried after the same interval
+    replica_health_check_interval_seconds: float = 10.0
+    # Postgres replicas lagging further behind are taken out of rotation
+    replica_max_lag_seconds: float = 30.0
 
     # API Keys
     anthropic_api_key: str = ""
@@ -21,6 +43,90 @@ class Settings(BaseSettings):
 
     # Security
     secret_key: str = "change_this_in_production"
+    # Security event log (JSON lines, written by a background thread)
+    security_log_file: str = "security.log"
+    security_log_queue_size: int = 10000
+    security_log_batch_size: int = 100
+    # Buffered events are written at most this many seconds after the oldest arrived
+    security_log_flush_interval: float = 1.0
+    # Repeated suspicious inputs per user and pattern are collapsed within this window
+    security_log_dedup_window_seconds: float = 60.0
+
+    # Stats snapshot
+    # Max age before the summary snapshot is recomputed from the table
+    stats_snapshot_ttl_seconds: int = 300
+
+    # Columnar analytics snapshot (NumPy arrays of the customers table)
+    columnar_snapshot_enabled: bool = True
+    # Reads refresh it incrementally (rows past the updated_at watermark) once it's this old
+    columnar_max_staleness_seconds: float = 5.0
+    # Re-read rows this far behind the watermark (same-second / late-committing writes)
+    columnar_watermark_overlap_seconds: float = 2.0
+    # Check count/sum(id) against the table (deletes from other workers) this often
+    columnar_reconcile_interval_seconds: float = 60.0
+    columnar_batch_size: int = 50000
+
+    # Company name typeahead index
+    # Names written by other workers are picked up (updated_at watermark) once the index is this old
+    search_index_max_staleness_seconds: float = 5.0
+    search_index_watermark_overlap_seconds: float = 2.0
+    # Full rebuild interval, which drops names no customer uses any more
+    search_index_rebuild_interval_seconds: float = 600.0
+
+    # Churn detection job
+    # Active customers without activity for this many days are marked churned
+    churn_job_enabled: bool = True
+    churn_inactivity_days: int = 90
+    churn_job_interval_seconds: float = 3600.0
+    # Customer id range per UPDATE transaction, and a pause between chunks for other writers
+    churn_job_chunk_size: int = 5000
+    churn_job_chunk_pause_seconds: float = 0.05
+
+    # Response cache for the read endpoints
+    # Writes invalidate immediately; the TTL bounds staleness from other workers
+    response_cache_ttl_seconds: float = 30.0
+    response_cache_max_entries: int = 1024
+
+    # Change feed (SSE / WebSocket push of customer writes)
+    # Events a slow subscriber may have queued before it is disconnected (it resumes from the replay buffer)
+    change_feed_queue_size: int = 256
+    # Recent events kept for clients reconnecting with Last-Event-ID
+    change_feed_replay_size: int = 1024
+    change_feed_max_subscribers: int = 1000
+    # Keep-alive comment / ping interval on idle connections
+    change_feed_heartbeat_seconds: float = 15.0
+
+    # Bulk ingest
+    # Rows per executemany/transaction for POST /api/customers/bulk
+    bulk_ingest_batch_size: int = 1000
+    # Lines one CSV record may span (quoted fields with newlines); a longer record is
+    # reported as unterminated and parsing resumes at the next line
+    bulk_ingest_max_record_lines: int = 100
+
+    # Export
+    # Rows fetched per server-side cursor round trip for GET /api/customers/export
+    export_batch_size: int = 5000
+
+    # Monitoring
+    # Request/query metrics at /metrics (Prometheus text format)
+    metrics_enabled: bool = True
+    # /health reports the database as unavailable if SELECT 1 takes longer
+    health_db_timeout_seconds: float = 2.0
+    # /health reports "degraded" above this share of pool connections checked out
+    health_pool_saturation_threshold: float = 0.9
+
+    # Query profiler (development): X-DB-* headers, N+1 warnings, slow-query EXPLAIN
+    query_profiler_enabled: bool = False
+    # SELECTs at least this slow have their plan captured for /api/debug/queries
+    query_profiler_slow_ms: float = 100.0
+    # The same statement shape this many times in one request is reported as N+1
+    query_profiler_n_plus_one_threshold: int = 5
+    # Slow queries / N+1 reports kept for the debug endpoint
+    query_profiler_ring_size: int = 100
+
+    @property
+    def replica_urls(self) -> list[str]:
+        return [url.strip() for url in self.read_replica_urls.split(",") if url.strip()]
 
     class Config:
         env_file = ".env"
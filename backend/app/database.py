@@ -1,30 +1,352 @@
 # Database connection and session management
 
-from sqlalchemy import create_engine
+import asyncio
+import itertools
+import logging
+import time
+from fastapi import Request
+from fastapi.routing import APIRoute
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from typing import AsyncGenerator, Generator, Optional
 from app.config import settings
 from app.models.customer import Base
+from app.models import rollup  # noqa: F401 - registers the rollup table on Base
+from app.utils.metrics import instrument_engine, pool_state, timed_pool
+from app.utils.query_profiler import profile_engine
+from app.utils.sqlite_profile import apply_sqlite_profile, is_sqlite_file, sqlite_pool_options
 
-# Create database enging
+logger = logging.getLogger(__name__)
+
+# Async drivers used by the API for each sync backend
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+def async_url_for(database_url: str) -> str:
+    # Swap the sync driver in a database URL for its async counterpart
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database backend: {backend}")
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+def pool_options(database_url: str, name: str = "api") -> dict:
+    # Pool sizing from settings; in-memory SQLite uses a single static connection
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+    options = {
+        # Queue pool that records checkout wait time for /metrics
+        "poolclass": timed_pool(AsyncAdaptedQueuePool, name),
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_pre_ping": True,
+    }
+    if is_sqlite_file(database_url):
+        options.update(sqlite_pool_options())
+    return options
+
+def connect_options(database_url: str) -> dict:
+    if make_url(database_url).get_backend_name() == "sqlite":
+        return {"check_same_thread": False}
+    return {}
+
+# Create database enging (sync - used by scripts such as seed_data.py)
 engine = create_engine(
     settings.database_url,
     echo = settings.debug,
-    connect_args = {"check_same_thread": False}
+    connect_args = connect_options(settings.database_url)
 )
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit = False, autoflush = False, bind = engine)
 
+# Async engine used by the API so queries don't block the event loop
+ASYNC_DATABASE_URL = settings.async_database_url or async_url_for(settings.database_url)
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo = settings.debug,
+    connect_args = connect_options(ASYNC_DATABASE_URL),
+    **pool_options(ASYNC_DATABASE_URL)
+)
+
+# Read replicas for the API's GET handlers (see RoutingSession)
+replica_engines = [
+    create_async_engine(
+        async_url_for(url),
+        echo = settings.debug,
+        connect_args = connect_options(async_url_for(url)),
+        **pool_options(async_url_for(url), f"replica{i}")
+    )
+    for i, url in enumerate(settings.replica_urls)
+]
+
+for e in (engine, async_engine, *replica_engines):
+    apply_sqlite_profile(e.sync_engine if isinstance(e, AsyncEngine) else e)
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "api")
+profile_engine(engine)
+profile_engine(async_engine.sync_engine)
+for i, replica in enumerate(replica_engines):
+    instrument_engine(replica.sync_engine, f"replica{i}")
+    profile_engine(replica.sync_engine)
+
+
+class ReplicaSet:
+    """
+    Read replica engines with health tracking
+
+    - choose(): next healthy replica (round robin), or None to read from the primary
+    - a replica leaves the rotation when a health check or a connection fails
+      and rejoins once it passes a check (or is retried after the check interval)
+    - check() runs SELECT 1 and, on Postgres, compares replay lag with replica_max_lag_seconds
+    """
+
+    def __init__(self, engines: list[AsyncEngine]):
+        self.engines = engines
+        self._down_until: dict[AsyncEngine, float] = {}
+        self._errors: dict[AsyncEngine, str] = {}
+        self._next = itertools.count()
+        for replica in engines:
+            self._watch_errors(replica)
+
+    def _watch_errors(self, replica: AsyncEngine):
+        @event.listens_for(replica.sync_engine, "handle_error")
+        def _error(context):
+            # Connection-level failures take the replica out until it passes a check
+            if context.is_disconnect or isinstance(context.sqlalchemy_exception, (OperationalError, InterfaceError)):
+                self.mark_down(replica, "connection failed", repr(context.original_exception))
+
+    def healthy(self) -> list[AsyncEngine]:
+        now = time.monotonic()
+        return [e for e in self.engines if self._down_until.get(e, 0) <= now]
+
+    def choose(self) -> Optional[AsyncEngine]:
+        healthy = self.healthy()
+        return healthy[next(self._next) % len(healthy)] if healthy else None
+
+    def mark_down(self, replica: AsyncEngine, reason: str, detail: Optional[str] = None):
+        # reason is reported by state() (and /health); detail, e.g. a driver message, is only logged
+        if replica not in self._down_until:
+            logger.warning("Read replica %s unavailable, reading from the primary: %s", replica.url.render_as_string(), detail or reason)
+        self._down_until[replica] = time.monotonic() + settings.replica_health_check_interval_seconds
+        self._errors[replica] = reason
+
+    def mark_up(self, replica: AsyncEngine):
+        if self._down_until.pop(replica, None) is not None:
+            logger.info("Read replica %s is back in rotation", replica.url.render_as_string())
+        self._errors.pop(replica, None)
+
+    async def _probe(self, replica: AsyncEngine) -> Optional[tuple[str, Optional[str]]]:
+        # None when the replica is usable, otherwise (reason, detail) as for mark_down
+        try:
+            async with replica.connect() as conn:
+                await asyncio.wait_for(conn.execute(text("SELECT 1")), settings.health_db_timeout_seconds)
+                if replica.dialect.name == "postgresql":
+                    lag = await conn.scalar(text(
+                        "SELECT EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())"
+                    ))
+                    if lag is not None and lag > settings.replica_max_lag_seconds:
+                        return f"replication lag {lag:.1f}s", None
+        except asyncio.TimeoutError:
+            return "timeout", None
+        except Exception as e:
+            return "connection failed", repr(e)
+        return None
+
+    async def check(self):
+        for replica in self.engines:
+            problem = await self._probe(replica)
+            if problem is None:
+                self.mark_up(replica)
+            else:
+                self.mark_down(replica, *problem)
+
+    async def run_health_checks(self):
+        # Background task started by the API's lifespan
+        while True:
+            await self.check()
+            await asyncio.sleep(settings.replica_health_check_interval_seconds)
+
+    def state(self) -> list[dict]:
+        healthy = self.healthy()
+        return [
+            {
+                "url": replica.url.render_as_string(),
+                "healthy": replica in healthy,
+                "error": self._errors.get(replica),
+            }
+            for replica in self.engines
+        ]
+
+
+replicas = ReplicaSet(replica_engines)
+
+
+class RoutingSession(Session):
+    # Sync session behind the API's AsyncSession. Reads go to the replica in
+    # info["replica"] (set per request by get_async_db); writes, raw SQL and
+    # everything after the session's first write go to the primary.
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replica = self.info.get("replica")
+        if replica is not None and (self._flushing or not getattr(clause, "is_select", False)):
+            # Stay on the primary from here on so the session reads its own writes
+            self.info["replica"] = replica = None
+        return (replica or async_engine).sync_engine
+
+
+def pin_to_primary(db: AsyncSession) -> bool:
+    # Send the rest of this session's statements to the primary; True if it was on a replica
+    return db.info.pop("replica", None) is not None
+
+
+# Objects stay usable after commit; handlers refresh explicitly when they need server defaults
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    sync_session_class = RoutingSession,
+    autoflush = False,
+    expire_on_commit = False
+)
+
+# Read-your-writes: after a successful write a client's reads go to the primary for a while
+READ_YOUR_WRITES_COOKIE = "dataspeaks_primary_until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def wrote_recently(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def reads_from_replica(request: Request) -> bool:
+    return (
+        bool(replicas.engines) and request.method in SAFE_METHODS and not wrote_recently(request)
+        and not getattr(request.state, "replica_failed", False)
+    )
+
+
+def read_session(use_replica: bool = True) -> AsyncSession:
+    # Session for work outside a request dependency (e.g. streamed exports)
+    db = AsyncSessionLocal()
+    if use_replica:
+        db.info["replica"] = replicas.choose()
+    return db
+
+
+class ReadYourWritesMiddleware:
+    # Sets the read-your-writes cookie on successful non-GET responses while
+    # replicas are configured
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or not replicas.engines:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                window = settings.read_your_writes_seconds
+                cookie = (
+                    f"{READ_YOUR_WRITES_COOKIE}={time.time() + window:.3f}; "
+                    f"Max-Age={int(window) or 1}; Path=/; HttpOnly; SameSite=Lax"
+                )
+                message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", cookie.encode())]}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
 def create_tables():
     Base.metadata.create_all(bind = engine)
 
+async def create_tables_async():
+    # Create any missing tables through the async engine (used at API startup)
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
 def get_db() -> Generator[Session, None, None]:
-    # FastAPI dependency injection to provide databases session
+    # Sync session provider for scripts and background jobs
 
     db = SessionLocal()
 
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    # FastAPI dependency injection to provide an async database session
+    # GET handlers read from a replica (when configured and the client hasn't just written)
+
+    async with AsyncSessionLocal() as db:
+        if reads_from_replica(request):
+            db.info["replica"] = request.state.replica = replicas.choose()
+        yield db
+
+
+class ReplicaFallbackRoute(APIRoute):
+    # Route class for routers whose GET handlers read through get_async_db: a read
+    # whose replica failed mid-request (and was taken out by the handle_error hook)
+    # runs once more on the primary instead of returning a 500. Only safe methods
+    # read from replicas, so only idempotent requests are ever repeated
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request):
+            try:
+                return await handler(request)
+            except DBAPIError:
+                replica = getattr(request.state, "replica", None)
+                if replica is None or replica in replicas.healthy():
+                    raise
+                logger.info("Retrying %s %s on the primary after a replica failure", request.method, request.url.path)
+                request.state.replica = None
+                request.state.replica_failed = True
+                return await handler(request)
+
+        return route_handler
+
+async def dispose_engines():
+    # Close pooled async connections (primary and replicas)
+    for e in (async_engine, *replica_engines):
+        await e.dispose()
+
+async def probe_database() -> dict:
+    # Round trip SELECT 1 through the API pool, plus the pool's current load
+
+    # (failures are logged here; the response only says what kind of failure it was,
+    # since driver messages can carry hostnames, users and SQL)
+    start = time.perf_counter()
+    try:
+        async with async_engine.connect() as conn:
+            await asyncio.wait_for(conn.execute(text("SELECT 1")), settings.health_db_timeout_seconds)
+        status, error = "connected", None
+    except asyncio.TimeoutError:
+        logger.warning("Database health probe timed out after %ss", settings.health_db_timeout_seconds)
+        status, error = "unavailable", "timeout"
+    except Exception:
+        logger.exception("Database health probe failed")
+        status, error = "unavailable", "connection failed"
+
+    result = {
+        "status": status,
+        "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+        "pool": pool_state(async_engine.pool),
+    }
+    if error:
+        result["error"] = error
+    return result
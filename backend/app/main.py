@@ -1,16 +1,67 @@
 # Main FastAPI application entry point
 
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
-from app.routers import customers
+from app.database import (
+    ASYNC_DATABASE_URL,
+    ReadYourWritesMiddleware,
+    async_engine,
+    create_tables_async,
+    dispose_engines,
+    probe_database,
+    replicas
+)
+from app.routers import changes, charts, customers, debug
+from app.services import churn
+from app.services.change_feed import change_feed
+from app.utils.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, registry
+from app.utils.query_profiler import QueryProfilerMiddleware
+from app.utils.sqlite_profile import PERFORMANCE, checkpoint, is_sqlite_file, run_maintenance
+from app.utils.security_logger import security_log_stats, stop_security_logging
 import logging
 
-# Configure logging
-logging.basicConfig(
-    level = settings.log_level,
-    format = '%(asctime)s = %(name)s - %(levelname)s - %(message)s'
-)
+logger = logging.getLogger(__name__)
+
+def configure_logging():
+    # Called on startup rather than at import, so importing the app (tests, tools) leaves logging alone
+    logging.basicConfig(
+        level = settings.log_level,
+        format = '%(asctime)s = %(name)s - %(levelname)s - %(message)s'
+    )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup / shutdown hooks
+    # Import-time work is kept to defining things; anything with side effects starts here
+    configure_logging()
+    # Create tables added since the database was seeded (e.g. rollups)
+    await create_tables_async()
+    # Probe read replicas in the background; reads fall back to the primary while they're down
+    health_checks = asyncio.create_task(replicas.run_health_checks()) if replicas.engines else None
+    # Periodic WAL checkpoint / PRAGMA optimize for a local SQLite database
+    wal_database = is_sqlite_file(ASYNC_DATABASE_URL) and settings.sqlite_profile == PERFORMANCE
+    maintenance = asyncio.create_task(run_maintenance(async_engine)) if wal_database else None
+    # Mark long-inactive customers churned, now and every churn_job_interval_seconds
+    churn_job = asyncio.create_task(churn.run_churn_job()) if settings.churn_job_enabled else None
+    yield
+    # End open SSE / WebSocket streams; clients reconnect to another instance with their last event id
+    change_feed.close()
+    for task in (health_checks, maintenance, churn_job):
+        if task:
+            task.cancel()
+    if wal_database:
+        # Leave a small database file (and an empty WAL) behind
+        try:
+            await checkpoint(async_engine, "TRUNCATE")
+        except Exception as e:
+            logger.warning("Final SQLite checkpoint failed: %s", e)
+    # Close pooled async connections
+    await dispose_engines()
+    # Flush buffered security events
+    stop_security_logging()
 
 # Create FastAPI app
 app = FastAPI(
@@ -18,7 +69,8 @@ app = FastAPI(
     description = "AI powered customer analytics dashboard API",
     version = "1.0.0",
     docs_url = "/docs",
-    redoc_url = "/redoc"
+    redoc_url = "/redoc",
+    lifespan = lifespan
 )
 
 # CORS configuration
@@ -30,8 +82,21 @@ app.add_middleware(
     allow_headers = ["*"]
 )
 
+# Per-request query counts/timings (checks settings.query_profiler_enabled per request)
+app.add_middleware(QueryProfilerMiddleware)
+
+# Read-your-writes cookie so a client's reads follow its writes to the primary (no-op without replicas)
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Request latency/status metrics (outermost, so it times everything else)
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(customers.router, prefix="/api", tags=["customers"])
+app.include_router(charts.router, prefix="/api", tags=["charts"])
+app.include_router(debug.router, prefix="/api", tags=["debug"])
+app.include_router(changes.router, prefix="/api", tags=["changes"])
 
 @app.get("/")
 async def root():
@@ -43,14 +108,42 @@ async def root():
     }
 
 @app.get("/health")
-async def health_check():
-    # Detailed health check for monitoring
+async def health_check(response: Response):
+    # Detailed health check for monitoring: probes the database and reports pool load
+
+    database = await probe_database()
+    pool = database["pool"]
+    if database["status"] != "connected":
+        status = "unhealthy"
+        response.status_code = 503
+    elif pool and pool["saturation"] >= settings.health_pool_saturation_threshold:
+        status = "degraded"
+    elif replicas.engines and not replicas.healthy():
+        # Still serving, but every read is on the primary
+        status = "degraded"
+    else:
+        status = "healthy"
+
     return {
-        "status": "healthy",
-        "database": "connected",
-        "version": "1.0.0"
+        "status": status,
+        "database": database["status"],
+        "database_latency_ms": database["latency_ms"],
+        "database_error": database.get("error"),
+        "pool": pool,
+        "replicas": replicas.state(),
+        "version": "1.0.0",
+        "security_events": security_log_stats(),
+        "churn_job": churn.last_run,
+        "change_feed": change_feed.stats()
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    # Prometheus scrape endpoint
+    if not settings.metrics_enabled:
+        return Response(status_code=404)
+    return Response(content=registry.render(), media_type=METRICS_CONTENT_TYPE)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000, reload=settings.debug)
\ No newline at end of file
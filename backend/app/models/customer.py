@@ -1,8 +1,11 @@
 # Customer data models using SQLAlchemy ORM
 
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Enum, Index, and_, case, text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.sql import func
+from sqlalchemy.sql.expression import FunctionElement
 from datetime import datetime
 import enum
 
@@ -15,10 +18,67 @@ class PlanType(str, enum.Enum):
     GROWTH = "growth"
     ENTERPRISE = "enterprise"
 
+class utc_now(FunctionElement):
+    # Current UTC time as a naive timestamp, matching datetime.utcnow()
+    type = DateTime()
+    inherit_cache = True
+
+@compiles(utc_now)
+def _utc_now_default(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
+@compiles(utc_now, "sqlite")
+def _utc_now_sqlite(element, compiler, **kw):
+    # CURRENT_TIMESTAMP drops the fraction of a second, which can put "now" before a
+    # timestamp written a moment ago; 'now' in julianday resolution keeps milliseconds
+    return "STRFTIME('%Y-%m-%d %H:%M:%f', 'now')"
+
+@compiles(utc_now, "postgresql")
+def _utc_now_postgresql(element, compiler, **kw):
+    return "timezone('utc', now())"
+
+class days_between(FunctionElement):
+    # Whole days from the first timestamp to the second (timedelta.days)
+    type = Integer()
+    inherit_cache = True
+
+@compiles(days_between)
+def _days_between_default(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return f"CAST(FLOOR(EXTRACT(EPOCH FROM ({compiler.process(end, **kw)} - {compiler.process(start, **kw)})) / 86400) AS INTEGER)"
+
+@compiles(days_between, "sqlite")
+def _days_between_sqlite(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return f"CAST(julianday({compiler.process(end, **kw)}) - julianday({compiler.process(start, **kw)}) AS INTEGER)"
+
 class Customer(Base):
     # Customer table model
     
     __tablename__ = "customers"
+    __table_args__ = (
+        # Keyset pagination: ORDER BY signup_date DESC, id DESC
+        Index("ix_customers_signup_date_id", "signup_date", "id"),
+        # LTV sorting/filtering/aggregation: LTV depends on the current time so it
+        # can't be indexed itself, but every input is in this index so the
+        # expression is evaluated from an index-only scan
+        Index("ix_customers_ltv_inputs", "plan", "is_active", "mrr", "signup_date", "churned_date"),
+        # List/count with plan + is_active filters, already in keyset order
+        Index("ix_customers_is_active_plan", "is_active", "plan", "signup_date", "id"),
+        # Filter compiler (services.filters): sort=mrr pages read backwards and MRR
+        # ranges; industry and employee count bucket filters and their counts
+        Index("ix_customers_mrr_id", "mrr", "id"),
+        Index("ix_customers_industry_signup_date", "industry", "signup_date", "id"),
+        Index("ix_customers_employee_count", "employee_count"),
+        # Incremental refresh of the columnar analytics snapshot (updated_at watermark)
+        Index("ix_customers_updated_at", "updated_at"),
+        # Active-only lists (the dashboard default); partial where the backend supports it
+        Index(
+            "ix_customers_active_signup_date_id", "signup_date", "id",
+            sqlite_where=text("is_active = 1"),
+            postgresql_where=text("is_active")
+        ),
+    )
 
     # Primary key
     id = Column(Integer, primary_key=True, index=True)
@@ -33,12 +93,13 @@ class Customer(Base):
     mrr = Column(Float, nullable=False, default=0.0) 
 
     # Status
-    is_active = Column(Boolean, default=True, index=True)
+    # (indexed through the composite/partial indexes above)
+    is_active = Column(Boolean, default=True)
 
     # Timestamps
     signup_date = Column(DateTime, nullable=False, default=datetime.utcnow)
-    last_activity = Column(DateTime, nullable=True)
-    churned_date = Column(DateTime, nullable=True) #Cancelled Date
+    last_activity = Column(DateTime, nullable=True, index=True)
+    churned_date = Column(DateTime, nullable=True, index=True) #Cancelled Date
 
     # Metadata
     created_at = Column(DateTime, server_default=func.now())
@@ -47,22 +108,29 @@ class Customer(Base):
     def __repr__(self):
         return f"<Customer(id={self.id}, company={self.company_name}, plan={self.plan})>"
     
-    @property
+    @hybrid_property
     def is_churned(self) -> bool:
         # Helper property to check if the customer has churned
         return not self.is_active and self.churned_date is not None
-    
-    @property
+
+    @is_churned.expression
+    def is_churned(cls):
+        return and_(cls.is_active == False, cls.churned_date.isnot(None))
+
+    @hybrid_property
     def lifetime_months(self) -> int:
         # How many months the customer has been active
         end_date = self.churned_date if self.is_churned else datetime.utcnow()
         delta = end_date - self.signup_date
         return max(1, delta.days // 30)
-    
-    @property
+
+    @lifetime_months.expression
+    def lifetime_months(cls):
+        # Same rule in SQL so LTV can be sorted, filtered and aggregated in the database
+        days = days_between(cls.signup_date, case((cls.is_churned, cls.churned_date), else_=utc_now()))
+        return case((days < 60, 1), else_=days // 30)
+
+    @hybrid_property
     def lifetime_value(self) -> float:
         # Total revenue per customer
         return self.mrr * self.lifetime_months
-        
-
-
@@ -0,0 +1,52 @@
+# Daily rollup table backing the time-series charts
+
+from sqlalchemy import DDL, Column, Date, DateTime, Float, Integer, event
+from sqlalchemy.sql import func
+from app.models.customer import Base
+
+class DailyCustomerRollup(Base):
+    # One row per completed day (zeros included), appended incrementally by the
+    # analytics service; customer writes delete the days they change
+
+    __tablename__ = "customer_daily_rollups"
+
+    day = Column(Date, primary_key=True)
+
+    # Signups on this day and the (current) MRR they bring
+    signups = Column(Integer, nullable=False, default=0)
+    new_mrr = Column(Float, nullable=False, default=0.0)
+
+    # Churns dated on this day and the MRR they took with them
+    churns = Column(Integer, nullable=False, default=0)
+    churned_mrr = Column(Float, nullable=False, default=0.0)
+
+    # Customers whose most recent activity fell on this day
+    active_customers = Column(Integer, nullable=False, default=0)
+
+    computed_at = Column(DateTime, server_default=func.now())
+
+    def __repr__(self):
+        return f"<DailyCustomerRollup(day={self.day}, signups={self.signups}, churns={self.churns})>"
+
+
+class RollupGeneration(Base):
+    # A single row, bumped by every write that deletes rollup days (in the write's
+    # transaction). Extensions claim it with a conditional UPDATE before inserting,
+    # which both checks and locks it, so a write in any worker either sees their
+    # rows committed or makes them start over
+
+    __tablename__ = "customer_rollup_generation"
+
+    id = Column(Integer, primary_key=True)
+    generation = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<RollupGeneration(generation={self.generation})>"
+
+
+# The row exists from the moment the table does
+event.listen(
+    RollupGeneration.__table__,
+    "after_create",
+    DDL("INSERT INTO customer_rollup_generation (id, generation) VALUES (1, 0)")
+)
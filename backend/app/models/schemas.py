@@ -1,6 +1,6 @@
 # Pydantic schemas fr API request validation
 
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, model_validator, validator
 from datetime import datetime
 from typing import Optional
 from app.models.customer import PlanType
@@ -23,6 +23,28 @@ class CustomerCreate(CustomerBase):
     signup_date: Optional[datetime] = None
     last_activity: Optional[datetime] = None
 
+class CustomerImport(CustomerCreate):
+    # One bulk-uploaded customer; historical imports may carry their churn
+    # (is_active defaults to false with a churned_date, true without)
+    is_active: Optional[bool] = None
+    churned_date: Optional[datetime] = None
+
+    @model_validator(mode="after")
+    def check_churn(self):
+        """Churn fields must agree with each other and the signup date"""
+        if self.churned_date is None:
+            if self.is_active is None:
+                self.is_active = True
+            return self
+        if self.is_active:
+            raise ValueError("churned_date requires is_active=false")
+        self.is_active = False
+        signup = self.signup_date or datetime.utcnow()
+        # Naive and aware timestamps don't compare; the database stores both as given
+        if (signup.tzinfo is None) == (self.churned_date.tzinfo is None) and self.churned_date < signup:
+            raise ValueError("churned_date is before signup_date")
+        return self
+
 class CustomerUpdate(BaseModel):
     # Update existing customer
     company_name: Optional[str] = None
@@ -53,7 +75,35 @@ class CustomerResponse(CustomerBase):
 
 class CustomerListResponse(BaseModel):
     # Paginated customer list
-    total: int
+    # total is None when count=none; page is None in cursor mode
+    total: Optional[int]
     customers: list[CustomerResponse]
-    page: int
+    page: Optional[int]
     page_size: int
+    next_cursor: Optional[str] = None
+
+class CustomerSearchResult(BaseModel):
+    # One typeahead match
+    id: int
+    company_name: str
+    industry: Optional[str]
+    plan: PlanType
+    mrr: float
+    is_active: bool
+
+class CustomerSearchResponse(BaseModel):
+    # Ranked company name matches
+    query: str
+    results: list[CustomerSearchResult]
+
+class BulkRowError(BaseModel):
+    # Validation or insert failure for one uploaded row (1-based, header excluded)
+    row: int
+    errors: list[str]
+
+class BulkIngestResponse(BaseModel):
+    # Outcome of a bulk customer upload
+    inserted: int
+    failed: int
+    errors: list[BulkRowError]
+    errors_truncated: bool
@@ -0,0 +1,93 @@
+# Change feed endpoints: customer writes pushed over SSE or a WebSocket
+#
+# Dashboards subscribe once and refetch only when an event arrives, instead of
+# polling the list and summary endpoints on a timer.
+
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from app.config import settings
+from app.services.change_feed import FeedClosed, change_feed, ready_event, sse_message
+from app.utils.query_profiler import query_budget
+
+router = APIRouter()
+
+# Reconnect delay hint for EventSource clients, in milliseconds
+SSE_RETRY_MS = 2000
+
+# WebSocket close codes: 1013 "try again later" for lagging clients and a full server
+WS_TRY_AGAIN_LATER = 1013
+WS_GOING_AWAY = 1001
+
+@router.get("/changes")
+@query_budget(0)
+async def stream_changes(
+    request: Request,
+    last_event_id: Optional[str] = Header(None, description="Set by EventSource on reconnect"),
+    since: Optional[str] = Query(None, description="Resume after this event id (for clients that can't set headers)")
+):
+    # Server-sent events: one `event: <type>` message per customer write
+    # A new connection starts with a `ready` event carrying the current position
+
+    resume_from = last_event_id or since
+    subscription = change_feed.subscribe(resume_from)
+    if subscription is None:
+        raise HTTPException(status_code=503, detail="Too many change feed subscribers")
+    ready = None if resume_from else ready_event()
+
+    async def events():
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+            if ready:
+                yield sse_message(ready)
+            while True:
+                try:
+                    event = await subscription.next(settings.change_feed_heartbeat_seconds)
+                except FeedClosed:
+                    # Lagging or shutting down; EventSource reconnects with Last-Event-ID
+                    return
+                if event is None and await request.is_disconnected():
+                    return
+                yield sse_message(event)
+        finally:
+            change_feed.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # No proxy buffering, so events aren't held back
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/changes/ws")
+async def websocket_changes(
+    websocket: WebSocket,
+    last_event_id: Optional[str] = Query(None, description="Resume after this event id")
+):
+    # The same events as JSON text frames, plus {"type": "ping"} on idle connections
+
+    subscription = change_feed.subscribe(last_event_id)
+    if subscription is None:
+        await websocket.close(code=WS_TRY_AGAIN_LATER, reason="Too many change feed subscribers")
+        return
+    ready = None if last_event_id else ready_event()
+
+    try:
+        await websocket.accept()
+        if ready:
+            await websocket.send_text(ready.json())
+        while True:
+            try:
+                event = await subscription.next(settings.change_feed_heartbeat_seconds)
+            except FeedClosed:
+                if subscription.lagged:
+                    await websocket.close(code=WS_TRY_AGAIN_LATER, reason="Fell behind; reconnect with last_event_id")
+                else:
+                    await websocket.close(code=WS_GOING_AWAY)
+                return
+            # Sending the ping also notices clients that went away
+            await websocket.send_text(event.json() if event else '{"type":"ping"}')
+    except WebSocketDisconnect:
+        pass
+    finally:
+        change_feed.unsubscribe(subscription)
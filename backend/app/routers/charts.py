@@ -0,0 +1,59 @@
+# Dashboard chart endpoints
+
+from datetime import date, datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.database import ReplicaFallbackRoute, get_async_db
+from app.security.input_validator import SecureQueryInput
+from app.services.analytics import Granularity, UnsupportedChart, chart_series, rebuild_rollups
+from app.services.cohorts import cohort_engine, month_index, month_label
+from app.utils.query_profiler import query_budget
+
+router = APIRouter(route_class=ReplicaFallbackRoute)
+
+@router.get("/charts/{chart_id}")
+@query_budget(9)
+async def get_chart(
+    chart_id: str,
+    start: Optional[date] = Query(None, description="First day of the range (default: 1 year before end)"),
+    end: Optional[date] = Query(None, description="Last day of the range, inclusive (default: today)"),
+    granularity: Granularity = Query(Granularity.MONTH, description="Bucket size: day, week or month"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Time series for one dashboard chart
+
+    if chart_id not in SecureQueryInput.ALLOWED_CHART_IDS:
+        raise HTTPException(status_code=404, detail=f"Chart {chart_id} not found")
+
+    end = end or datetime.utcnow().date()
+    start = start or (end - timedelta(days=365))
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must be on or before end")
+
+    if chart_id == "cohort-retention":
+        # Monthly cohorts whose signup month falls in the range
+        matrix = await cohort_engine.matrix(db)
+        first, last = month_label(month_index(start)), month_label(month_index(end))
+        matrix["cohorts"] = [c for c in matrix["cohorts"] if first <= c["cohort"] <= last]
+        return {"chart_id": chart_id, "granularity": "month", "start": start, "end": end, **matrix}
+
+    try:
+        series = await chart_series(db, chart_id, start, end, granularity)
+    except UnsupportedChart as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    return {
+        "chart_id": chart_id,
+        "granularity": granularity.value,
+        "start": start,
+        "end": end,
+        "series": series
+    }
+
+@router.post("/charts/rollups/rebuild")
+@query_budget(6)
+async def rebuild_chart_rollups(db: AsyncSession = Depends(get_async_db)):
+    # Recompute the daily rollups from scratch (after backfills or historical edits)
+    days = await rebuild_rollups(db)
+    return {"days_rolled_up": days}
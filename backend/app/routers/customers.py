@@ -1,72 +1,237 @@
 # Customer CRUM Endpoints
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
-from app.database import get_db
-from app.models.customer import Customer, PlanType
+from app.config import settings
+from app.database import ReplicaFallbackRoute, get_async_db, reads_from_replica
+from app.models.customer import Customer
+from app.security.input_validator import CustomerFilterInput
+from app.services.analytics import changed_days, commit_with_rollups, rollup_row
+from app.services.cache import cached_json_response
+from app.services.customer_events import (
+    customer_created,
+    customer_deleted,
+    customer_state,
+    customer_updated,
+    customer_write
+)
+from app.services.stats import (
+    aggregate_by_plan,
+    build_summary,
+    check_consistency,
+    estimate_count,
+    get_summary,
+    ltv_summary
+)
+from app.services.columnar import AnalyticsSource, columnar_aggregate, use_columnar
+from app.services.filters import compile_filters, counts_from_snapshot, is_empty, plan_types, snapshot_filters
+from app.services.pagination import (
+    CountMode,
+    InvalidCursor,
+    SortField,
+    count_query,
+    decode_cursor,
+    encode_cursor,
+    page_query
+)
+from app.services.projection import InvalidFields, dumps, parse_fields, project_rows, projection_query
+from app.services.export import ExportFormat, ExportUnavailable, MEDIA_TYPES, FILE_EXTENSIONS, export_customers
+from app.services.ingest import IngestFormat, UnsupportedFormat, detect_format, ingest_customers
+from app.services.search import company_search
+from app.utils.query_profiler import query_budget
 from app.models.schemas import(
     CustomerCreate,
     CustomerUpdate,
     CustomerResponse,
-    CustomerListResponse
+    CustomerListResponse,
+    CustomerSearchResponse,
+    CustomerSearchResult,
+    BulkIngestResponse
 )
 
-router = APIRouter()
+router = APIRouter(route_class=ReplicaFallbackRoute)
+
+def customer_filter_input(
+    plan: Optional[list[str]] = Query(None, description="Plan types (repeat for several: plan=starter&plan=growth)"),
+    is_active: Optional[bool] = Query(None, description="Filter by active status"),
+    industry: Optional[list[str]] = Query(None, description="Industries (repeatable)"),
+    employees: Optional[list[str]] = Query(None, description="Employee count buckets: 1-10, 11-50, 51-200, 201-1000, 1001+ (repeatable)"),
+    min_mrr: Optional[float] = Query(None, ge=0, description="Minimum MRR"),
+    max_mrr: Optional[float] = Query(None, ge=0, description="Maximum MRR"),
+    signup_from: Optional[date] = Query(None, description="Signed up on or after this day (YYYY-MM-DD)"),
+    signup_to: Optional[date] = Query(None, description="Signed up on or before this day (YYYY-MM-DD)"),
+    min_ltv: Optional[float] = Query(None, ge=0, description="Minimum lifetime value"),
+    max_ltv: Optional[float] = Query(None, ge=0, description="Maximum lifetime value")
+) -> CustomerFilterInput:
+    # Customer filters shared by the list, export and analytics endpoints (compiled by services.filters)
+    try:
+        return CustomerFilterInput(
+            plan=plan, is_active=is_active, industry=industry, employees=employees,
+            min_mrr=min_mrr, max_mrr=max_mrr, signup_from=signup_from, signup_to=signup_to,
+            min_ltv=min_ltv, max_ltv=max_ltv
+        )
+    except ValidationError as e:
+        raise RequestValidationError([
+            {**error, "loc": ("query", *error["loc"])}
+            for error in e.errors(include_url=False, include_context=False)
+        ])
 
 @router.get("/customers", response_model = CustomerListResponse)
+@query_budget(3)
 async def get_customers(
+    request: Request,
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=500, description="Max records to return"),
-    plan: Optional[PlanType] = Query(None, description="Filter by plan type"),
-    is_active: Optional[bool] = Query(None, description="Filter by active status"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor; replaces skip"),
+    count: CountMode = Query(CountMode.EXACT, description="How to compute total: exact, estimate or none"),
+    sort: SortField = Query(SortField.SIGNUP_DATE, description="signup_date (newest first), ltv or mrr (highest first)"),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return (fast path, e.g. id,company_name,mrr)"),
+    spec: CustomerFilterInput = Depends(customer_filter_input),
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Get paginated list of customers with optional filters.
-    
-    # Build query
-    query = db.query(Customer)
-    
-    # Apply filters
-    if plan:
-        query = query.filter(Customer.plan == plan)
-    if is_active is not None:
-        query = query.filter(Customer.is_active == is_active)
-    
-    # Get total count (before pagination)
-    total = query.count()
-    
-    # Apply pagination
-    customers = query.order_by(Customer.signup_date.desc()).offset(skip).limit(limit).all()
-    
-    # Calculate page number
-    page = (skip // limit) + 1 if limit > 0 else 1
-    
-    return CustomerListResponse(
-        total=total,
-        customers=customers,
-        page=page,
-        page_size=limit
+
+    # Projection: only the requested columns, no ORM objects or response models
+    projected = None
+    if fields is not None:
+        try:
+            projected = parse_fields(fields)
+        except InvalidFields as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    async def build() -> CustomerListResponse:
+        # Build filters
+        filters = compile_filters(spec)
+
+        # Get total count (before pagination); the snapshot only knows plan and is_active
+        if count == CountMode.EXACT or (count == CountMode.ESTIMATE and not counts_from_snapshot(spec)):
+            total = await db.scalar(count_query(filters))
+        elif count == CountMode.ESTIMATE:
+            total = await estimate_count(db, plans=plan_types(spec), is_active=spec.is_active)
+        else:
+            total = None
+
+        # Apply pagination - keyset when a cursor is given, offset otherwise
+        after = None
+        if cursor:
+            if sort != SortField.SIGNUP_DATE:
+                raise HTTPException(status_code=400, detail="Cursor pagination requires sort=signup_date")
+            try:
+                after = decode_cursor(cursor)
+            except InvalidCursor as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+        # Fetch one extra row to know whether there is a next page
+        base = projection_query(projected) if projected else select(Customer)
+        query = page_query(base, filters, sort, after=after, skip=skip, limit=limit + 1)
+        if projected:
+            customers = (await db.execute(query)).all()
+        else:
+            customers = list(await db.scalars(query))
+        next_cursor = None
+        if len(customers) > limit:
+            customers = customers[:limit]
+            if sort == SortField.SIGNUP_DATE:
+                last = customers[-1]
+                next_cursor = encode_cursor(last.signup_date, last.id)
+
+        # Calculate page number (not meaningful in cursor mode)
+        page = None if cursor else (skip // limit) + 1
+
+        if projected:
+            return dumps({
+                "total": total,
+                "customers": project_rows(customers, projected),
+                "page": page,
+                "page_size": limit,
+                "next_cursor": next_cursor
+            })
+
+        return CustomerListResponse(
+            total=total,
+            customers=customers,
+            page=page,
+            page_size=limit,
+            next_cursor=next_cursor
+        )
+
+    params = {
+        "skip": skip, "limit": limit, "cursor": cursor, "count": count,
+        "sort": sort, "fields": projected, **spec.model_dump(exclude_none=True)
+    }
+    return await cached_json_response(request, "customers", params, build)
+
+@router.get("/customers/export")
+@query_budget(2)
+async def export_customers_endpoint(
+    request: Request,
+    format: ExportFormat = Query(ExportFormat.CSV, description="csv, ndjson or arrow (Arrow IPC stream)"),
+    spec: CustomerFilterInput = Depends(customer_filter_input)
+):
+    # Stream the (filtered) customer table in constant memory
+
+    try:
+        body = export_customers(
+            compile_filters(spec),
+            format,
+            settings.export_batch_size,
+            use_replica=reads_from_replica(request)
+        )
+    except ExportUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="customers.{FILE_EXTENSIONS[format]}"'}
+    )
+
+@router.get("/customers/search", response_model=CustomerSearchResponse)
+@query_budget(3)
+async def search_customers(
+    q: str = Query(..., min_length=1, max_length=100, description="Typeahead text; every word matches a word prefix"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum results"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Company name typeahead: in-memory ranked name match, then an indexed lookup of those names
+    # (declared before /customers/{customer_id} so "search" isn't parsed as an id)
+
+    rows = await company_search.search(db, q, limit)
+    return CustomerSearchResponse(
+        query=q,
+        results=[CustomerSearchResult.model_validate(row, from_attributes=True) for row in rows]
     )
 
 @router.get("/customers/{customer_id}", response_model=CustomerResponse)
+@query_budget(1)
 async def get_customer(
     customer_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Get customer by ID
-    customer = db.query(Customer).filter(Customer.id == customer_id) .first()
 
-    if not customer:
-        raise HTTPException(status_code=404, detail=f"Customer {customer_id} not found")
-    
-    return customer
+    async def build() -> CustomerResponse:
+        customer = await db.get(Customer, customer_id)
+
+        if not customer:
+            raise HTTPException(status_code=404, detail=f"Customer {customer_id} not found")
+
+        return CustomerResponse.model_validate(customer)
+
+    return await cached_json_response(request, "customer", {"id": customer_id}, build)
 
 @router.post("/customers", response_model = CustomerResponse, status_code=201)
+@query_budget(4)
 async def create_customer(
     customer_data: CustomerCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Create a new customer
 
@@ -74,78 +239,135 @@ async def create_customer(
     customer = Customer(**customer_data.model_dump())
 
     db.add(customer)
-    db.commit()
-    db.refresh(customer)
+    with customer_write():
+        # Backdated signups change completed chart rollup days
+        await commit_with_rollups(db, changed_days(None, rollup_row(customer)))
+        await db.refresh(customer)
+
+        customer_created(customer)
 
     return customer
 
+@router.post("/customers/bulk", response_model=BulkIngestResponse)
+async def bulk_create_customers(
+    request: Request,
+    format: Optional[IngestFormat] = Query(None, description="ndjson or csv; defaults to the request Content-Type"),
+    batch_size: int = Query(settings.bulk_ingest_batch_size, ge=1, le=10000, description="Rows per insert transaction"),
+    max_errors: int = Query(1000, ge=0, le=100000, description="Max row errors to report"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Stream an NDJSON or CSV body of customers into the database
+
+    if format is None:
+        try:
+            format = detect_format(request.headers.get("content-type"))
+        except UnsupportedFormat as e:
+            raise HTTPException(status_code=415, detail=str(e))
+
+    try:
+        return await ingest_customers(db, request.stream(), format, batch_size, max_errors)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Request body must be UTF-8 encoded")
+
 @router.patch("/customers/{customer_id}", response_model=CustomerResponse)
+@query_budget(5)
 async def update_customer(
     customer_id: int,
     customer_data: CustomerUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Update existing customer (partial update)
 
-    customer = db.query(Customer).filter(Customer.id == customer_id).first()
+    customer = await db.get(Customer, customer_id)
 
     if not customer:
         raise HTTPException(status_code=404, detail=f"Customer {customer_id} not found")
     
+    before = customer_state(customer)
+
     # Ipdate only provided fields
     update_data = customer_data.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(customer, field, value)
 
-    db.commit()
-    db.refresh(customer)
+    with customer_write():
+        await commit_with_rollups(db, changed_days(before.rollup, rollup_row(customer)))
+        await db.refresh(customer)
+
+        customer_updated(before, customer)
 
     return customer
 
 @router.delete("/customers/{customer_id}", status_code=204)
+@query_budget(4)
 async def delete_customer(
     customer_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ): 
     # Delete Customer
-    customer = db.query(Customer).filter(Customer.id == customer_id).first()
+    customer = await db.get(Customer, customer_id)
 
     if not customer:
         raise HTTPException(status_code=404, detail=f"Customer {customer_id} not found")
     
-    db.delete(customer)
-    db.commit()
+    before = customer_state(customer)
+
+    await db.delete(customer)
+    with customer_write():
+        await commit_with_rollups(db, changed_days(before.rollup, None))
+
+        customer_deleted(before, customer_id)
 
     return None
 
 @router.get("/customer/stats/summary")
-async def get_customer_summary(db: Session = Depends(get_db)):
-    # Get high level customer statistics
-
-    # Total customers
-    total = db.query(Customer).count()
-    active = db.query(Customer).filter(Customer.is_active == True).count()
-    churned = total - active
-
-    # MRR (Monthly Recurring Revenue) 
-    total_mrr = db.query(func.sum(Customer.mrr)).filter(Customer.is_active == True).scalar() or 0
-
-    # Average MRR per customer
-    avg_mrr = total_mrr / active if active > 0 else 0
-
-    # Plan distribution
-    plan_distribution = {}
-
-    for plan in PlanType:
-        count = db.query(Customer).filter(Customer.plan == plan, Customer.is_active == True).count()
-        plan_distribution[plan.value] = count
-
-    return {
-        "total_customers": total,
-        "active_customers": active,
-        "churned_customers": churned,
-        "churn_rate": (churned / total * 100) if total > 0 else 0,
-        "total_mrr": round(total_mrr, 2),
-        "average_mrr": round(avg_mrr, 2),
-        "plan_distribution": plan_distribution
-    }
\ No newline at end of file
+@query_budget(3)
+async def get_customer_summary(
+    request: Request,
+    fresh: bool = Query(False, description="Force a full recompute instead of using the snapshot"),
+    source: Optional[AnalyticsSource] = Query(None, description="Segments: columnar (in-memory snapshot, default) or sql"),
+    spec: CustomerFilterInput = Depends(customer_filter_input),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Get high level customer statistics (fresh=true bypasses the response cache too)
+    # Filtered segments are answered from the columnar snapshot (with its staleness) or SQL
+
+    segment = snapshot_filters(spec)
+
+    async def build():
+        if is_empty(spec):
+            return await get_summary(db, fresh=fresh)
+        if segment is not None and use_columnar(source) and not fresh:
+            return await columnar_aggregate(db, lambda snapshot: snapshot.summary(**segment))
+        return build_summary(await aggregate_by_plan(db, compile_filters(spec)))
+
+    params = {**spec.model_dump(exclude_none=True), "source": source}
+    return await cached_json_response(request, "summary", params, build, use_cache=not fresh)
+
+@router.get("/customer/stats/ltv")
+@query_budget(3)
+async def get_customer_ltv(
+    request: Request,
+    source: Optional[AnalyticsSource] = Query(None, description="columnar (in-memory snapshot, default) or sql"),
+    spec: CustomerFilterInput = Depends(customer_filter_input),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Lifetime value totals per plan, vectorized over the columnar snapshot or aggregated in the database
+    # (employee and LTV filters always go to the database)
+
+    segment = snapshot_filters(spec)
+
+    async def build():
+        if segment is not None and use_columnar(source):
+            return await columnar_aggregate(db, lambda snapshot: snapshot.ltv_summary(**segment))
+        return await ltv_summary(db, filters=compile_filters(spec))
+
+    return await cached_json_response(
+        request, "ltv", {**spec.model_dump(exclude_none=True), "source": source}, build
+    )
+
+@router.get("/customer/stats/summary/consistency")
+@query_budget(2)
+async def get_customer_summary_consistency(db: AsyncSession = Depends(get_async_db)):
+    # Compare the stats snapshot against a full recompute
+    return await check_consistency(db)
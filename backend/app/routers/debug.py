@@ -0,0 +1,25 @@
+# Development endpoints backed by the query profiler
+
+from fastapi import APIRouter, HTTPException
+from app.config import settings
+from app.utils.query_profiler import n_plus_one_events, slow_queries
+
+router = APIRouter()
+
+@router.get("/debug/queries")
+async def get_query_profile(clear: bool = False):
+    # Recent slow SELECTs (with their EXPLAIN output) and N+1 reports, newest first
+    # Statements can contain customer data, so this only exists while profiling
+    if not settings.query_profiler_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    result = {
+        "slow_query_threshold_ms": settings.query_profiler_slow_ms,
+        "n_plus_one_threshold": settings.query_profiler_n_plus_one_threshold,
+        "slow_queries": slow_queries.items(),
+        "n_plus_one": n_plus_one_events.items(),
+    }
+    if clear:
+        slow_queries.clear()
+        n_plus_one_events.clear()
+    return result
@@ -1,8 +1,9 @@
 # Input validation and sanitizatino
 
+from datetime import date
 from pydantic import BaseModel, Field, validator
-from typing import Optional
-import re
+from typing import ClassVar, Optional
+from app.security.scanner import InjectionScanner
 
 class SecureQueryInput(BaseModel):
     # Validates User Questions for AI chat
@@ -20,7 +21,7 @@ class SecureQueryInput(BaseModel):
     )
 
     # Suspicious patterns that might indicate injection attempts
-    INJECTION_PATTERNS = [
+    INJECTION_PATTERNS: ClassVar[list[str]] = [
         r'ignore\s+(previous|all|above)',
         r'forget\s+(previous|everything)',
         r'new\s+instructions?',
@@ -37,7 +38,7 @@ class SecureQueryInput(BaseModel):
     ]
 
     # Allowed chart IDs
-    ALLOWED_CHART_IDS = [
+    ALLOWED_CHART_IDS: ClassVar[list[str]] = [
         'revenue-over-time',
         'customer-churn',
         'mrr-growth',
@@ -53,23 +54,21 @@ class SecureQueryInput(BaseModel):
         # Strip whitespace
         v = v.strip()
 
-        # Check for injection patterns
-        for pattern in cls.INJECTION_PATTERNS:
-            if re.search(pattern, v, re.IGNORECASE):
-                # Log for security monitoring
-                from app.utils.security_logger import log_suspicious_input
-                log_suspicious_input(v, pattern)
-
-                raise ValueError(
-                    "Your question contains patterns that cannot be processed."
-                    "Please rephrase and try again"
-                )
+        # Check for injection patterns and special characters in one pass
+        result = injection_scanner.scan(v)
+
+        if result.matched:
+            # Log for security monitoring
+            from app.utils.security_logger import log_suspicious_input
+            log_suspicious_input(v, result.rule)
+
+            raise ValueError(
+                "Your question contains patterns that cannot be processed."
+                "Please rephrase and try again"
+            )
             
         # Check for excessive special characters(obfuscation attempt)
-        special_char_count = sum(not c.isalnum() and not c.isspace() for c in v)
-        special_char_ratio = special_char_count / len(v)
-
-        if special_char_ratio > 0.3: # More than 30% special characters
+        if result.special_char_ratio > 0.3: # More than 30% special characters
             raise ValueError("Questions contains too many special characters")
         
         return v
@@ -82,13 +81,34 @@ class SecureQueryInput(BaseModel):
             raise ValueError(f"Invalid chart_id: {v}")
         return v
     
+# Compiled once from the rule list; shared by every validation
+injection_scanner = InjectionScanner(SecureQueryInput.INJECTION_PATTERNS)
+
 class CustomerFilterInput(BaseModel):
-    # Validate customer list filters
+    # Validate customer list filters (compiled to SQL by app.services.filters)
 
-    plan: Optional[str] = None
+    plan: Optional[list[str]] = None
     is_active: Optional[bool] = None
+    industry: Optional[list[str]] = None
+    employees: Optional[list[str]] = None
     min_mrr: Optional[float] = Field(None, ge=0)
     max_mrr: Optional[float] = Field(None, ge=0)
+    signup_from: Optional[date] = None
+    signup_to: Optional[date] = None
+    min_ltv: Optional[float] = Field(None, ge=0)
+    max_ltv: Optional[float] = Field(None, ge=0)
+
+    # Employee count buckets: name -> inclusive (low, high), None for open-ended
+    EMPLOYEE_BUCKETS: ClassVar[dict[str, tuple[int, Optional[int]]]] = {
+        '1-10': (1, 10),
+        '11-50': (11, 50),
+        '51-200': (51, 200),
+        '201-1000': (201, 1000),
+        '1001+': (1001, None),
+    }
+
+    # Values per multi-value filter
+    MAX_VALUES: ClassVar[int] = 20
 
     @validator('plan')
     def validate_plan(cls, v):
@@ -96,10 +116,32 @@ class CustomerFilterInput(BaseModel):
 
         if v is not None:
             allowed_plans = ['starter', 'growth', 'enterprise']
-            if v.lower() not in allowed_plans:
-                raise ValueError(f"Invalid plan. Must be one of: {allowed_plans}")
-        return v.lower() if v else None
-        
+            for plan in v:
+                if plan.lower() not in allowed_plans:
+                    raise ValueError(f"Invalid plan. Must be one of: {allowed_plans}")
+        return sorted({plan.lower() for plan in v}) if v else None
+
+    @validator('industry')
+    def validate_industry(cls, v):
+        # Exact industry names; blank entries are dropped
+        if v is None:
+            return None
+        if len(v) > cls.MAX_VALUES:
+            raise ValueError(f"At most {cls.MAX_VALUES} industries")
+        industries = sorted({industry.strip() for industry in v if industry.strip()})
+        if any(len(industry) > 100 for industry in industries):
+            raise ValueError("Industry names are at most 100 characters")
+        return industries or None
+
+    @validator('employees')
+    def validate_employees(cls, v):
+        # Whitelist validation for employee count buckets
+        if v is not None:
+            for bucket in v:
+                if bucket not in cls.EMPLOYEE_BUCKETS:
+                    raise ValueError(f"Invalid employee bucket. Must be one of: {list(cls.EMPLOYEE_BUCKETS)}")
+        return sorted(set(v), key=list(cls.EMPLOYEE_BUCKETS).index) if v else None
+
     @validator('max_mrr')
     def validate_mrr_range(cls, v, values):
         # Ensure max_mrr > min_mrr
@@ -107,5 +149,15 @@ class CustomerFilterInput(BaseModel):
             if v < values['min_mrr']:
                 raise ValueError("max_mrr must be greater than min_mrr")
         return v
-    
-    
\ No newline at end of file
+
+    @validator('signup_to')
+    def validate_signup_range(cls, v, values):
+        if v is not None and values.get('signup_from') is not None and v < values['signup_from']:
+            raise ValueError("signup_to must be on or after signup_from")
+        return v
+
+    @validator('max_ltv')
+    def validate_ltv_range(cls, v, values):
+        if v is not None and values.get('min_ltv') is not None and v < values['min_ltv']:
+            raise ValueError("max_ltv must be greater than min_ltv")
+        return v
@@ -0,0 +1,113 @@
+# Precompiled injection scanner
+#
+# Every rule is compiled once and guarded by the literal text it must start
+# with (e.g. "ignore" for r'ignore\s+(previous|all|above)'). A scan folds the
+# text's case, skips every rule whose literal is absent using C-level
+# substring search, and only runs the regexes that could possibly match.
+#
+# Rules run on the text as given, so everything the original per-pattern
+# loop rejected is still rejected, and then on its NFKC normalization
+# (fullwidth letters, ligatures) when that differs. The special-character
+# ratio is taken over the text as given, like the original loop.
+#
+# A single combined alternation was measured too: CPython's re engine tries
+# every branch at every position, which made it slower than the original
+# per-pattern loop, so the prefilter is used instead.
+
+import re
+import unicodedata
+from typing import Iterable, NamedTuple, Optional
+
+# Anything that is neither alphanumeric nor whitespace (str.isalnum() excludes "_")
+SPECIAL_CHAR_PATTERN = re.compile(r"[^\w\s]|_")
+
+REGEX_METACHARS = set("\\.^$*+?{}[]|()")
+OPTIONAL_QUANTIFIERS = set("?*{")
+
+
+class ScanResult(NamedTuple):
+    # Outcome of scanning one text
+
+    rule: Optional[str]         # Pattern of the first injection rule that matched, if any
+    rule_index: Optional[int]   # Index of that rule in the scanner's pattern list
+    special_char_ratio: float   # Share of characters that are neither alphanumeric nor whitespace
+
+    @property
+    def matched(self) -> bool:
+        return self.rule is not None
+
+
+# Non-ASCII letters re.IGNORECASE matches against ASCII ones; str.lower() keeps
+# them (or, for U+0130, adds a combining dot), which would hide them from the prefilter
+CASE_EQUIVALENTS = str.maketrans({"\u0130": "i", "\u0131": "i", "\u017f": "s", "\u212a": "k"})
+
+
+def fold(text: str) -> str:
+    # Case-fold so that every literal re.IGNORECASE would match is found by substring search
+    return text.translate(CASE_EQUIVALENTS).lower()
+
+
+def normalize(text: str) -> str:
+    # Fold compatibility characters (e.g. fullwidth letters) and case
+    return fold(unicodedata.normalize("NFKC", text))
+
+
+def literal_prefix(pattern: str) -> str:
+    # Leading literal text every match of the pattern must start with ("" if none)
+    prefix = []
+    for char in pattern:
+        if char in REGEX_METACHARS:
+            # A quantifier that allows zero repetitions makes the previous char optional
+            if char in OPTIONAL_QUANTIFIERS and prefix:
+                prefix.pop()
+            break
+        prefix.append(char)
+    return "".join(prefix).lower()
+
+
+class InjectionScanner:
+    """
+    Scans text for injection patterns
+
+    - rules are reported in list order, like the original validator loop
+    - a rule's regex only runs if its literal prefix occurs in the folded text
+    - non-ASCII text is also checked in NFKC form (stricter than the original loop)
+    - the special-character ratio comes from one C-level regex count
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = list(patterns)
+        self._rules = [
+            (index, literal_prefix(pattern), re.compile(pattern, re.IGNORECASE))
+            for index, pattern in enumerate(self.patterns)
+        ]
+
+    def _first_match(self, folded: str, text: str) -> Optional[int]:
+        # Index of the first rule whose regex matches text, prefiltered on its folded form
+        for index, prefix, regex in self._rules:
+            if prefix in folded and regex.search(text):
+                return index
+        return None
+
+    def scan(self, text: str) -> ScanResult:
+        _, special_count = SPECIAL_CHAR_PATTERN.subn("", text)
+        ratio = special_count / len(text) if text else 0.0
+
+        if text.isascii():
+            # Its own NFKC form
+            index = self._first_match(text.lower(), text)
+        else:
+            folded, normalized = fold(text), normalize(text)
+            matches = [self._first_match(folded, text)]
+            if normalized != folded:
+                matches.append(self._first_match(normalized, normalized))
+            index = min((i for i in matches if i is not None), default=None)
+
+        if index is None:
+            return ScanResult(None, None, ratio)
+        return ScanResult(self.patterns[index], index, ratio)
+
+    def scan_many(self, texts: Iterable[str]) -> list[ScanResult]:
+        # Batch API for validating many questions at once
+        scan = self.scan
+        return [scan(text) for text in texts]
@@ -0,0 +1,404 @@
+# Time-bucketed revenue / churn / activity series for the dashboard charts
+#
+# Per-day signups, churns and activity are aggregated in SQL into the
+# customer_daily_rollups table. Completed days are appended incrementally the
+# first time they are needed, one row per day (zeros included, so a missing
+# row is always a day still to aggregate); the current (partial) day is
+# aggregated live. Chart requests then group the small rollup table into
+# day/week/month buckets in SQL.
+#
+# Customer writes delete the rows of the completed days they change - the
+# signup, churn and last-activity days before and after the write - in the
+# same transaction, and the next extension re-aggregates those days. Both
+# sides go through the customer_rollup_generation row, so an extension that
+# aggregated before a write (in any worker) never inserts over its deletes.
+#
+# The MRR series is rebuilt from current state: every customer adds its
+# current mrr on its signup day and takes it away again on its churn day.
+# Price changes are not historicized (a PATCH of mrr restates the customer's
+# whole history at the new price), and an inactive customer without a
+# churned_date is never taken away - the churn job always dates churns, so
+# only imports and manual edits create those.
+
+import asyncio
+import enum
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, Optional
+from sqlalchemy import Date, cast, delete, func, insert, literal, select, union_all, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import pin_to_primary
+from app.models.customer import Customer
+from app.models.rollup import DailyCustomerRollup, RollupGeneration
+
+ROLLUP_METRICS = ("signups", "new_mrr", "churns", "churned_mrr", "active_customers")
+
+# (signup_date, churned_date, last_activity, is_active, mrr): the columns a customer's rollup rows depend on
+RollupRow = tuple[Optional[datetime], Optional[datetime], Optional[datetime], Optional[bool], Optional[float]]
+
+# More missing ranges than this are aggregated in one query over their span
+MAX_RANGE_QUERIES = 4
+
+# Days per DELETE statement when invalidating (bulk imports touch many days)
+INVALIDATE_CHUNK = 500
+
+# Extensions that keep racing writes give up; the next chart request retries
+EXTEND_ATTEMPTS = 3
+
+
+class Granularity(str, enum.Enum):
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+
+class UnsupportedChart(ValueError):
+    pass
+
+
+def _as_date(value) -> date:
+    # SQLite returns date() results as ISO strings
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def day_expr(column, dialect: str):
+    # Calendar day of a timestamp column
+    if dialect == "postgresql":
+        return cast(column, Date)
+    return func.date(column)
+
+
+def bucket_expr(column, granularity: Granularity, dialect: str):
+    # Start date of the day/week (Monday)/month bucket containing a date column
+    if granularity == Granularity.DAY:
+        return column
+    if dialect == "postgresql":
+        return cast(func.date_trunc(granularity.value, column), Date)
+    if granularity == Granularity.WEEK:
+        return func.date(column, "weekday 0", "-6 days")
+    return func.strftime("%Y-%m-01", column)
+
+
+def bucket_start(day: date, granularity: Granularity) -> date:
+    # Python counterpart of bucket_expr for a single date
+    if granularity == Granularity.WEEK:
+        return day - timedelta(days=day.weekday())
+    if granularity == Granularity.MONTH:
+        return day.replace(day=1)
+    return day
+
+
+def daily_aggregate_query(start: datetime, end: datetime, dialect: str):
+    # Per-day signups/churns/activity for timestamps in [start, end), one UNION ALL pass per event column
+
+    churned = Customer.churned_date.isnot(None)
+    signups = select(
+        day_expr(Customer.signup_date, dialect).label("day"),
+        func.count().label("signups"),
+        func.sum(Customer.mrr).label("new_mrr"),
+        literal(0).label("churns"),
+        literal(0.0).label("churned_mrr"),
+        literal(0).label("active_customers"),
+    ).where(Customer.signup_date >= start, Customer.signup_date < end).group_by("day")
+
+    churns = select(
+        day_expr(Customer.churned_date, dialect).label("day"),
+        literal(0), literal(0.0),
+        func.count(),
+        func.sum(Customer.mrr),
+        literal(0),
+    ).where(
+        churned,
+        Customer.is_active == False,
+        Customer.churned_date >= start,
+        Customer.churned_date < end
+    ).group_by("day")
+
+    activity = select(
+        day_expr(Customer.last_activity, dialect).label("day"),
+        literal(0), literal(0.0), literal(0), literal(0.0),
+        func.count(),
+    ).where(Customer.last_activity >= start, Customer.last_activity < end).group_by("day")
+
+    events = union_all(signups, churns, activity).subquery()
+    return select(
+        events.c.day,
+        *[func.sum(events.c[name]).label(name) for name in ROLLUP_METRICS]
+    ).group_by(events.c.day).order_by(events.c.day)
+
+
+async def aggregate_days(db: AsyncSession, start: datetime, end: datetime) -> list[dict]:
+    dialect = db.get_bind().dialect.name
+    rows = (await db.execute(daily_aggregate_query(start, end, dialect))).all()
+    return [
+        {
+            "day": _as_date(row.day),
+            "signups": int(row.signups or 0),
+            "new_mrr": float(row.new_mrr or 0.0),
+            "churns": int(row.churns or 0),
+            "churned_mrr": float(row.churned_mrr or 0.0),
+            "active_customers": int(row.active_customers or 0),
+        }
+        for row in rows
+    ]
+
+
+def rollup_row(customer: Customer) -> RollupRow:
+    return (customer.signup_date, customer.churned_date, customer.last_activity, customer.is_active, customer.mrr)
+
+
+def changed_days(before: Optional[RollupRow], after: Optional[RollupRow]) -> set[date]:
+    # Days whose rollup rows a write changes: every day the old and new row counted on
+    if before == after:
+        return set()
+    return {
+        value.date()
+        for row in (before, after) if row is not None
+        for value in row[:3] if value is not None
+    }
+
+
+# Serializes extension within this process; other workers are handled by the generation row
+_extend_lock = asyncio.Lock()
+
+
+async def commit_with_rollups(db: AsyncSession, days: Iterable[date]):
+    # Commit a customer write, deleting the completed rollup days it changed in the same transaction
+    # The generation is bumped first: that waits for an extension holding the row, whose
+    # committed rows the DELETEs then see, and fails the claim of one that hasn't taken it yet
+
+    completed = sorted(day for day in set(days) if day < datetime.utcnow().date())
+    if completed:
+        await db.execute(update(RollupGeneration).values(generation=RollupGeneration.generation + 1))
+        for i in range(0, len(completed), INVALIDATE_CHUNK):
+            chunk = completed[i:i + INVALIDATE_CHUNK]
+            await db.execute(delete(DailyCustomerRollup).where(DailyCustomerRollup.day.in_(chunk)))
+    await db.commit()
+
+
+async def _claim_generation(db: AsyncSession, generation: int) -> bool:
+    # Lock the generation row if no write has bumped it since `generation` was read
+    result = await db.execute(
+        update(RollupGeneration)
+        .where(RollupGeneration.generation == generation)
+        .values(generation=generation)
+    )
+    return result.rowcount == 1
+
+
+def _day_range(start: date, end: date) -> Iterable[date]:
+    return (start + timedelta(days=i) for i in range((end - start).days))
+
+
+def _zero_filled(rows: list[dict], start: date, end: date) -> list[dict]:
+    # One row per day in [start, end); days without events get zeros
+    by_day = {row["day"]: row for row in rows}
+    zeros = {m: 0 for m in ROLLUP_METRICS}
+    return [by_day.get(day) or {"day": day, **zeros} for day in _day_range(start, end)]
+
+
+def _gaps(present: set[date], start: date, end: date) -> list[tuple[date, date]]:
+    # [from, to) runs of days in [start, end) that are not in `present`
+    ranges = []
+    for day in _day_range(start, end):
+        if day in present:
+            continue
+        if ranges and ranges[-1][1] == day:
+            ranges[-1] = (ranges[-1][0], day + timedelta(days=1))
+        else:
+            ranges.append((day, day + timedelta(days=1)))
+    return ranges
+
+
+async def _missing_ranges(db: AsyncSession, today: date) -> list[tuple[date, date]]:
+    # [from, to) runs of completed days without a rollup row, oldest first
+
+    day = DailyCustomerRollup.day
+    count, first_day, last_day, first_signup = (await db.execute(
+        select(
+            func.count(), func.min(day), func.max(day),
+            select(func.min(Customer.signup_date)).scalar_subquery()
+        ).select_from(DailyCustomerRollup)
+    )).one()
+    if first_signup is None:
+        return []
+    start = _as_date(first_signup)
+    if not count:
+        return [(start, today)] if start < today else []
+
+    first_day, last_day = _as_date(first_day), _as_date(last_day)
+    if first_day <= start and (last_day - first_day).days + 1 == count:
+        # Contiguous from the first signup: only the tail is missing
+        tail = last_day + timedelta(days=1)
+        return [(tail, today)] if tail < today else []
+
+    # Holes left by invalidated days (or signups backdated before the first row)
+    present = {_as_date(value) for value in await db.scalars(select(day))}
+    return _gaps(present, min(start, first_day), today)
+
+
+async def extend_rollups(db: AsyncSession, today: Optional[date] = None) -> int:
+    # Aggregate and insert rollup rows for every completed day that has none; returns days added
+
+    today = today or datetime.utcnow().date()
+    async with _extend_lock:
+        ranges = await _missing_ranges(db, today)
+        if ranges and pin_to_primary(db):
+            # Read from a replica, which may lag: decide and aggregate on the primary
+            ranges = await _missing_ranges(db, today)
+
+        for _ in range(EXTEND_ATTEMPTS):
+            if not ranges:
+                return 0
+            # Read before aggregating, so the rows reflect every write up to this generation
+            generation = await db.scalar(select(RollupGeneration.generation))
+            queries = ranges if len(ranges) <= MAX_RANGE_QUERIES else [(ranges[0][0], ranges[-1][1])]
+            aggregated = {}
+            for start, end in queries:
+                rows = await aggregate_days(db, datetime.combine(start, time.min), datetime.combine(end, time.min))
+                aggregated.update((row["day"], row) for row in _zero_filled(rows, start, end))
+            rows = [aggregated[day] for start, end in ranges for day in _day_range(start, end)]
+
+            try:
+                if not await _claim_generation(db, generation):
+                    # A write deleted rollup days meanwhile; some of these rows may predate it
+                    await db.rollback()
+                    ranges = await _missing_ranges(db, today)
+                    continue
+                await db.execute(insert(DailyCustomerRollup), rows)
+                await db.commit()
+            except IntegrityError:
+                # Another worker extended the same days first
+                await db.rollback()
+                return 0
+            return len(rows)
+        return 0
+
+
+async def rebuild_rollups(db: AsyncSession) -> int:
+    # Drop and recompute every completed day (after backfills or historical edits)
+    async with _extend_lock:
+        await db.execute(delete(DailyCustomerRollup))
+        await db.commit()
+    return await extend_rollups(db)
+
+
+async def bucketed_rollups(
+    db: AsyncSession,
+    start: date,
+    end: date,
+    granularity: Granularity
+) -> tuple[dict, list[dict]]:
+    # (totals before start, bucketed metrics for start..end inclusive)
+
+    await extend_rollups(db)
+    dialect = db.get_bind().dialect.name
+    today = datetime.utcnow().date()
+    day = DailyCustomerRollup.day
+
+    # Running totals carried into the first bucket
+    base = (await db.execute(select(
+        func.coalesce(func.sum(DailyCustomerRollup.signups - DailyCustomerRollup.churns), 0),
+        func.coalesce(func.sum(DailyCustomerRollup.new_mrr - DailyCustomerRollup.churned_mrr), 0.0),
+    ).where(day < start))).one()
+
+    bucket = bucket_expr(day, granularity, dialect).label("bucket")
+    rows = (await db.execute(
+        select(bucket, *[func.sum(getattr(DailyCustomerRollup, m)).label(m) for m in ROLLUP_METRICS])
+        .where(day >= start, day <= end)
+        .group_by(bucket)
+        .order_by(bucket)
+    )).all()
+
+    buckets = {
+        _as_date(row.bucket): {m: getattr(row, m) or 0 for m in ROLLUP_METRICS}
+        for row in rows
+    }
+
+    # The current day is not rolled up yet - aggregate it live
+    if start <= today <= end:
+        live_rows = await aggregate_days(db, datetime.combine(today, time.min), datetime.utcnow() + timedelta(seconds=1))
+        for live in live_rows:
+            target = buckets.setdefault(bucket_start(today, granularity), {m: 0 for m in ROLLUP_METRICS})
+            for m in ROLLUP_METRICS:
+                target[m] += live[m]
+
+    series = [{"period": period, **values} for period, values in sorted(buckets.items())]
+    return {"customers": int(base[0]), "mrr": float(base[1])}, series
+
+
+def _revenue_over_time(base: dict, series: list[dict]) -> list[dict]:
+    mrr = base["mrr"]
+    points = []
+    for b in series:
+        mrr += b["new_mrr"] - b["churned_mrr"]
+        points.append({
+            "period": b["period"],
+            "mrr": round(mrr, 2),
+            "new_mrr": round(b["new_mrr"], 2),
+            "churned_mrr": round(b["churned_mrr"], 2),
+        })
+    return points
+
+
+def _mrr_growth(base: dict, series: list[dict]) -> list[dict]:
+    mrr = base["mrr"]
+    points = []
+    for b in series:
+        net_new = b["new_mrr"] - b["churned_mrr"]
+        points.append({
+            "period": b["period"],
+            "net_new_mrr": round(net_new, 2),
+            "growth_rate": round(net_new / mrr * 100, 2) if mrr > 0 else None,
+            "mrr": round(mrr + net_new, 2),
+        })
+        mrr += net_new
+    return points
+
+
+def _customer_churn(base: dict, series: list[dict]) -> list[dict]:
+    customers = base["customers"]
+    points = []
+    for b in series:
+        # Churn rate relative to customers active at the start of the bucket
+        points.append({
+            "period": b["period"],
+            "churned_customers": b["churns"],
+            "churn_rate": round(b["churns"] / customers * 100, 2) if customers > 0 else None,
+            "active_at_start": customers,
+        })
+        customers += b["signups"] - b["churns"]
+    return points
+
+
+def _customer_activity(base: dict, series: list[dict]) -> list[dict]:
+    return [
+        {"period": b["period"], "active_customers": b["active_customers"], "signups": b["signups"]}
+        for b in series
+    ]
+
+
+CHART_BUILDERS = {
+    "revenue-over-time": _revenue_over_time,
+    "mrr-growth": _mrr_growth,
+    "customer-churn": _customer_churn,
+    "customer-activity": _customer_activity,
+}
+
+
+async def chart_series(
+    db: AsyncSession,
+    chart_id: str,
+    start: date,
+    end: date,
+    granularity: Granularity
+) -> list[dict]:
+    # Data points for one time-series chart
+    if chart_id not in CHART_BUILDERS:
+        raise UnsupportedChart(f"Chart {chart_id} is not a time-series chart")
+    base, series = await bucketed_rollups(db, start, end, granularity)
+    return CHART_BUILDERS[chart_id](base, series)
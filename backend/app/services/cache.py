@@ -0,0 +1,164 @@
+# Read-through response cache for the customer read endpoints
+#
+# Serialized JSON bodies are cached per endpoint and normalized query
+# parameters, together with a strong ETag. Writes bump a generation number
+# that is part of every key, so everything cached before a write is
+# unreachable immediately and ages out of the LRU. A request whose
+# If-None-Match matches a cached ETag is answered with 304 straight from the
+# cache - no database access and no serialization.
+#
+# Clients inside their read-your-writes window (the cookie set after a write)
+# skip cache reads: another worker may still hold entries from before their
+# write. They get a freshly produced body, still with an ETag and 304 check.
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, NamedTuple, Optional, Protocol
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from app.config import settings
+from app.database import wrote_recently
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+
+
+class CacheBackend(Protocol):
+    # Minimal interface for pluggable stores (e.g. Redis for cross-process sharing)
+
+    def get(self, key: str) -> Optional[CachedResponse]: ...
+    def set(self, key: str, value: CachedResponse, ttl: float) -> None: ...
+    def clear(self) -> None: ...
+
+
+class MemoryTTLCache:
+    # In-process LRU with per-entry expiry
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, CachedResponse]] = OrderedDict()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: CachedResponse, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def make_etag(body: bytes) -> str:
+    # Strong validator: identical bytes <=> identical ETag
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+class ResponseCache:
+    """
+    Generation-versioned response cache
+
+    - key(): namespace + normalized parameters + current generation
+    - invalidate(): bumps the generation (called by every customer write)
+    - the backend can be swapped with set_backend()
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def set_backend(self, backend: CacheBackend):
+        self.backend = backend
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+
+    def key(self, namespace: str, params: dict) -> str:
+        normalized = json.dumps(jsonable_encoder(params), sort_keys=True, separators=(",", ":"))
+        return f"{self._generation}:{namespace}:{normalized}"
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        return self.backend.get(key) if self.ttl > 0 else None
+
+    def put(self, key: str, body: bytes) -> CachedResponse:
+        entry = CachedResponse(body, make_etag(body))
+        if self.ttl > 0:
+            self.backend.set(key, entry, self.ttl)
+        return entry
+
+
+response_cache = ResponseCache(
+    MemoryTTLCache(settings.response_cache_max_entries),
+    ttl=settings.response_cache_ttl_seconds
+)
+
+
+def _to_json(payload: Any) -> bytes:
+    # pydantic models serialize themselves; plain dicts go through the stdlib encoder
+    if isinstance(payload, bytes):
+        # Already encoded (e.g. the projection fast path)
+        return payload
+    if hasattr(payload, "model_dump_json"):
+        return payload.model_dump_json().encode("utf-8")
+    return json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode("utf-8")
+
+
+async def cached_json_response(
+    request: Request,
+    namespace: str,
+    params: dict,
+    produce: Callable[[], Awaitable[Any]],
+    use_cache: bool = True
+) -> Response:
+    # Serve from cache (or 304) when possible, otherwise produce, serialize and cache
+
+    entry = None
+    key = response_cache.key(namespace, params)
+    if use_cache and not wrote_recently(request):
+        entry = response_cache.get(key)
+
+    if entry is None:
+        body = _to_json(await produce())
+        # A write during the query bumped the generation: serve the body but don't cache it
+        if use_cache and key == response_cache.key(namespace, params):
+            entry = response_cache.put(key, body)
+        else:
+            entry = CachedResponse(body, make_etag(body))
+
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
@@ -0,0 +1,196 @@
+# Change feed: committed customer writes pushed to dashboard clients
+#
+# The write handlers publish compact events (through customer_events) to an
+# in-process broadcaster. Every SSE / WebSocket connection is a subscriber
+# with a bounded queue; publishing never waits on a client. A subscriber that
+# falls queue_size events behind is disconnected instead and resumes by
+# reconnecting with the id of the last event it saw, which is replayed from a
+# short ring buffer of recent events. When that id is too old (or from a
+# previous process) the client gets a "reset" event telling it to refetch.
+#
+# Event ids are "<epoch>-<sequence>": the epoch changes on every process
+# start, so ids from another process (or worker) are never replayed wrongly.
+
+import asyncio
+import json
+import secrets
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from app.config import settings
+from app.utils.metrics import change_feed_events, change_feed_lagged, change_feed_subscribers
+
+RESET = "reset"
+READY = "ready"
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    id: str
+    type: str
+    data: dict
+
+    def payload(self) -> dict:
+        return {"id": self.id, "type": self.type, **self.data}
+
+    def json(self) -> str:
+        return json.dumps(self.payload(), separators=(",", ":"), default=str)
+
+
+class FeedClosed(Exception):
+    # The subscription was dropped (lagging client or shutdown); reconnect with the last event id
+    pass
+
+
+# Queued in place of events when a subscription is dropped
+_CLOSED = object()
+
+
+class Subscription:
+    """
+    One connected client
+
+    - backlog: replayed events, delivered before anything queued
+    - queue: live events, bounded; overflowing it drops the subscription
+    - next(): the next event, None on heartbeat timeout, FeedClosed once dropped
+    """
+
+    def __init__(self, queue_size: int, backlog: list[ChangeEvent]):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.backlog = deque(backlog)
+        self.lagged = False
+        self.closed = False
+
+    def offer(self, event: ChangeEvent) -> bool:
+        # Called by the broadcaster; False when the client is too far behind
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def close(self, lagged: bool = False):
+        # Discard what is queued (the client replays it on reconnect) and wake the reader
+        if self.closed:
+            return
+        self.closed, self.lagged = True, lagged
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(_CLOSED)
+
+    async def next(self, timeout: float) -> Optional[ChangeEvent]:
+        if self.backlog and not self.closed:
+            return self.backlog.popleft()
+        try:
+            event = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if event is _CLOSED:
+            raise FeedClosed()
+        return event
+
+
+class ChangeBroadcaster:
+    """
+    In-process fan-out of change events
+
+    - publish(): assign the next id, remember it for replay, offer it to every subscriber
+    - subscribe(last_event_id): new subscription, with missed events (or a reset) as its backlog
+    - stats(): subscriber and event counts for /health
+    """
+
+    def __init__(self, queue_size: int, replay_size: int, max_subscribers: int):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.epoch = secrets.token_hex(4)
+        self._sequence = 0
+        self._replay: deque[ChangeEvent] = deque(maxlen=replay_size)
+        self._subscribers: set[Subscription] = set()
+        self.published = 0
+        self.lagged = 0
+
+    @property
+    def last_event_id(self) -> Optional[str]:
+        return self._replay[-1].id if self._replay else None
+
+    def publish(self, event_type: str, data: dict) -> ChangeEvent:
+        self._sequence += 1
+        event = ChangeEvent(
+            f"{self.epoch}-{self._sequence}",
+            event_type,
+            {**data, "at": datetime.utcnow().isoformat()}
+        )
+        self._replay.append(event)
+        self.published += 1
+        change_feed_events.inc(type=event_type)
+        for subscription in list(self._subscribers):
+            if not subscription.offer(event):
+                self._drop(subscription, lagged=True)
+        return event
+
+    def _backlog(self, last_event_id: Optional[str]) -> list[ChangeEvent]:
+        # Events after last_event_id, or a reset when they can't all be replayed
+        if not last_event_id:
+            return []
+        epoch, _, sequence = last_event_id.partition("-")
+        if epoch == self.epoch and sequence.isdigit():
+            # The buffer holds consecutive sequence numbers ending at self._sequence
+            missed = self._sequence - int(sequence)
+            if 0 <= missed <= len(self._replay):
+                return list(self._replay)[len(self._replay) - missed:]
+        reset_id = self.last_event_id or f"{self.epoch}-0"
+        return [ChangeEvent(reset_id, RESET, {"reason": "missed events can't be replayed; refetch"})]
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Optional[Subscription]:
+        # None when the subscriber limit is reached
+        if len(self._subscribers) >= self.max_subscribers:
+            return None
+        subscription = Subscription(self.queue_size, self._backlog(last_event_id))
+        self._subscribers.add(subscription)
+        change_feed_subscribers.set(len(self._subscribers))
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+        change_feed_subscribers.set(len(self._subscribers))
+
+    def _drop(self, subscription: Subscription, lagged: bool):
+        subscription.close(lagged=lagged)
+        self.unsubscribe(subscription)
+        if lagged:
+            self.lagged += 1
+            change_feed_lagged.inc()
+
+    def close(self):
+        # Shutdown: end every open stream so the server can stop
+        for subscription in list(self._subscribers):
+            self._drop(subscription, lagged=False)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "lagged_disconnects": self.lagged,
+            "last_event_id": self.last_event_id,
+        }
+
+
+change_feed = ChangeBroadcaster(
+    queue_size=settings.change_feed_queue_size,
+    replay_size=settings.change_feed_replay_size,
+    max_subscribers=settings.change_feed_max_subscribers
+)
+
+
+def ready_event() -> ChangeEvent:
+    # First event on a new connection: the current position, to resume from later
+    return ChangeEvent(change_feed.last_event_id or f"{change_feed.epoch}-0", READY, {})
+
+
+def sse_message(event: Optional[ChangeEvent]) -> str:
+    # One text/event-stream message; None is a keep-alive comment
+    if event is None:
+        return f": keep-alive {int(time.time())}\n\n"
+    return f"id: {event.id}\nevent: {event.type}\ndata: {event.json()}\n\n"
@@ -0,0 +1,111 @@
+# Scheduled churn detection
+#
+# Active customers whose last activity (or signup, if they never had any) is
+# older than CHURN_INACTIVITY_DAYS are marked churned with set-based UPDATEs
+# over primary key ranges: one short transaction per chunk, so a lock is never
+# held for long and no customer rows are loaded into Python.
+#
+# churned_date is the detection time. Churn therefore lands on the current,
+# live-aggregated day, so closed chart rollups and closed cohort months stay
+# valid; the stats snapshot gets one aggregate delta per chunk.
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import and_, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.customer import Customer
+from app.services.customer_events import customer_write, customers_churned
+
+logger = logging.getLogger(__name__)
+
+# Result of the most recent run in this process (reported by /health)
+last_run: Optional[dict] = None
+
+
+def churn_due(cutoff: datetime):
+    # Active customers with no activity since cutoff
+    return and_(
+        Customer.is_active == True,
+        func.coalesce(Customer.last_activity, Customer.signup_date) < cutoff
+    )
+
+
+async def _churn_chunk(db: AsyncSession, low: int, high: int, cutoff: datetime, now: datetime) -> dict:
+    # Mark one id range churned; returns {plan: (customers, mrr)} for the rows it touched
+    in_range = and_(Customer.id >= low, Customer.id < high)
+    result = await db.execute(
+        update(Customer)
+        .where(in_range, churn_due(cutoff))
+        .values(is_active=False, churned_date=now)
+        .execution_options(synchronize_session=False)
+    )
+    per_plan = {}
+    if result.rowcount:
+        # Same transaction: exactly the rows this UPDATE stamped with `now`
+        rows = await db.execute(
+            select(Customer.plan, func.count(), func.coalesce(func.sum(Customer.mrr), 0.0))
+            .where(in_range, Customer.is_active == False, Customer.churned_date == now)
+            .group_by(Customer.plan)
+        )
+        per_plan = {plan: (count, float(mrr)) for plan, count, mrr in rows}
+    await db.commit()
+    return per_plan
+
+
+async def detect_churn(
+    session_factory: async_sessionmaker = AsyncSessionLocal,
+    now: Optional[datetime] = None
+) -> dict:
+    # One pass over the customers table; returns how many customers were churned
+
+    global last_run
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=settings.churn_inactivity_days)
+    chunk_size = settings.churn_job_chunk_size
+    start = time.perf_counter()
+    churned, chunks, per_plan_total = 0, 0, {}
+
+    async with session_factory() as db:
+        low, high = (await db.execute(select(func.min(Customer.id), func.max(Customer.id)))).one()
+        await db.rollback()
+
+        for chunk_start in range(low or 0, (high or -1) + 1, chunk_size):
+            with customer_write():
+                per_plan = await _churn_chunk(db, chunk_start, chunk_start + chunk_size, cutoff, now)
+                if per_plan:
+                    customers_churned(per_plan)
+            chunks += 1
+            for plan, (count, _) in per_plan.items():
+                churned += count
+                per_plan_total[plan.value] = per_plan_total.get(plan.value, 0) + count
+            # Let queued writers in between chunks
+            await asyncio.sleep(settings.churn_job_chunk_pause_seconds)
+
+    last_run = {
+        "ran_at": now.isoformat(),
+        "inactive_since": cutoff.isoformat(),
+        "churned": churned,
+        "per_plan": per_plan_total,
+        "chunks": chunks,
+        "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+    logger.info(
+        "Churn job: %d customers inactive since %s marked churned (%d chunks, %.0f ms)",
+        churned, cutoff.date(), chunks, last_run["duration_ms"]
+    )
+    return last_run
+
+
+async def run_churn_job():
+    # Background task started by the API's lifespan; idempotent, so every worker may run it
+    while True:
+        try:
+            await detect_churn()
+        except Exception as e:
+            logger.warning("Churn job failed: %s: %s", type(e).__name__, e)
+        await asyncio.sleep(settings.churn_job_interval_seconds)
@@ -0,0 +1,193 @@
+# Cohort retention matrix (signup month x months since signup)
+#
+# The database groups customers by (signup month, churn month) in a single
+# query, so only a few thousand count rows ever leave SQL. NumPy turns those
+# counts into the triangular matrix with bincount + cumsum.
+#
+# Cells for months that have already ended rarely change (churns are dated
+# when they happen), so they are cached. A refresh only re-queries the open
+# parts: the current month's cohort and churns dated in the current month.
+# Writes that do reach into closed months - backdated signups, historical
+# imports, reactivating or deleting a churned customer - drop the cache.
+
+import asyncio
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Optional
+import numpy as np
+from sqlalchemy import Integer, and_, case, cast, extract, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.customer import Customer
+
+
+def month_index_expr(column):
+    # Months since year 0 for a timestamp column (portable across SQLite/Postgres)
+    return cast(extract("year", column), Integer) * 12 + cast(extract("month", column), Integer) - 1
+
+
+def month_index(value: date) -> int:
+    return value.year * 12 + value.month - 1
+
+
+def month_label(index: int) -> str:
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def month_start(index: int) -> datetime:
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+# (signup month, churn month or None) a customer is counted under
+CohortKey = tuple[int, Optional[int]]
+
+
+def cohort_key(signup_date: Optional[datetime], churned_date: Optional[datetime], is_active: Optional[bool]) -> Optional[CohortKey]:
+    # Same rule as _grouped_query: a churn counts once inactive with a churn date
+    if signup_date is None:
+        return None
+    churned = is_active is False and churned_date is not None
+    return month_index(signup_date), month_index(churned_date) if churned else None
+
+
+def _closed_part(key: Optional[CohortKey], current: int) -> Optional[CohortKey]:
+    # What a customer contributes to the cached cells of months before `current`
+    if key is None or key[0] >= current:
+        return None
+    signup, churn = key
+    return signup, churn if churn is not None and churn < current else None
+
+
+def _grouped_query(where, churn_cutoff: Optional[datetime]):
+    # (signup month, churn month or NULL, customers) grouped in the database
+    churned = and_(Customer.is_active == False, Customer.churned_date.isnot(None))
+    if churn_cutoff is not None:
+        churned = and_(churned, Customer.churned_date < churn_cutoff)
+    signup_month = month_index_expr(Customer.signup_date).label("signup_month")
+    churn_month = case((churned, month_index_expr(Customer.churned_date))).label("churn_month")
+    return (
+        select(signup_month, churn_month, func.count().label("customers"))
+        .where(where)
+        .group_by(signup_month, churn_month)
+    )
+
+
+def _as_arrays(rows) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    signup = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    churn = np.fromiter((-1 if r[1] is None else r[1] for r in rows), dtype=np.int64, count=len(rows))
+    count = np.fromiter((r[2] for r in rows), dtype=np.int64, count=len(rows))
+    return signup, churn, count
+
+
+@dataclass
+class ClosedCohorts:
+    # Final counts for every cohort that signed up before `current_month`
+    current_month: int
+    first_month: int
+    sizes: np.ndarray      # (cohorts,)
+    churns: np.ndarray     # (cohorts, periods) churns per months-since-signup
+
+
+def _accumulate(sizes, churns, first_month, signup, churn, count, add_sizes):
+    # Scatter grouped counts into the size vector and churn matrix
+    cohort = signup - first_month
+    sizes += np.bincount(cohort[add_sizes], weights=count[add_sizes], minlength=len(sizes)).astype(np.int64)
+    has_churn = churn >= 0
+    if has_churn.any():
+        periods = churns.shape[1]
+        period = np.clip(churn[has_churn] - signup[has_churn], 0, periods - 1)
+        flat = cohort[has_churn] * periods + period
+        churns += np.bincount(flat, weights=count[has_churn], minlength=churns.size).astype(np.int64).reshape(churns.shape)
+
+
+class CohortEngine:
+    """
+    Builds and caches the cohort retention matrix
+
+    - closed cohorts/periods are computed once per calendar month
+    - each refresh re-queries only the current cohort and this month's churns
+    - record_change() drops them when a write changes a closed month's cells
+    - invalidate() forces a full rebuild
+    """
+
+    def __init__(self):
+        self._closed: Optional[ClosedCohorts] = None
+        self._lock = asyncio.Lock()
+        # Bumped by every invalidation; a load that raced one isn't cached
+        self._generation = 0
+
+    def invalidate(self):
+        self._closed = None
+        self._generation += 1
+
+    def record_change(self, old: Optional[CohortKey], new: Optional[CohortKey]):
+        # A write moved a customer from cohort key `old` to `new` (None: created / deleted)
+        closed = self._closed
+        current = closed.current_month if closed else month_index(datetime.utcnow().date())
+        if _closed_part(old, current) != _closed_part(new, current):
+            self.invalidate()
+
+    async def _load_closed(self, db: AsyncSession, current: int) -> ClosedCohorts:
+        cutoff = month_start(current)
+        rows = (await db.execute(_grouped_query(Customer.signup_date < cutoff, churn_cutoff=cutoff))).all()
+        if not rows:
+            return ClosedCohorts(current, current, np.zeros(0, np.int64), np.zeros((0, 1), np.int64))
+
+        signup, churn, count = _as_arrays(rows)
+        first = int(signup.min())
+        cohorts = current - first
+        sizes = np.zeros(cohorts, np.int64)
+        churns = np.zeros((cohorts, cohorts), np.int64)
+        _accumulate(sizes, churns, first, signup, churn, count, add_sizes=np.ones(len(rows), bool))
+        return ClosedCohorts(current, first, sizes, churns)
+
+    async def matrix(self, db: AsyncSession, today: Optional[date] = None) -> dict:
+        # Full retention matrix as of today
+
+        current = month_index(today or datetime.utcnow().date())
+        async with self._lock:
+            closed = self._closed
+            if closed is None or closed.current_month != current:
+                generation = self._generation
+                closed = await self._load_closed(db, current)
+                if generation == self._generation:
+                    self._closed = closed
+
+        # Open parts: the current cohort, and churns dated this month in any cohort
+        cutoff = month_start(current)
+        rows = (await db.execute(_grouped_query(
+            or_(Customer.signup_date >= cutoff, Customer.churned_date >= cutoff),
+            churn_cutoff=None
+        ))).all()
+
+        first = closed.first_month
+        cohorts = current - first + 1
+        sizes = np.zeros(cohorts, np.int64)
+        churns = np.zeros((cohorts, cohorts), np.int64)
+        sizes[:len(closed.sizes)] = closed.sizes
+        churns[:len(closed.sizes), :closed.churns.shape[1]] = closed.churns
+
+        if rows:
+            signup, churn, count = _as_arrays(rows)
+            # Signups outside the cohort range can only come from backdated/future-dated edits
+            keep = (signup >= first) & (signup <= current)
+            signup, churn, count = signup[keep], churn[keep], count[keep]
+            _accumulate(sizes, churns, first, signup, churn, count, add_sizes=signup == current)
+
+        retained = sizes[:, None] - np.cumsum(churns, axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rates = np.where(sizes[:, None] > 0, retained / sizes[:, None] * 100, 0.0)
+
+        result = []
+        for c in range(cohorts):
+            # Triangle: cohort c has been observed for (cohorts - c) months
+            observed = cohorts - c
+            result.append({
+                "cohort": month_label(first + c),
+                "size": int(sizes[c]),
+                "retained": retained[c, :observed].tolist(),
+                "retention": np.round(rates[c, :observed], 2).tolist(),
+            })
+        return {"as_of": month_label(current), "periods": cohorts, "cohorts": result}
+
+
+cohort_engine = CohortEngine()
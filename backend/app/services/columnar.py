@@ -0,0 +1,347 @@
+# Columnar in-memory snapshot of the customers table for analytics
+#
+# The analytic columns of every customer live in NumPy arrays sorted by id,
+# with plan and industry dictionary encoded as small integer codes. Filtered
+# summaries and LTV aggregates are then a few vectorized passes instead of a
+# table scan.
+#
+# The snapshot is built once with a streamed full load. After that it is
+# refreshed incrementally: rows whose updated_at is at or past the watermark
+# (minus a small overlap for same-second and late-committing writes) are
+# re-read and upserted by id. Deletes leave no row behind to pull, so they
+# are handled separately: this process' delete handler queues the id, and a
+# periodic reconcile compares count/sum(id) with the table and, on a mismatch,
+# diffs the id column.
+
+import asyncio
+import enum
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+import numpy as np
+from sqlalchemy import String, func, select, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.models.customer import Customer, PlanType
+from app.services.stats import build_ltv_summary, build_summary
+
+class AnalyticsSource(str, enum.Enum):
+    COLUMNAR = "columnar"
+    SQL = "sql"
+
+
+PLANS = list(PlanType)
+PLAN_CODES = {plan.name: code for code, plan in enumerate(PLANS)}
+PLAN_CODES.update({plan.value: code for code, plan in enumerate(PLANS)})
+
+# Raw column values (no per-row enum/datetime processing): codes and
+# timestamps are converted in bulk by NumPy
+COLUMNS = (
+    Customer.id,
+    type_coerce(Customer.plan, String),
+    Customer.industry,
+    Customer.mrr,
+    Customer.is_active,
+    type_coerce(Customer.signup_date, String),
+    type_coerce(Customer.churned_date, String),
+    type_coerce(Customer.updated_at, String),
+)
+
+EMPTY = {
+    "id": np.empty(0, dtype=np.int64),
+    "plan": np.empty(0, dtype=np.int8),
+    "industry": np.empty(0, dtype=np.int32),
+    "mrr": np.empty(0, dtype=np.float64),
+    "is_active": np.empty(0, dtype=bool),
+    "signup_date": np.empty(0, dtype="datetime64[us]"),
+    "churned_date": np.empty(0, dtype="datetime64[us]"),
+}
+
+
+def _timestamps(values) -> np.ndarray:
+    # ISO strings (SQLite) or datetimes (Postgres) to datetime64; None -> NaT
+    return np.array(values, dtype="datetime64[us]")
+
+
+class ColumnarSnapshot:
+    """
+    In-process columnar copy of the customers table
+
+    - ensure_fresh(): full build on first use, then incremental refreshes
+      whenever the snapshot is older than columnar_max_staleness_seconds or a
+      write in this process marked it dirty
+    - record_delete(): drops a deleted id at the next refresh
+    - summary() / ltv_summary(): vectorized aggregates in the same shape as the SQL path
+    - staleness(): when the snapshot last caught up with the table
+    """
+
+    def __init__(self):
+        self.columns = dict(EMPTY)
+        self.industries: list[str] = []
+        self._industry_codes: dict[str, int] = {}
+        self.built = False
+        self.watermark: Optional[np.datetime64] = None
+        self.refreshed_at = 0.0
+        self.refreshed_wall: Optional[datetime] = None
+        self._reconciled_at = 0.0
+        self._dirty = False
+        self._pending_deletes: set[int] = set()
+        self._lock = asyncio.Lock()
+
+    # -- maintenance ---------------------------------------------------------
+
+    def mark_dirty(self):
+        self._dirty = True
+
+    def record_delete(self, customer_id: int):
+        self._pending_deletes.add(customer_id)
+        self._dirty = True
+
+    def invalidate(self):
+        self.built = False
+
+    @property
+    def rows(self) -> int:
+        return len(self.columns["id"])
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in self.columns.values())
+
+    def staleness(self) -> dict:
+        return {
+            "as_of": self.refreshed_wall.isoformat() if self.refreshed_wall else None,
+            "staleness_seconds": round(time.monotonic() - self.refreshed_at, 3) if self.built else None,
+            "rows": self.rows,
+        }
+
+    def _is_fresh(self) -> bool:
+        return self.built and not self._dirty and time.monotonic() - self.refreshed_at < settings.columnar_max_staleness_seconds
+
+    async def ensure_fresh(self, db: AsyncSession):
+        if self._is_fresh():
+            return
+        async with self._lock:
+            # Checked again: requests queued on the lock behind a refresh find it already done
+            if self._is_fresh():
+                return
+            if not self.built:
+                await self._build(db)
+            else:
+                await self._refresh(db)
+
+    def _encode_industry(self, values) -> np.ndarray:
+        # Codes into the industry dictionary, extended with values not seen before
+        codes = self._industry_codes
+        industries = self.industries
+
+        def code(value):
+            if value is None:
+                return -1
+            found = codes.get(value)
+            if found is None:
+                found = codes[value] = len(industries)
+                industries.append(value)
+            return found
+
+        return np.fromiter((code(v) for v in values), dtype=np.int32, count=len(values))
+
+    def _to_columns(self, rows: list) -> tuple[dict, Optional[np.datetime64]]:
+        # One partition of COLUMNS rows as arrays, plus its max updated_at
+        ids, plans, industries, mrr, active, signup, churned, updated = zip(*rows)
+        columns = {
+            "id": np.array(ids, dtype=np.int64),
+            "plan": np.fromiter((PLAN_CODES[p] for p in plans), dtype=np.int8, count=len(plans)),
+            "industry": self._encode_industry(industries),
+            "mrr": np.array(mrr, dtype=np.float64),
+            "is_active": np.array(active, dtype=bool),
+            "signup_date": _timestamps(signup),
+            "churned_date": _timestamps(churned),
+        }
+        updated_at = _timestamps(updated)
+        updated_at = updated_at[~np.isnat(updated_at)]
+        return columns, (updated_at.max() if len(updated_at) else None)
+
+    async def _load(self, db: AsyncSession, *where) -> tuple[dict, Optional[np.datetime64]]:
+        # Stream matching rows in partitions and concatenate them column by column
+        # (a full load comes back in id order; filtered loads are sorted by _upsert)
+        query = select(*COLUMNS).where(*where)
+        result = await db.stream(query.execution_options(yield_per=settings.columnar_batch_size))
+        parts, watermark = [], None
+        async for partition in result.partitions():
+            columns, part_max = self._to_columns(partition)
+            parts.append(columns)
+            if part_max is not None and (watermark is None or part_max > watermark):
+                watermark = part_max
+        if not parts:
+            return dict(EMPTY), None
+        return {name: np.concatenate([p[name] for p in parts]) for name in EMPTY}, watermark
+
+    def _advance(self, watermark: Optional[np.datetime64]):
+        if watermark is not None and (self.watermark is None or watermark > self.watermark):
+            self.watermark = watermark
+
+    async def _build(self, db: AsyncSession):
+        started, started_wall = time.monotonic(), datetime.utcnow()
+        self._dirty = False
+        self._pending_deletes.clear()
+        # Industry codes are only ever appended, so a rebuild keeps the dictionary
+        # (and readers of the previous arrays keep decoding correctly)
+        self.columns, watermark = await self._load(db)
+        self.watermark = None
+        self._advance(watermark)
+        self.built = True
+        self._reconciled_at = started
+        self.refreshed_at, self.refreshed_wall = started, started_wall
+
+    async def _refresh(self, db: AsyncSession):
+        started, started_wall = time.monotonic(), datetime.utcnow()
+        self._dirty = False
+        deletes, self._pending_deletes = self._pending_deletes, set()
+        if deletes:
+            self._drop(np.fromiter(deletes, dtype=np.int64))
+
+        watermark = None
+        if self.watermark is not None:
+            since = self.watermark.astype(datetime) - timedelta(seconds=settings.columnar_watermark_overlap_seconds)
+            changed, watermark = await self._load(db, Customer.updated_at >= since)
+            self._upsert(changed)
+
+        if self.watermark is None or started - self._reconciled_at >= settings.columnar_reconcile_interval_seconds:
+            await self._reconcile(db)
+            self._reconciled_at = started
+        self._advance(watermark)
+        self.refreshed_at, self.refreshed_wall = started, started_wall
+
+    async def _reconcile(self, db: AsyncSession):
+        # Catch deletes (and rows without updated_at) made outside this process
+        count, id_sum = (await db.execute(select(func.count(Customer.id), func.sum(Customer.id)))).one()
+        ids = self.columns["id"]
+        if count == len(ids) and int(id_sum or 0) == int(ids.sum()):
+            return
+        table_ids = np.array((await db.execute(select(Customer.id).order_by(Customer.id))).scalars().all(), dtype=np.int64)
+        self._drop(ids[~np.isin(ids, table_ids, assume_unique=True)])
+        missing = table_ids[~np.isin(table_ids, self.columns["id"], assume_unique=True)]
+        for start in range(0, len(missing), settings.columnar_batch_size):
+            chunk = missing[start:start + settings.columnar_batch_size].tolist()
+            changed, watermark = await self._load(db, Customer.id.in_(chunk))
+            self._upsert(changed)
+            self._advance(watermark)
+
+    def _drop(self, ids: np.ndarray):
+        if not len(ids):
+            return
+        keep = ~np.isin(self.columns["id"], ids)
+        self.columns = {name: array[keep] for name, array in self.columns.items()}
+
+    def _upsert(self, changed: dict):
+        # Overwrite rows already present (matched by id), append the rest in id order
+        if not len(changed["id"]):
+            return
+        order = np.argsort(changed["id"], kind="stable")
+        changed = {name: array[order] for name, array in changed.items()}
+        new_ids = changed["id"]
+        current = self.columns
+        ids = current["id"]
+        position = np.searchsorted(ids, new_ids)
+        exists = position < len(ids)
+        exists[exists] = ids[position[exists]] == new_ids[exists]
+
+        # In place: aggregates never run concurrently with this (no await in between)
+        for name, array in current.items():
+            array[position[exists]] = changed[name][exists]
+        if exists.all():
+            return
+        added = ~exists
+        columns = {name: np.concatenate([current[name], changed[name][added]]) for name in current}
+        if len(ids) and new_ids[added].min() < ids[-1]:
+            order = np.argsort(columns["id"], kind="stable")
+            columns = {name: array[order] for name, array in columns.items()}
+        self.columns = columns
+
+    # -- aggregates ----------------------------------------------------------
+
+    def _mask(
+        self,
+        plans: Optional[list[PlanType]] = None,
+        is_active: Optional[bool] = None,
+        industries: Optional[list[str]] = None,
+        min_mrr: Optional[float] = None,
+        max_mrr: Optional[float] = None,
+        signup_from: Optional[datetime] = None,
+        signup_before: Optional[datetime] = None,
+    ) -> np.ndarray:
+        # Rows matching the filters (as given by filters.snapshot_filters)
+        c = self.columns
+        mask = np.ones(self.rows, dtype=bool)
+        if plans is not None:
+            mask &= np.isin(c["plan"], [PLANS.index(PlanType(plan)) for plan in plans])
+        if is_active is not None:
+            mask &= c["is_active"] == is_active
+        if industries is not None:
+            mask &= np.isin(c["industry"], [self._industry_codes.get(industry, -2) for industry in industries])
+        if min_mrr is not None:
+            mask &= c["mrr"] >= min_mrr
+        if max_mrr is not None:
+            mask &= c["mrr"] <= max_mrr
+        if signup_from is not None:
+            mask &= c["signup_date"] >= np.datetime64(signup_from, "us")
+        if signup_before is not None:
+            mask &= c["signup_date"] < np.datetime64(signup_before, "us")
+        return mask
+
+    def per_plan(self, **filters) -> dict:
+        # Same shape as stats.aggregate_by_plan: total/active counts and active MRR per plan
+        c = self.columns
+        mask = self._mask(**filters)
+        active = mask & c["is_active"]
+        totals = np.bincount(c["plan"][mask], minlength=len(PLANS))
+        actives = np.bincount(c["plan"][active], minlength=len(PLANS))
+        mrr = np.bincount(c["plan"][active], weights=c["mrr"][active], minlength=len(PLANS))
+        return {
+            plan: {"total": int(totals[i]), "active": int(actives[i]), "mrr": float(mrr[i])}
+            for i, plan in enumerate(PLANS)
+        }
+
+    def summary(self, **filters) -> dict:
+        return build_summary(self.per_plan(**filters))
+
+    def lifetime_values(self, mask: np.ndarray) -> np.ndarray:
+        # Customer.lifetime_value for the masked rows (same rule as the SQL expression)
+        c = self.columns
+        now = np.datetime64(datetime.utcnow(), "us")
+        churned_date = c["churned_date"][mask]
+        churned = ~c["is_active"][mask] & ~np.isnat(churned_date)
+        end = np.where(churned, churned_date, now)
+        days = (end - c["signup_date"][mask]) // np.timedelta64(1, "D")
+        months = np.where(days < 60, 1, days // 30)
+        return c["mrr"][mask] * months
+
+    def ltv_summary(self, **filters) -> dict:
+        # Same shape as stats.ltv_summary
+        mask = self._mask(**filters)
+        ltv = self.lifetime_values(mask)
+        plans = self.columns["plan"][mask]
+        counts = np.bincount(plans, minlength=len(PLANS))
+        totals = np.bincount(plans, weights=ltv, minlength=len(PLANS))
+        rows = [
+            (plan, int(counts[i]), float(totals[i]), float(ltv[plans == i].max()))
+            for i, plan in enumerate(PLANS)
+            if counts[i]
+        ]
+        return build_ltv_summary(rows)
+
+
+columnar_snapshot = ColumnarSnapshot()
+
+
+def use_columnar(source: Optional[AnalyticsSource]) -> bool:
+    if source is None:
+        return settings.columnar_snapshot_enabled
+    return source == AnalyticsSource.COLUMNAR
+
+
+async def columnar_aggregate(db: AsyncSession, aggregate) -> dict:
+    # Run aggregate(snapshot) on a fresh-enough snapshot and report its staleness
+    await columnar_snapshot.ensure_fresh(db)
+    return {**aggregate(columnar_snapshot), "snapshot": columnar_snapshot.staleness()}
@@ -0,0 +1,100 @@
+# Fan-out of committed customer writes to in-process derived state
+#
+# The write handlers call these after a successful commit so every cache,
+# snapshot and index derived from the customers table stays in step, and
+# connected dashboards get a change event. The commit and the call both run
+# inside customer_write(), so a snapshot recompute racing them isn't trusted.
+
+from typing import NamedTuple, Optional
+from app.models.customer import Customer, PlanType
+from app.services.analytics import RollupRow, rollup_row
+from app.services.cache import response_cache
+from app.services.change_feed import change_feed
+from app.services.cohorts import CohortKey, cohort_engine, cohort_key
+from app.services.columnar import columnar_snapshot
+from app.services.search import company_search
+from app.services.stats import StatsRow, stats_row, stats_snapshot
+
+
+class CustomerState(NamedTuple):
+    # A customer's contribution to the derived state, taken before an update or delete
+    stats: StatsRow
+    cohort: Optional[CohortKey]
+    rollup: RollupRow
+
+
+def customer_state(customer: Customer) -> CustomerState:
+    return CustomerState(
+        stats_row(customer),
+        cohort_key(customer.signup_date, customer.churned_date, customer.is_active),
+        rollup_row(customer)
+    )
+
+
+def customer_write():
+    # Hold from before a write's commit until its handler has run (see stats.StatsSnapshot.writing)
+    return stats_snapshot.writing()
+
+
+def _change(customer: Customer) -> dict:
+    # Compact event body: the columns dashboards aggregate on
+    plan, is_active, mrr = stats_row(customer)
+    return {"customer": {"id": customer.id, "plan": plan.value, "is_active": is_active, "mrr": mrr}}
+
+
+def customer_created(customer: Customer):
+    after = customer_state(customer)
+    stats_snapshot.record_change(None, after.stats)
+    # Backdated signups land in months the cohort matrix has already closed
+    cohort_engine.record_change(None, after.cohort)
+    columnar_snapshot.mark_dirty()
+    company_search.add(customer.company_name)
+    response_cache.invalidate()
+    change_feed.publish("customer.created", _change(customer))
+
+
+def customers_bulk_created(rows: list[dict]):
+    # Column dicts as inserted by the bulk ingest endpoint
+    for values in rows:
+        stats_snapshot.record_change(None, (values["plan"], values["is_active"], values["mrr"]))
+        cohort_engine.record_change(
+            None, cohort_key(values["signup_date"], values.get("churned_date"), values["is_active"])
+        )
+        company_search.add(values["company_name"])
+    columnar_snapshot.mark_dirty()
+    response_cache.invalidate()
+    # One event per batch rather than per row
+    if rows:
+        change_feed.publish("customers.bulk_created", {"count": len(rows)})
+
+
+def customer_updated(before: CustomerState, customer: Customer):
+    after = customer_state(customer)
+    stats_snapshot.record_change(before.stats, after.stats)
+    # Churning or reactivating a customer with a churn date in a closed month changes its cells
+    cohort_engine.record_change(before.cohort, after.cohort)
+    columnar_snapshot.mark_dirty()
+    company_search.add(customer.company_name)
+    response_cache.invalidate()
+    change_feed.publish("customer.updated", _change(customer))
+
+
+def customer_deleted(before: CustomerState, customer_id: int):
+    # The search index keeps the name until its next rebuild; it just matches fewer rows
+    stats_snapshot.record_change(before.stats, None)
+    columnar_snapshot.record_delete(customer_id)
+    cohort_engine.record_change(before.cohort, None)
+    response_cache.invalidate()
+    change_feed.publish("customer.deleted", {"customer": {"id": customer_id}})
+
+
+def customers_churned(per_plan: dict):
+    # {plan: (customers, mrr)} marked churned by the churn job; churns are dated
+    # today, so rollups and closed cohort months are unaffected
+    stats_snapshot.record_churn(per_plan)
+    columnar_snapshot.mark_dirty()
+    response_cache.invalidate()
+    change_feed.publish(
+        "customers.churned",
+        {"per_plan": {PlanType(plan).value: count for plan, (count, _) in per_plan.items()}}
+    )
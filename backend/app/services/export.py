@@ -0,0 +1,178 @@
+# Streaming export of the customers table (CSV / NDJSON / Arrow IPC)
+#
+# Rows are read through a server-side cursor with yield_per and encoded one
+# partition at a time, so memory stays constant regardless of table size.
+
+import csv
+import enum
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator
+from sqlalchemy import select
+from app.database import read_session
+from app.models.customer import Customer, PlanType
+
+# Raw table columns only - derived metrics are left to the warehouse
+EXPORT_COLUMNS = [
+    Customer.id,
+    Customer.company_name,
+    Customer.industry,
+    Customer.employee_count,
+    Customer.plan,
+    Customer.mrr,
+    Customer.is_active,
+    Customer.signup_date,
+    Customer.last_activity,
+    Customer.churned_date,
+    Customer.created_at,
+    Customer.updated_at,
+]
+COLUMN_NAMES = [column.key for column in EXPORT_COLUMNS]
+
+
+class ExportFormat(str, enum.Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+    ARROW = "arrow"
+
+
+MEDIA_TYPES = {
+    ExportFormat.CSV: "text/csv",
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.ARROW: "application/vnd.apache.arrow.stream",
+}
+
+FILE_EXTENSIONS = {
+    ExportFormat.CSV: "csv",
+    ExportFormat.NDJSON: "ndjson",
+    ExportFormat.ARROW: "arrows",
+}
+
+
+class ExportUnavailable(RuntimeError):
+    pass
+
+
+def _plain(value):
+    # Column value -> JSON/CSV friendly scalar
+    if isinstance(value, PlanType):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def iter_partitions(filters: list, batch_size: int, use_replica: bool = True) -> AsyncIterator[list]:
+    # Stream filtered customer rows in partitions of batch_size via a server-side cursor
+
+    # The response body outlives request dependencies, so the export owns its session
+    async with read_session(use_replica) as db:
+        query = (
+            select(*EXPORT_COLUMNS)
+            .where(*filters)
+            .order_by(Customer.id)
+            .execution_options(yield_per=batch_size)
+        )
+        result = await db.stream(query)
+        async for partition in result.partitions():
+            yield partition
+
+
+async def encode_csv(partitions: AsyncIterator[list]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMN_NAMES)
+    async for partition in partitions:
+        writer.writerows([_plain(v) for v in row] for row in partition)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def encode_ndjson(partitions: AsyncIterator[list]) -> AsyncIterator[bytes]:
+    async for partition in partitions:
+        lines = [
+            json.dumps(dict(zip(COLUMN_NAMES, (_plain(v) for v in row))), separators=(",", ":"))
+            for row in partition
+        ]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _arrow_schema(pa):
+    return pa.schema([
+        ("id", pa.int64()),
+        ("company_name", pa.string()),
+        ("industry", pa.dictionary(pa.int32(), pa.string())),
+        ("employee_count", pa.int64()),
+        ("plan", pa.dictionary(pa.int32(), pa.string())),
+        ("mrr", pa.float64()),
+        ("is_active", pa.bool_()),
+        ("signup_date", pa.timestamp("us")),
+        ("last_activity", pa.timestamp("us")),
+        ("churned_date", pa.timestamp("us")),
+        ("created_at", pa.timestamp("us")),
+        ("updated_at", pa.timestamp("us")),
+    ])
+
+
+def load_pyarrow():
+    # pyarrow is only needed for Arrow exports
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+    except ImportError as e:
+        raise ExportUnavailable("Arrow export requires the pyarrow package") from e
+    return pyarrow
+
+
+async def encode_arrow(partitions: AsyncIterator[list]) -> AsyncIterator[bytes]:
+    # Arrow IPC stream: schema message, then one record batch per partition
+    pa = load_pyarrow()
+    schema = _arrow_schema(pa)
+    sink = io.BytesIO()
+
+    def drain() -> bytes:
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    with pa.ipc.new_stream(sink, schema) as writer:
+        yield drain()
+        async for partition in partitions:
+            columns = list(zip(*partition))
+            arrays = []
+            for field, values in zip(schema, columns):
+                if field.name == "plan":
+                    values = [_plain(v) for v in values]
+                if pa.types.is_dictionary(field.type):
+                    arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+                else:
+                    arrays.append(pa.array(values, type=field.type))
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            yield drain()
+    # End-of-stream marker
+    yield drain()
+
+
+ENCODERS = {
+    ExportFormat.CSV: encode_csv,
+    ExportFormat.NDJSON: encode_ndjson,
+    ExportFormat.ARROW: encode_arrow,
+}
+
+
+def export_customers(
+    filters: list,
+    fmt: ExportFormat,
+    batch_size: int,
+    use_replica: bool = True
+) -> AsyncIterator[bytes]:
+    # Encoded byte stream of the filtered customers table
+    if fmt == ExportFormat.ARROW:
+        # Fail before the response starts rather than mid-stream
+        load_pyarrow()
+    return ENCODERS[fmt](iter_partitions(filters, batch_size, use_replica))
@@ -0,0 +1,97 @@
+# Customer filter compiler
+#
+# A validated CustomerFilterInput is turned into WHERE clauses once, here, and
+# the list, count, export and analytics queries all apply the same clauses -
+# so clients filter in the database instead of fetching everything. Every
+# clause is a plain comparison on a column (ranges, IN lists), which the
+# planner can serve from the customer indexes. Sorting is whitelisted by
+# pagination.SortField.
+#
+# The in-memory snapshots only hold some of the columns: snapshot_filters()
+# and counts_from_snapshot() say when they can answer for a filter instead.
+
+from datetime import datetime, time, timedelta
+from typing import Optional
+from sqlalchemy import or_
+from app.models.customer import Customer, PlanType
+from app.security.input_validator import CustomerFilterInput
+
+
+def plan_types(spec: CustomerFilterInput) -> list[PlanType]:
+    return [PlanType(plan) for plan in spec.plan or ()]
+
+
+def employee_ranges(buckets: list[str]) -> list[tuple[int, Optional[int]]]:
+    # Inclusive (low, high) ranges of the selected buckets, adjacent buckets merged
+    ranges = []
+    for bucket in buckets:
+        low, high = CustomerFilterInput.EMPLOYEE_BUCKETS[bucket]
+        if ranges and ranges[-1][1] is not None and ranges[-1][1] + 1 == low:
+            ranges[-1] = (ranges[-1][0], high)
+        else:
+            ranges.append((low, high))
+    return ranges
+
+
+def _start_of_day(day) -> datetime:
+    return datetime.combine(day, time.min)
+
+
+def compile_filters(spec: CustomerFilterInput) -> list:
+    # WHERE clauses for the filters that are set (none for an empty spec)
+    filters = []
+    plans = plan_types(spec)
+    if len(plans) == 1:
+        filters.append(Customer.plan == plans[0])
+    elif plans:
+        filters.append(Customer.plan.in_(plans))
+    if spec.is_active is not None:
+        filters.append(Customer.is_active == spec.is_active)
+    if spec.industry:
+        filters.append(Customer.industry.in_(spec.industry))
+    if spec.min_mrr is not None:
+        filters.append(Customer.mrr >= spec.min_mrr)
+    if spec.max_mrr is not None:
+        filters.append(Customer.mrr <= spec.max_mrr)
+    # Signup dates are inclusive days: [from 00:00, day after `to` 00:00)
+    if spec.signup_from is not None:
+        filters.append(Customer.signup_date >= _start_of_day(spec.signup_from))
+    if spec.signup_to is not None:
+        filters.append(Customer.signup_date < _start_of_day(spec.signup_to + timedelta(days=1)))
+    if spec.employees:
+        ranges = [
+            Customer.employee_count >= low if high is None else Customer.employee_count.between(low, high)
+            for low, high in employee_ranges(spec.employees)
+        ]
+        filters.append(ranges[0] if len(ranges) == 1 else or_(*ranges))
+    if spec.min_ltv is not None:
+        filters.append(Customer.lifetime_value >= spec.min_ltv)
+    if spec.max_ltv is not None:
+        filters.append(Customer.lifetime_value <= spec.max_ltv)
+    return filters
+
+
+def is_empty(spec: CustomerFilterInput) -> bool:
+    return not spec.model_dump(exclude_none=True)
+
+
+def snapshot_filters(spec: CustomerFilterInput) -> Optional[dict]:
+    # Keyword arguments for the columnar snapshot's aggregates, or None if it
+    # lacks a filtered column (employee count) or can't filter on it (LTV)
+    if spec.employees or spec.min_ltv is not None or spec.max_ltv is not None:
+        return None
+    filters = {
+        "plans": plan_types(spec) or None,
+        "is_active": spec.is_active,
+        "industries": spec.industry,
+        "min_mrr": spec.min_mrr,
+        "max_mrr": spec.max_mrr,
+        "signup_from": _start_of_day(spec.signup_from) if spec.signup_from else None,
+        "signup_before": _start_of_day(spec.signup_to + timedelta(days=1)) if spec.signup_to else None,
+    }
+    return {key: value for key, value in filters.items() if value is not None}
+
+
+def counts_from_snapshot(spec: CustomerFilterInput) -> bool:
+    # The stats snapshot only keeps per plan totals and active counts
+    return not spec.model_dump(exclude_none=True, exclude={"plan", "is_active"})
@@ -0,0 +1,242 @@
+# Streaming bulk ingest of customers from NDJSON or CSV
+#
+# The request body is read incrementally, parsed into records, validated in
+# chunks with CustomerImport and inserted with one executemany per chunk, each
+# chunk in its own transaction. Bad rows are reported individually and never
+# fail the rest of the upload.
+
+import csv
+import enum
+import json
+from datetime import date, datetime
+from typing import AsyncIterator, Optional
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.models.customer import Customer
+from app.models.schemas import CustomerImport
+from app.services.analytics import changed_days, commit_with_rollups
+from app.services.customer_events import customer_write, customers_bulk_created
+
+
+class IngestFormat(str, enum.Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+CONTENT_TYPES = {
+    "application/x-ndjson": IngestFormat.NDJSON,
+    "application/ndjson": IngestFormat.NDJSON,
+    "application/jsonl": IngestFormat.NDJSON,
+    "application/json": IngestFormat.NDJSON,
+    "text/csv": IngestFormat.CSV,
+}
+
+
+class UnsupportedFormat(ValueError):
+    pass
+
+
+def detect_format(content_type: Optional[str]) -> IngestFormat:
+    # Map a request Content-Type to an ingest format (ndjson when absent)
+    if not content_type:
+        return IngestFormat.NDJSON
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type not in CONTENT_TYPES:
+        raise UnsupportedFormat(f"Unsupported content type for bulk ingest: {media_type}")
+    return CONTENT_TYPES[media_type]
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    # Split a byte stream into decoded lines without buffering the whole body
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8").rstrip("\r")
+    if buffer:
+        yield buffer.decode("utf-8").rstrip("\r")
+
+
+async def iter_ndjson(lines: AsyncIterator[str]) -> AsyncIterator[tuple[int, object]]:
+    # (row number, parsed object or parse error) for every non-blank line
+    row = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            yield row, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row, ValueError(f"Invalid JSON: {e.msg}")
+
+
+def _ends_in_quotes(line: str, in_quotes: bool) -> bool:
+    # Whether a quoted field is still open at the end of line (csv module rules:
+    # a quote only opens a field at the field's start, "" inside one is a literal quote)
+    if not in_quotes and '"' not in line:
+        return False
+    pos = 0
+    while True:
+        if in_quotes or line.startswith('"', pos):
+            end = line.find('"', pos if in_quotes else pos + 1)
+            while end != -1 and line.startswith('""', end):
+                end = line.find('"', end + 2)
+            if end == -1:
+                return True
+            in_quotes, pos = False, end + 1
+        comma = line.find(",", pos)
+        if comma == -1:
+            return False
+        pos = comma + 1
+
+
+async def iter_csv(lines: AsyncIterator[str]) -> AsyncIterator[tuple[int, object]]:
+    # (row number, dict or error) for every CSV record after the header row
+    max_lines = settings.bulk_ingest_max_record_lines
+    header = None
+    record: list[str] = []
+    in_quotes = False
+    row = 0
+    async for line in lines:
+        record.append(line)
+        # A quoted field may contain newlines; the quote state is carried line by line
+        in_quotes = _ends_in_quotes(line, in_quotes)
+        if in_quotes:
+            if len(record) < max_lines:
+                continue
+            # Most likely a stray quote: report the record and resync at the next line
+            record, in_quotes = [], False
+            row += 1
+            yield row, ValueError(f"Unterminated quoted field (record spans more than {max_lines} lines)")
+            continue
+        values = next(csv.reader(["\n".join(record)]), [])
+        record = []
+        if not any(v.strip() for v in values):
+            continue
+        if header is None:
+            header = [v.strip() for v in values]
+            continue
+        row += 1
+        if len(values) != len(header):
+            yield row, ValueError(f"Expected {len(header)} columns, got {len(values)}")
+            continue
+        # Empty CSV cells mean "not provided"
+        yield row, {k: v for k, v in zip(header, values) if v != ""}
+    if record:
+        yield row + 1, ValueError("Unterminated quoted field")
+
+
+def validate_record(record: object) -> dict:
+    # Validate one parsed record into column values ready for executemany
+    if isinstance(record, Exception):
+        raise record
+    if not isinstance(record, dict):
+        raise ValueError("Each record must be an object")
+
+    customer = CustomerImport.model_validate(record)
+    values = customer.model_dump()
+    values["signup_date"] = values["signup_date"] or datetime.utcnow()
+    return values
+
+
+def rollup_days(rows: list[dict]) -> set[date]:
+    # Chart rollup days the inserted rows count on (historical imports change completed days)
+    return set().union(*(
+        changed_days(None, (v["signup_date"], v.get("churned_date"), v.get("last_activity"), v["is_active"], v["mrr"]))
+        for v in rows
+    ))
+
+
+def format_errors(error: Exception) -> list[str]:
+    if isinstance(error, ValidationError):
+        return [
+            f"{'.'.join(str(p) for p in e['loc']) or 'record'}: {e['msg']}"
+            for e in error.errors()
+        ]
+    return [str(error)]
+
+
+class BulkIngestResult:
+    # Running totals and per-row error report for one upload
+
+    def __init__(self, max_errors: int):
+        self.max_errors = max_errors
+        self.inserted = 0
+        self.failed = 0
+        self.errors: list[dict] = []
+
+    def add_error(self, row: int, error: Exception):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row, "errors": format_errors(error)})
+
+    def as_dict(self) -> dict:
+        return {
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors)
+        }
+
+
+async def _insert_rows(db: AsyncSession, batch: list[tuple[int, dict]], result: BulkIngestResult) -> list[tuple[int, dict]]:
+    # Insert a chunk in one transaction; returns the rows that made it in
+    try:
+        await db.execute(insert(Customer), [values for _, values in batch])
+        await commit_with_rollups(db, rollup_days([values for _, values in batch]))
+        return batch
+    except SQLAlchemyError:
+        # Isolate the offending rows instead of failing the whole chunk
+        await db.rollback()
+        inserted = []
+        for row, values in batch:
+            try:
+                await db.execute(insert(Customer), [values])
+                await commit_with_rollups(db, rollup_days([values]))
+                inserted.append((row, values))
+            except SQLAlchemyError as e:
+                await db.rollback()
+                result.add_error(row, ValueError(f"Database error: {e.orig or e}"))
+        return inserted
+
+
+async def insert_batch(db: AsyncSession, batch: list[tuple[int, dict]], result: BulkIngestResult):
+    # Insert one validated chunk and fan it out to the derived state
+
+    if not batch:
+        return
+    with customer_write():
+        inserted = await _insert_rows(db, batch, result)
+        result.inserted += len(inserted)
+        customers_bulk_created([values for _, values in inserted])
+
+
+async def ingest_customers(
+    db: AsyncSession,
+    body: AsyncIterator[bytes],
+    fmt: IngestFormat,
+    batch_size: int,
+    max_errors: int
+) -> dict:
+    # Stream, validate and insert customers in transactions of batch_size rows
+
+    result = BulkIngestResult(max_errors)
+    parse = iter_csv if fmt == IngestFormat.CSV else iter_ndjson
+
+    batch: list[tuple[int, dict]] = []
+    async for row, record in parse(iter_lines(body)):
+        try:
+            batch.append((row, validate_record(record)))
+        except (ValidationError, ValueError) as e:
+            result.add_error(row, e)
+            continue
+        if len(batch) >= batch_size:
+            await insert_batch(db, batch, result)
+            batch = []
+
+    await insert_batch(db, batch, result)
+    return result.as_dict()
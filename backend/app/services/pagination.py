@@ -0,0 +1,96 @@
+# Keyset (cursor) pagination helpers for the customer list
+#
+# Pages are ordered by (signup_date DESC, id DESC). A cursor encodes the sort
+# key of the last row on a page, so the next page is a range scan on the
+# (signup_date, id) index instead of an OFFSET that walks every skipped row.
+
+import base64
+import enum
+import json
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import Select, and_, func, or_, select
+from app.models.customer import Customer
+
+
+class CountMode(str, enum.Enum):
+    # How the list endpoint computes `total`
+
+    EXACT = "exact"        # COUNT(*) over the filtered query
+    ESTIMATE = "estimate"  # From the stats snapshot, falling back to exact
+    NONE = "none"          # Skip counting entirely (infinite scroll)
+
+
+class SortField(str, enum.Enum):
+    # Orderings offered by the list endpoint
+
+    SIGNUP_DATE = "signup_date"  # Newest first; supports cursors
+    LTV = "ltv"                  # Highest lifetime value first; offset only
+    MRR = "mrr"                  # Highest MRR first (ix_customers_mrr_id); offset only
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(signup_date: datetime, customer_id: int) -> str:
+    # Opaque, URL-safe cursor for the row after which the next page starts
+    payload = json.dumps({"d": signup_date.isoformat(), "i": customer_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    # Reverse of encode_cursor; raises InvalidCursor on anything malformed
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["d"]), int(payload["i"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def keyset_filter(signup_date: datetime, customer_id: int):
+    # Rows strictly after the cursor in (signup_date DESC, id DESC) order
+    return or_(
+        Customer.signup_date < signup_date,
+        and_(Customer.signup_date == signup_date, Customer.id < customer_id)
+    )
+
+
+def keyset_order():
+    # Sort order matching the (signup_date, id) index, read backwards
+    return (Customer.signup_date.desc(), Customer.id.desc())
+
+
+def sort_order(sort: SortField):
+    # ORDER BY for a sort field; id breaks ties so pages are stable
+    if sort == SortField.LTV:
+        return (Customer.lifetime_value.desc(), Customer.id.desc())
+    if sort == SortField.MRR:
+        return (Customer.mrr.desc(), Customer.id.desc())
+    return keyset_order()
+
+
+def count_query(filters: list):
+    return select(func.count(Customer.id)).where(*filters)
+
+
+def page_query(
+    base: Select,
+    filters: list,
+    sort: SortField,
+    after: Optional[tuple[datetime, int]] = None,
+    skip: int = 0,
+    limit: int = 100
+) -> Select:
+    # One page of `base` (an ORM or projection SELECT over customers)
+
+    query = base.where(*filters).order_by(*sort_order(sort))
+    if after is not None:
+        return query.where(keyset_filter(*after)).limit(limit)
+    if sort == SortField.LTV:
+        # LTV can't be indexed, so rank ids on the covering ix_customers_ltv_inputs
+        # first and only then load the page's rows by primary key
+        ranked = select(Customer.id).where(*filters).order_by(*sort_order(sort)).offset(skip).limit(limit)
+        return base.where(Customer.id.in_(ranked.scalar_subquery())).order_by(*sort_order(sort))
+    return query.offset(skip).limit(limit)
@@ -0,0 +1,72 @@
+# Column projection fast path for the customer list
+#
+# With ?fields=... the list endpoint selects only the requested columns as
+# Core rows - no ORM objects, no CustomerResponse models. lifetime_months and
+# lifetime_value come from their SQL expressions, so they are computed by
+# the database for the whole page at once, and the page is encoded straight
+# to JSON bytes with orjson.
+
+import json
+from typing import Any
+from sqlalchemy import select
+from app.models.customer import Customer
+from app.models.schemas import CustomerResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+
+# Every CustomerResponse field, in response order, mapped to its SQL expression
+PROJECTABLE_FIELDS = {
+    name: getattr(Customer, name)
+    for name in CustomerResponse.model_fields
+}
+
+# Columns the list endpoint needs internally (cursor) even when not requested
+CURSOR_FIELDS = ("id", "signup_date")
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def parse_fields(fields: str) -> list[str]:
+    # Comma separated field names -> de-duplicated list in response order
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    if not requested:
+        raise InvalidFields("fields must name at least one field")
+    unknown = requested - PROJECTABLE_FIELDS.keys()
+    if unknown:
+        raise InvalidFields(
+            f"Unknown fields: {', '.join(sorted(unknown))}. "
+            f"Allowed: {', '.join(PROJECTABLE_FIELDS)}"
+        )
+    return [name for name in PROJECTABLE_FIELDS if name in requested]
+
+
+def projection_query(fields: list[str]):
+    # SELECT of the requested fields first, then any missing cursor columns
+    columns = list(dict.fromkeys([*fields, *CURSOR_FIELDS]))
+    return select(*[PROJECTABLE_FIELDS[name].label(name) for name in columns])
+
+
+def project_rows(rows, fields: list[str]) -> list[dict]:
+    # Plain dicts with exactly the requested keys; zip stops before the extra cursor columns
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def _default(value: Any):
+    # Only reached by the stdlib fallback (orjson handles datetimes and enums natively)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if hasattr(value, "value"):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload: Any) -> bytes:
+    # JSON bytes for dicts/lists of plain values, datetimes and enums
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=_default, separators=(",", ":")).encode("utf-8")
@@ -0,0 +1,256 @@
+# Typeahead search over company names
+#
+# An in-process index of the distinct company names (names repeat across
+# accounts, so there are far fewer of them than customers). Each name is
+# split into lowercase words; a sorted vocabulary of distinct words maps each
+# word to the names containing it, so a prefix is a binary search plus the
+# posting lists of the words in range. Matches are ranked in memory - names
+# whose first word matches first, then shorter names - and only the customers
+# of the top names are read, through the company_name index.
+#
+# Like the columnar snapshot, the index is built on first use and extended by
+# this worker's write handlers. It picks up names written elsewhere by
+# updated_at watermark, and is rebuilt periodically so names no longer used
+# by any customer drop out (until then they simply match no rows).
+
+import asyncio
+import re
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+import numpy as np
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.models.customer import Customer
+
+WORD = re.compile(r"\w+")
+# Sorts after every word starting with a given prefix
+MAX_CHAR = "\U0010ffff"
+MAX_UINT16 = 2 ** 16 - 1
+# Word ids stored per name for multi-word queries (later words only match single-word queries)
+NAME_WORDS = 8
+
+EMPTY_CODES = np.empty(0, dtype=np.int32)
+EMPTY_POSITIONS = np.empty(0, dtype=np.uint16)
+
+
+def words(text: str) -> list[str]:
+    # Lowercase words of a name or query; punctuation separates words
+    return WORD.findall(text.casefold())
+
+
+class NameIndex:
+    """
+    Distinct names with word-prefix postings
+
+    - names: name code -> name; lengths: normalized name length per code
+    - vocabulary: sorted distinct words; postings[word]: codes of the names
+      containing it and the word's position in each (compact arrays), kept
+      in rank order so a one-word query only reads the head of each list
+    - name_words: the first NAME_WORDS word ids of every name (-1 padded), to
+      check the other words of a multi-word query against candidate names
+    - add() only appends, so a code never changes meaning
+    """
+
+    def __init__(self):
+        self.names: list[str] = []
+        self._codes: dict[str, int] = {}
+        self._lengths = array("H")
+        self.vocabulary: list[str] = []
+        self._vocabulary_sorted = True
+        self._postings: dict[str, tuple[array, array]] = {}
+        self._word_ids: dict[str, int] = {}
+        self._name_words = array("i")
+        # Words whose postings were appended to since they were last sorted
+        self._unsorted: set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add(self, name: str) -> bool:
+        # False if the name is already indexed
+        if not name or name in self._codes:
+            return False
+        code = self._codes[name] = len(self.names)
+        self.names.append(name)
+        name_words = words(name)
+        self._lengths.append(min(len(" ".join(name_words)), MAX_UINT16))
+        for position, word in enumerate(name_words):
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = (array("i"), array("H"))
+                self._word_ids[word] = len(self._word_ids)
+                # Sorted lazily by the next lookup (cheap: the list is sorted except for its tail)
+                self.vocabulary.append(word)
+                self._vocabulary_sorted = False
+            postings[0].append(code)
+            postings[1].append(min(position, MAX_UINT16))
+            self._unsorted.add(word)
+        word_ids = [self._word_ids[word] for word in name_words[:NAME_WORDS]]
+        self._name_words.extend(word_ids + [-1] * (NAME_WORDS - len(word_ids)))
+        return True
+
+    def extend(self, names: Iterable[str]) -> int:
+        added = sum(self.add(name) for name in names)
+        for word in list(self._unsorted):
+            self._sort_postings(word)
+        return added
+
+    def _rank(self, codes: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        # Lower is better: names whose first word matched, then shorter names
+        lengths = np.frombuffer(self._lengths, dtype=np.uint16)[codes].astype(np.int64)
+        return np.where(positions == 0, 0, MAX_UINT16 + 1) + lengths
+
+    def _sort_postings(self, word: str):
+        codes_buffer, positions_buffer = self._postings[word]
+        codes = np.frombuffer(codes_buffer, dtype=np.int32)
+        positions = np.frombuffer(positions_buffer, dtype=np.uint16)
+        order = np.lexsort((codes, self._rank(codes, positions)))
+        sorted_codes, sorted_positions = array("i"), array("H")
+        sorted_codes.frombytes(codes[order].tobytes())
+        sorted_positions.frombytes(positions[order].tobytes())
+        del codes, positions
+        self._postings[word] = (sorted_codes, sorted_positions)
+        self._unsorted.discard(word)
+
+    def _prefix(self, prefix: str, head: Optional[int] = None) -> tuple[np.ndarray, np.ndarray]:
+        # Codes of the names with a word starting with prefix, and that word's position
+        # (only the best `head` names of each word when given)
+        in_range = self._word_range(prefix)
+        if not in_range:
+            return EMPTY_CODES, EMPTY_POSITIONS
+        if head is not None:
+            for word in self._unsorted.intersection(in_range):
+                self._sort_postings(word)
+        postings = [self._postings[word] for word in in_range]
+        codes = np.concatenate([np.frombuffer(c, dtype=np.int32)[:head] for c, _ in postings])
+        positions = np.concatenate([np.frombuffer(p, dtype=np.uint16)[:head] for _, p in postings])
+        return codes, positions
+
+    def _word_range(self, prefix: str) -> list[str]:
+        if not self._vocabulary_sorted:
+            self.vocabulary.sort()
+            self._vocabulary_sorted = True
+        low = bisect_left(self.vocabulary, prefix)
+        return self.vocabulary[low:bisect_left(self.vocabulary, prefix + MAX_CHAR, low)]
+
+    def _match_all(self, terms: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        # Names matching every term; positions are 0 where the first term matched the first word
+        ranges = [self._word_range(term) for term in terms]
+        # Candidates from the term with the fewest postings ("llc" in "reed ll" is never expanded)
+        rarest = min(range(len(terms)), key=lambda i: sum(len(self._postings[w][0]) for w in ranges[i]))
+        codes = np.unique(self._prefix(terms[rarest])[0])
+        table = np.frombuffer(self._name_words, dtype=np.int32).reshape(-1, NAME_WORDS)[codes]
+        keep = np.ones(len(codes), dtype=bool)
+        for i, in_range in enumerate(ranges):
+            if i != rarest:
+                keep &= np.isin(table, [self._word_ids[w] for w in in_range]).any(axis=1)
+        first = np.isin(table[keep, 0], [self._word_ids[w] for w in ranges[0]])
+        return codes[keep], np.where(first, 0, 1).astype(np.uint16)
+
+    def match(self, query: str, limit: int) -> list[str]:
+        # Names in which every query word prefixes a word, best first
+        terms = words(query)
+        if not terms or limit < 1:
+            return []
+        # A name can appear once per matching word, so keep some spare candidates
+        k = limit * 2
+        if len(terms) == 1:
+            codes, positions = self._prefix(terms[0], head=k)
+        else:
+            codes, positions = self._match_all(terms)
+        if not len(codes):
+            return []
+
+        # Rank: first word matches, then shorter names (an exact match is both), then older names
+        rank = self._rank(codes, positions)
+        if k < len(codes):
+            top = np.argpartition(rank, k - 1)[:k]
+            codes, rank = codes[top], rank[top]
+        order = np.lexsort((codes, rank))
+
+        names, seen = [], set()
+        for code in codes[order].tolist():
+            if code not in seen:
+                seen.add(code)
+                names.append(self.names[code])
+                if len(names) == limit:
+                    break
+        return names
+
+
+class CompanySearch:
+    """
+    A NameIndex kept in step with the customers table
+
+    - add(): called by the create/update/bulk write handlers
+    - ensure_fresh(): builds on first use, adds names written by other
+      workers (updated_at watermark), rebuilds every rebuild interval
+    - search(): ranked customers for a typeahead query
+    """
+
+    def __init__(self):
+        self.index = NameIndex()
+        self.built = False
+        self.watermark: Optional[datetime] = None
+        self.refreshed_at = 0.0
+        self.built_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def add(self, name: Optional[str]):
+        if self.built and name:
+            self.index.add(name)
+
+    def _fresh(self) -> bool:
+        return self.built and time.monotonic() - self.refreshed_at < settings.search_index_max_staleness_seconds
+
+    async def ensure_fresh(self, db: AsyncSession):
+        if self._fresh():
+            return
+        async with self._lock:
+            if self._fresh():
+                return
+            started = time.monotonic()
+            rebuild = not self.built or started - self.built_at >= settings.search_index_rebuild_interval_seconds
+            # Taken before reading names, so anything committed meanwhile is picked up next time
+            watermark = await db.scalar(select(func.max(Customer.updated_at)))
+            if rebuild or self.watermark is None:
+                query = select(Customer.company_name).distinct()
+            else:
+                # Few rows; without DISTINCT the planner stays on the updated_at index (add() skips repeats)
+                overlap = timedelta(seconds=settings.search_index_watermark_overlap_seconds)
+                query = select(Customer.company_name).where(Customer.updated_at >= self.watermark - overlap)
+            names = (await db.scalars(query)).all()
+            if rebuild:
+                index = NameIndex()
+                index.extend(names)
+                self.index, self.built, self.built_at = index, True, started
+            else:
+                self.index.extend(names)
+            self.watermark = watermark or self.watermark
+            self.refreshed_at = started
+
+    async def search(self, db: AsyncSession, query: str, limit: int) -> list:
+        # Customers whose name matches, in name rank order (active and larger accounts first within a name)
+        await self.ensure_fresh(db)
+        names = self.index.match(query, limit)
+        if not names:
+            return []
+        return (await db.execute(search_rows_query(names, limit))).all()
+
+
+def search_rows_query(names: list[str], limit: int):
+    # Customers of the ranked names (company_name index lookups)
+    rank = case({name: i for i, name in enumerate(names)}, value=Customer.company_name)
+    return (
+        select(Customer.id, Customer.company_name, Customer.industry, Customer.plan, Customer.mrr, Customer.is_active)
+        .where(Customer.company_name.in_(names))
+        .order_by(rank, Customer.is_active.desc(), Customer.mrr.desc(), Customer.id)
+        .limit(limit)
+    )
+
+
+company_search = CompanySearch()
@@ -0,0 +1,279 @@
+# Customer summary statistics snapshot
+#
+# The dashboard polls the summary endpoint constantly, so instead of scanning
+# the customers table on every call we keep an in-process snapshot of the
+# aggregates. It is built with a single GROUP BY pass and then kept current
+# by deltas from the create/update/delete handlers and the churn job.
+#
+# A write's delta is applied after its commit, so a recompute running between
+# the two may already count the write and must not replace a snapshot that
+# gets the delta: writes hold writing() from before their commit until the
+# delta is recorded, and recomputes that overlap one are not installed.
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, Sequence
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.models.customer import Customer, PlanType
+
+# (plan, is_active, mrr) - the only columns the summary depends on
+StatsRow = tuple[PlanType, bool, float]
+
+# Tolerance for float drift on MRR sums when comparing snapshot and recompute
+MRR_TOLERANCE = 0.01
+
+
+def stats_row(customer: Customer) -> StatsRow:
+    # Extract the summary-relevant columns from a customer
+    return (PlanType(customer.plan), customer.is_active is True, float(customer.mrr or 0.0))
+
+
+def aggregate_by_plan_query(*filters):
+    # Single pass over customers: total/active counts and active MRR per plan
+    active = Customer.is_active == True
+    return select(
+        Customer.plan,
+        func.count(Customer.id),
+        func.sum(case((active, 1), else_=0)),
+        func.sum(case((active, Customer.mrr), else_=0.0)),
+    ).where(*filters).group_by(Customer.plan)
+
+
+async def aggregate_by_plan(db: AsyncSession, filters: tuple = ()) -> dict:
+    rows = (await db.execute(aggregate_by_plan_query(*filters))).all()
+
+    per_plan = {plan: {"total": 0, "active": 0, "mrr": 0.0} for plan in PlanType}
+    for plan, total, active_count, active_mrr in rows:
+        per_plan[PlanType(plan)] = {
+            "total": int(total or 0),
+            "active": int(active_count or 0),
+            "mrr": float(active_mrr or 0.0),
+        }
+    return per_plan
+
+
+def build_summary(per_plan: dict) -> dict:
+    # Shape per-plan aggregates into the summary endpoint payload
+
+    total = sum(p["total"] for p in per_plan.values())
+    active = sum(p["active"] for p in per_plan.values())
+    churned = total - active
+    total_mrr = sum(p["mrr"] for p in per_plan.values())
+    avg_mrr = total_mrr / active if active > 0 else 0
+
+    return {
+        "total_customers": total,
+        "active_customers": active,
+        "churned_customers": churned,
+        "churn_rate": (churned / total * 100) if total > 0 else 0,
+        "total_mrr": round(total_mrr, 2),
+        "average_mrr": round(avg_mrr, 2),
+        "plan_distribution": {plan.value: per_plan[plan]["active"] for plan in PlanType}
+    }
+
+
+class StatsSnapshot:
+    """
+    In-process snapshot of the customer summary aggregates
+
+    - load() replaces the snapshot with a full recompute
+    - record_change() applies a delta from a single write
+    - writing() marks a write in flight; recomputes racing it are not installed
+    - the snapshot expires after `ttl` seconds so writes made by other
+      worker processes are picked up eventually
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._per_plan: Optional[dict] = None
+        self._loaded_at = 0.0
+        self._version = 0
+        self._writing = 0
+
+    @property
+    def version(self) -> int:
+        # Bumped when a write starts and on every delta; used to detect writes racing a recompute
+        return self._version
+
+    @contextmanager
+    def writing(self):
+        # Wrap a write from before its commit until its delta has been recorded
+        with self._lock:
+            self._writing += 1
+            self._version += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._writing -= 1
+                self._version += 1
+
+    def is_fresh(self) -> bool:
+        with self._lock:
+            return self._per_plan is not None and (time.monotonic() - self._loaded_at) < self.ttl
+
+    def load(self, per_plan: dict, version: int):
+        # Install a recompute taken when the snapshot was at `version`
+        with self._lock:
+            # A write started, or was still in flight, while the recompute was
+            # running - it may or may not be included (and its delta may still
+            # come). The current snapshot got that delta, so it stays; with
+            # none, keep the result but recompute on next read
+            racing = version != self._version or self._writing > 0
+            if racing and self._per_plan is not None:
+                return
+            self._per_plan = {plan: dict(values) for plan, values in per_plan.items()}
+            self._loaded_at = 0.0 if racing else time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._per_plan = None
+            self._loaded_at = 0.0
+
+    def record_change(self, old: Optional[StatsRow], new: Optional[StatsRow]):
+        # Apply a write as a delta: old is None for creates, new is None for deletes
+        with self._lock:
+            self._version += 1
+            if self._per_plan is None:
+                return
+            if old is not None:
+                self._apply(old, -1)
+            if new is not None:
+                self._apply(new, 1)
+
+    def record_churn(self, per_plan: dict):
+        # Apply a bulk churn: {plan: (customers, mrr)} moved from active to churned
+        with self._lock:
+            self._version += 1
+            if self._per_plan is None:
+                return
+            for plan, (count, mrr) in per_plan.items():
+                bucket = self._per_plan[plan]
+                bucket["active"] -= count
+                bucket["mrr"] -= mrr
+
+    def _apply(self, row: StatsRow, sign: int):
+        plan, is_active, mrr = row
+        bucket = self._per_plan[plan]
+        bucket["total"] += sign
+        if is_active:
+            bucket["active"] += sign
+            bucket["mrr"] += sign * mrr
+
+    def summary(self) -> Optional[dict]:
+        with self._lock:
+            if self._per_plan is None:
+                return None
+            return build_summary(self._per_plan)
+
+    def per_plan(self) -> Optional[dict]:
+        with self._lock:
+            if self._per_plan is None:
+                return None
+            return {plan: dict(values) for plan, values in self._per_plan.items()}
+
+
+stats_snapshot = StatsSnapshot(ttl=settings.stats_snapshot_ttl_seconds)
+
+
+async def refresh_snapshot(db: AsyncSession) -> dict:
+    # Full recompute; installs the result in the snapshot and returns it
+    version = stats_snapshot.version
+    per_plan = await aggregate_by_plan(db)
+    stats_snapshot.load(per_plan, version)
+    return per_plan
+
+
+async def get_summary(db: AsyncSession, fresh: bool = False) -> dict:
+    # Summary from the snapshot, recomputing only when forced or expired
+    if fresh or not stats_snapshot.is_fresh():
+        return build_summary(await refresh_snapshot(db))
+    return stats_snapshot.summary()
+
+
+async def estimate_count(db: AsyncSession, plans: Sequence[PlanType] = (), is_active: Optional[bool] = None) -> int:
+    # Row count for plan/is_active list filters answered from the snapshot, no table scan
+    # A recompute is used as returned: a racing write's delta may already be applied on top of it
+    per_plan = stats_snapshot.per_plan() if stats_snapshot.is_fresh() else await refresh_snapshot(db)
+
+    buckets = [per_plan[plan] for plan in plans] if plans else per_plan.values()
+    if is_active is None:
+        return sum(b["total"] for b in buckets)
+    if is_active:
+        return sum(b["active"] for b in buckets)
+    return sum(b["total"] - b["active"] for b in buckets)
+
+
+async def check_consistency(db: AsyncSession) -> dict:
+    # Compare the snapshot the summary endpoint would serve against a full recompute
+
+    if stats_snapshot.per_plan() is not None and not stats_snapshot.is_fresh():
+        await refresh_snapshot(db)
+    snapshot = stats_snapshot.per_plan()
+    recomputed = await aggregate_by_plan(db)
+
+    differences = {}
+    if snapshot is not None:
+        for plan in PlanType:
+            for key in ("total", "active", "mrr"):
+                expected = recomputed[plan][key]
+                actual = snapshot[plan][key]
+                tolerance = MRR_TOLERANCE if key == "mrr" else 0
+                if abs(expected - actual) > tolerance:
+                    differences[f"{plan.value}.{key}"] = {
+                        "snapshot": actual,
+                        "recomputed": expected
+                    }
+
+    return {
+        "consistent": snapshot is not None and not differences,
+        "snapshot_loaded": snapshot is not None,
+        "differences": differences,
+        "snapshot": build_summary(snapshot) if snapshot is not None else None,
+        "recomputed": build_summary(recomputed)
+    }
+
+
+def ltv_by_plan_query(is_active: Optional[bool] = None, *filters):
+    # Customer count and total/average/max lifetime value per plan in one pass
+    ltv = Customer.lifetime_value
+    query = select(
+        Customer.plan,
+        func.count(Customer.id),
+        func.sum(ltv),
+        func.max(ltv),
+    ).where(*filters).group_by(Customer.plan)
+    if is_active is not None:
+        query = query.where(Customer.is_active == is_active)
+    return query
+
+
+async def ltv_summary(db: AsyncSession, is_active: Optional[bool] = None, filters: tuple = ()) -> dict:
+    # LTV aggregates per plan and overall, computed entirely in the database
+    return build_ltv_summary((await db.execute(ltv_by_plan_query(is_active, *filters))).all())
+
+
+def build_ltv_summary(rows) -> dict:
+    # Response body from (plan, customers, total_ltv, max_ltv) rows
+    per_plan = {plan.value: {"customers": 0, "total_ltv": 0.0, "average_ltv": 0.0, "max_ltv": 0.0} for plan in PlanType}
+    for plan, customers, total_ltv, max_ltv in rows:
+        total_ltv = float(total_ltv or 0.0)
+        per_plan[PlanType(plan).value] = {
+            "customers": int(customers),
+            "total_ltv": round(total_ltv, 2),
+            "average_ltv": round(total_ltv / customers, 2) if customers else 0.0,
+            "max_ltv": round(float(max_ltv or 0.0), 2),
+        }
+
+    customers = sum(p["customers"] for p in per_plan.values())
+    total_ltv = sum(p["total_ltv"] for p in per_plan.values())
+    return {
+        "customers": customers,
+        "total_ltv": round(total_ltv, 2),
+        "average_ltv": round(total_ltv / customers, 2) if customers else 0.0,
+        "by_plan": per_plan
+    }
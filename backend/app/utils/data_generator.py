@@ -1,13 +1,41 @@
 # Fake Data Generator
 
-from faker import Faker
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
+from typing import Iterator, Optional
+import numpy as np
 import random
 from app.models.customer import Customer, PlanType
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, insert
 
-fake = Faker()
+_fake = None
+
+# Rows per generated shard. Fixed (not derived from the worker count) so a
+# given seed produces the same dataset however many workers are used.
+SHARD_SIZE = 100_000
+
+# Distinct Faker company names generated per shard; rows sample from the pool
+NAME_POOL_SIZE = 5_000
+
+
+def new_faker(seed: Optional[int] = None):
+    # Faker is slow to import and instantiate, so only pay for it when generating data
+    from faker import Faker
+
+    fake = Faker()
+    if seed is not None:
+        fake.seed_instance(seed)
+    return fake
+
+
+def shared_faker():
+    # Module-wide instance for one-off rows, created on first use
+    global _fake
+    if _fake is None:
+        _fake = new_faker()
+    return _fake
 
 
 class CustomerDataGenerator:
@@ -39,6 +67,20 @@ class CustomerDataGenerator:
         PlanType.GROWTH: 0.35,       # 35% growth
         PlanType.ENTERPRISE: 0.15    # 15% enterprise
     }
+
+    # Employee count ranges by plan type (inclusive)
+    EMPLOYEE_RANGES = {
+        PlanType.STARTER: (1, 20),
+        PlanType.GROWTH: (20, 200),
+        PlanType.ENTERPRISE: (200, 10000)
+    }
+
+    # Churn probability multipliers by plan type
+    PLAN_CHURN_MULTIPLIERS = {
+        PlanType.STARTER: 1.5,
+        PlanType.GROWTH: 1.0,
+        PlanType.ENTERPRISE: 0.5
+    }
     
     def __init__(self, start_date: datetime = None):
         # Initialize Generator
@@ -58,12 +100,7 @@ class CustomerDataGenerator:
         mrr = round(random.uniform(mrr_min, mrr_max), 2)
         
         # Employee count correlates with plan
-        if plan == PlanType.STARTER:
-            employee_count = random.randint(1, 20)
-        elif plan == PlanType.GROWTH:
-            employee_count = random.randint(20, 200)
-        else:  # ENTERPRISE
-            employee_count = random.randint(200, 10000)
+        employee_count = random.randint(*self.EMPLOYEE_RANGES[plan])
         
         # Signup date 
         if not signup_date:
@@ -85,7 +122,7 @@ class CustomerDataGenerator:
             last_activity = signup_date
         
         return {
-            "company_name": fake.company(),
+            "company_name": shared_faker().company(),
             "industry": random.choice(self.INDUSTRIES),
             "employee_count": employee_count,
             "plan": plan,
@@ -99,10 +136,7 @@ class CustomerDataGenerator:
         # Randonly churn some customers for realistic data
         
         # Adjust churn probability based on plan
-        if customer_data["plan"] == PlanType.STARTER:
-            churn_probability *= 1.5
-        elif customer_data["plan"] == PlanType.ENTERPRISE:
-            churn_probability *= 0.5
+        churn_probability *= self.PLAN_CHURN_MULTIPLIERS[customer_data["plan"]]
         
         # Adjust based on engagement
         days_since_activity = (datetime.utcnow() - customer_data["last_activity"]).days
@@ -147,20 +181,150 @@ class CustomerDataGenerator:
         return customers
 
 
-def seed_database(db: Session, count: int = 150):
+def generate_shard(
+    start: int,
+    stop: int,
+    count: int,
+    seed: np.random.SeedSequence,
+    start_date: datetime,
+    now: datetime
+) -> dict:
+    """
+    Vectorized equivalent of generate_customers() for rows [start, stop) of count
+
+    Uses the same plan weights, MRR/employee ranges, S-curve signup
+    distribution and churn model, drawn with NumPy instead of per-row
+    random calls. Returns column lists ready for a Core insert.
+    """
+    gen = CustomerDataGenerator
+    rng = np.random.default_rng(seed)
+    n = stop - start
+    day = np.timedelta64(1, "D")
+    start64 = np.datetime64(start_date, "us")
+    now64 = np.datetime64(now, "us")
+
+    # Plan, MRR and employee count
+    plans = list(gen.PLAN_WEIGHTS.keys())
+    weights = np.array([gen.PLAN_WEIGHTS[p] for p in plans])
+    plan_idx = rng.choice(len(plans), size=n, p=weights / weights.sum())
+
+    mrr_ranges = np.array([gen.MRR_RANGES[p] for p in plans], dtype=float)[plan_idx]
+    mrr = np.round(rng.uniform(mrr_ranges[:, 0], mrr_ranges[:, 1]), 2)
+
+    employee_ranges = np.array([gen.EMPLOYEE_RANGES[p] for p in plans])[plan_idx]
+    employee_count = rng.integers(employee_ranges[:, 0], employee_ranges[:, 1] + 1)
+
+    # Signup dates follow the S-curve over the global row index
+    total_days = (now - start_date).days
+    progress = np.arange(start, stop) / count
+    signup = start64 + (total_days * progress ** 1.5).astype(np.int64) * day
+    days_since_signup = (now64 - signup) // day
+
+    # 80% of customers active in the last 30 days, the rest any time since signup
+    recent = rng.random(n) < 0.8
+    activity_days_ago = np.where(
+        recent,
+        rng.integers(0, 31, size=n),
+        rng.integers(0, np.maximum(days_since_signup, 0) + 1)
+    )
+    last_activity = np.where(days_since_signup > 0, now64 - activity_days_ago * day, signup)
+
+    # Churn: base probability scaled by plan and by inactivity over 90 days
+    churn_multipliers = np.array([gen.PLAN_CHURN_MULTIPLIERS[p] for p in plans])[plan_idx]
+    churn_probability = 0.15 * churn_multipliers * np.where((now64 - last_activity) // day > 90, 2, 1)
+    churned = rng.random(n) < churn_probability
+    # Churned at least 30 days after signup (or within the lifetime for newer signups)
+    lifetime_days = np.maximum(days_since_signup, 0)
+    days_active = rng.integers(np.minimum(30, lifetime_days), lifetime_days + 1)
+    churned_date = np.where(churned, signup + days_active * day, np.datetime64("NaT"))
+
+    # Company names sampled from a seeded Faker pool
+    shard_fake = new_faker(int(rng.integers(0, 2 ** 31)))
+    names = [shard_fake.company() for _ in range(min(n, NAME_POOL_SIZE))]
+    name_idx = rng.integers(0, len(names), size=n)
+    industry_idx = rng.integers(0, len(gen.INDUSTRIES), size=n)
+
+    return {
+        "company_name": [names[i] for i in name_idx],
+        "industry": [gen.INDUSTRIES[i] for i in industry_idx],
+        "employee_count": employee_count.tolist(),
+        "plan": [plans[i] for i in plan_idx],
+        "mrr": mrr.tolist(),
+        "signup_date": signup.astype(object).tolist(),
+        "last_activity": last_activity.astype(object).tolist(),
+        "is_active": (~churned).tolist(),
+        "churned_date": churned_date.astype(object).tolist(),
+    }
+
+
+def _generate_shard_task(args: tuple) -> dict:
+    # Top-level wrapper so shards can be pickled to worker processes
+    return generate_shard(*args)
+
+
+def iter_shards(
+    count: int,
+    seed: Optional[int] = None,
+    workers: int = 1,
+    start_date: Optional[datetime] = None,
+    now: Optional[datetime] = None
+) -> Iterator[dict]:
+    # Generate count rows as shards, in order, across a process pool
+
+    now = now or datetime.utcnow()
+    start_date = start_date or (now - timedelta(days=730))
+    bounds = [(start, min(start + SHARD_SIZE, count)) for start in range(0, count, SHARD_SIZE)]
+    seeds = np.random.SeedSequence(seed).spawn(len(bounds))
+    tasks = [(start, stop, count, s, start_date, now) for (start, stop), s in zip(bounds, seeds)]
+
+    if workers <= 1:
+        for task in tasks:
+            yield _generate_shard_task(task)
+        return
+
+    # Keep a bounded number of shards in flight so generation can't outrun loading
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(_generate_shard_task, task))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def bulk_insert_shard(db: Session, shard: dict, batch_size: int = 10_000):
+    # Core executemany inserts of one shard, committed as a single transaction
+    # (the table-level insert skips the ORM bulk-insert bookkeeping)
+    keys = list(shard.keys())
+    rows = zip(*shard.values())
+    n = len(shard[keys[0]])
+    conn = db.connection()
+    for _ in range(0, n, batch_size):
+        batch = [dict(zip(keys, row)) for _, row in zip(range(batch_size), rows)]
+        conn.execute(insert(Customer.__table__), batch)
+    db.commit()
+
+
+def seed_database(
+    db: Session,
+    count: int = 150,
+    seed: Optional[int] = None,
+    workers: int = 1,
+    now: Optional[datetime] = None
+):
     # Populate database with customers
+    # Dates are relative to now, so a seed reproduces the dataset only with the same now
     
     print(f"Generating {count} customers...")
     
-    generator = CustomerDataGenerator()
-    customers_data = generator.generate_customers(count)
-    
-    print("Inserting into database...")
-    for customer_data in customers_data:
-        customer = Customer(**customer_data)
-        db.add(customer)
-    
-    db.commit()
+    inserted = 0
+    for shard in iter_shards(count, seed=seed, workers=workers, now=now):
+        bulk_insert_shard(db, shard)
+        inserted += len(shard["mrr"])
+        if count > SHARD_SIZE:
+            print(f"  Inserted {inserted:,}/{count:,}")
+
     print(f"✅ Successfully created {count} customers!")
     
     # Print some stats
@@ -171,4 +335,4 @@ def seed_database(db: Session, count: int = 150):
     print(f"\nStats:")
     print(f"  Active: {active_count}")
     print(f"  Churned: {churned_count}")
-    print(f"  Total MRR: ${total_mrr:,.2f}")
\ No newline at end of file
+    print(f"  Total MRR: ${total_mrr:,.2f}")
@@ -0,0 +1,319 @@
+# Prometheus metrics for the API and the database
+#
+# A small dependency-free registry (counters, gauges, histograms with
+# labels) rendered in the Prometheus text exposition format at /metrics.
+# Requests are measured by an ASGI middleware labelled with the matched
+# route template, queries by SQLAlchemy engine events, and connection pool
+# checkout waits by a timed pool class.
+
+import re
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; request and query latencies share the same scale
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: dict[tuple, object] = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[n]) for n in self.label_names)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Per-bucket (non-cumulative) counts, sum, count
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted((key, ([*s[0]], s[1], s[2])) for key, s in self._values.items())
+        lines = self.header()
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    # Metrics plus collectors that refresh gauges right before each scrape
+
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Callable[[], None]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collect in self._collectors:
+            collect()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests by method, route template and status code",
+    ("method", "route", "status")
+))
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by method and route template",
+    ("method", "route")
+))
+http_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served"
+))
+db_queries = registry.register(Counter(
+    "db_queries_total", "SQL statements executed by engine and statement type",
+    ("engine", "statement")
+))
+db_query_errors = registry.register(Counter(
+    "db_query_errors_total", "SQL statements that raised, by engine and statement type",
+    ("engine", "statement")
+))
+db_query_duration = registry.register(Histogram(
+    "db_query_duration_seconds", "SQL statement execution time by engine and statement type",
+    ("engine", "statement")
+))
+db_pool_wait = registry.register(Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection",
+    ("engine",)
+))
+db_pool_connections = registry.register(Gauge(
+    "db_pool_connections", "Pool connections by state (checked_out, idle, overflow, capacity)",
+    ("engine", "state")
+))
+change_feed_subscribers = registry.register(Gauge(
+    "change_feed_subscribers", "Open SSE / WebSocket change feed connections"
+))
+change_feed_events = registry.register(Counter(
+    "change_feed_events_total", "Change events published by type",
+    ("type",)
+))
+change_feed_lagged = registry.register(Counter(
+    "change_feed_lagged_disconnects_total", "Change feed subscribers dropped for falling behind"
+))
+
+
+# ---------------------------------------------------------------------------
+# HTTP
+
+
+_PATH_PARAM = re.compile(r"{(\w+)(:\w+)?}")
+
+
+def route_template(scope) -> str:
+    # Route template (e.g. /api/customers/{customer_id}) for the matched route.
+    # Included routers may report their path without the include prefix, so
+    # the prefix is recovered from the concrete request path.
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        # Unmatched paths share one label so scanners can't explode cardinality
+        return "unmatched"
+    params = scope.get("path_params", {})
+    concrete = _PATH_PARAM.sub(lambda m: str(params.get(m.group(1), m.group(0))), template)
+    path = scope.get("path", "")
+    prefix = path[:len(path) - len(concrete)] if path.endswith(concrete) else ""
+    return prefix + template
+
+
+class MetricsMiddleware:
+    # Pure ASGI middleware (works for streaming responses, unlike BaseHTTPMiddleware)
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec()
+            route = route_template(scope)
+            method = scope["method"]
+            http_request_duration.observe(time.perf_counter() - start, method=method, route=route)
+            http_requests.inc(method=method, route=route, status=status)
+
+
+# ---------------------------------------------------------------------------
+# Database
+
+_STATEMENT_TYPE = re.compile(r"^\s*(\w+)")
+_STATEMENT_TYPES = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "BEGIN", "COMMIT", "ROLLBACK", "PRAGMA"}
+
+
+def statement_type(statement: str) -> str:
+    match = _STATEMENT_TYPE.match(statement)
+    keyword = match.group(1).upper() if match else ""
+    return keyword if keyword in _STATEMENT_TYPES else "OTHER"
+
+
+def instrument_engine(engine: Engine, name: str):
+    # Count and time every statement executed through a (sync) engine
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["metrics_query_start"].pop()
+        kind = statement_type(statement)
+        db_queries.inc(engine=name, statement=kind)
+        db_query_duration.observe(time.perf_counter() - start, engine=name, statement=kind)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        starts = context.connection.info.get("metrics_query_start") if context.connection else None
+        if starts:
+            starts.pop()
+        db_query_errors.inc(engine=name, statement=statement_type(context.statement or ""))
+
+    registry.add_collector(lambda: record_pool_state(engine.pool, name))
+
+
+def timed_pool(base: type[Pool], name: str) -> type[Pool]:
+    # Subclass of a queue pool that records how long each checkout waited
+    # (recreate() on dispose uses self.__class__, so the timing survives it)
+    class TimedPool(base):
+        # Keep SQLAlchemy's pool logger names (and their default levels)
+        __module__ = base.__module__
+
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                db_pool_wait.observe(time.perf_counter() - start, engine=name)
+
+    TimedPool.__name__ = f"Timed{base.__name__}"
+    return TimedPool
+
+
+def pool_state(pool: Pool) -> Optional[dict]:
+    # Checked out / idle / overflow connections; None for pools without a size (e.g. StaticPool)
+    if not hasattr(pool, "checkedout") or not hasattr(pool, "size"):
+        return None
+    size = pool.size()
+    checked_out = pool.checkedout()
+    capacity = size + max(getattr(pool, "_max_overflow", 0), 0)
+    return {
+        "size": size,
+        "checked_out": checked_out,
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "capacity": capacity,
+        "saturation": round(checked_out / capacity, 3) if capacity else 0.0,
+    }
+
+
+def record_pool_state(pool: Pool, name: str):
+    state = pool_state(pool)
+    if state is None:
+        return
+    for key in ("checked_out", "idle", "overflow", "capacity"):
+        db_pool_connections.set(state[key], engine=name, state=key)
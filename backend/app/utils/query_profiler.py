@@ -0,0 +1,228 @@
+# Per-request SQL profiler (opt-in: QUERY_PROFILER_ENABLED=true)
+#
+# A context variable ties every statement executed through an instrumented
+# engine to the request that caused it. Each request gets X-DB-Queries /
+# X-DB-Time headers; statement shapes repeated within one request are
+# flagged as N+1; SELECTs slower than the threshold have their EXPLAIN
+# captured into a ring buffer for the debug endpoint. Routes can declare a
+# query budget with @query_budget(n), which is reported and logged when
+# exceeded.
+
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Iterator, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.config import settings
+from app.utils.metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+EXPLAIN_PREFIX = {"sqlite": "EXPLAIN QUERY PLAN ", "postgresql": "EXPLAIN "}
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|\$\d+|%\(\w+\)s|:\w+")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    # Statement with literals/placeholders collapsed, so repeats compare equal
+    shape = _LITERALS.sub("?", statement)
+    shape = _IN_LIST.sub("(?)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class RequestProfile:
+    # Statements executed on behalf of one request (or one profile_queries() block)
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.scope = scope
+        self.queries = 0
+        self.seconds = 0.0
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, seconds: float):
+        self.queries += 1
+        self.seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+
+    def n_plus_one(self, threshold: Optional[int] = None) -> list[dict]:
+        # SELECT shapes executed at least `threshold` times
+        threshold = threshold or settings.query_profiler_n_plus_one_threshold
+        return [
+            {"shape": shape, "count": count}
+            for shape, count in self.shapes.most_common()
+            if count >= threshold and shape.upper().startswith(("SELECT", "WITH"))
+        ]
+
+    @property
+    def route(self) -> Optional[str]:
+        return route_template(self.scope) if self.scope else None
+
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("query_profile", default=None)
+
+
+@contextmanager
+def profile_queries() -> Iterator[RequestProfile]:
+    # Profile every statement run in this context (scripts and async tests)
+    profile = RequestProfile()
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+
+class RingBuffer:
+    # Bounded, thread-safe list of recent events for the debug endpoint
+
+    def __init__(self, size: int):
+        self._items = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def append(self, item: dict):
+        with self._lock:
+            self._items.append(item)
+
+    def items(self) -> list[dict]:
+        with self._lock:
+            return list(reversed(self._items))
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+slow_queries = RingBuffer(settings.query_profiler_ring_size)
+n_plus_one_events = RingBuffer(settings.query_profiler_ring_size)
+
+
+# ---------------------------------------------------------------------------
+# Engine hooks
+
+
+def _capture_explain(conn, statement: str, parameters) -> str:
+    # EXPLAIN the statement on the same connection (before its rows are consumed)
+    prefix = EXPLAIN_PREFIX.get(conn.dialect.name)
+    if prefix is None:
+        return f"EXPLAIN not supported for {conn.dialect.name}"
+    conn.info["profiler_explaining"] = True
+    try:
+        rows = conn.exec_driver_sql(prefix + statement, parameters).all()
+        # The plan text is the last column (SQLite's "detail", Postgres' only column)
+        return "\n".join(str(row[-1]) for row in rows)
+    except Exception as e:
+        return f"EXPLAIN failed: {type(e).__name__}: {e}"
+    finally:
+        conn.info["profiler_explaining"] = False
+
+
+def profile_engine(engine: Engine):
+    # Attribute statements run through a (sync) engine to the current profile
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _current_profile.get() is not None:
+            conn.info.setdefault("profiler_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        profile = _current_profile.get()
+        if profile is None or conn.info.get("profiler_explaining"):
+            return
+        starts = conn.info.get("profiler_query_start")
+        if not starts:
+            return
+        seconds = time.perf_counter() - starts.pop()
+        profile.record(statement, seconds)
+
+        slow = seconds * 1000 >= settings.query_profiler_slow_ms
+        streaming = context is not None and context.execution_options.get("stream_results")
+        if slow and not executemany and not streaming and statement_shape(statement).upper().startswith("SELECT"):
+            slow_queries.append({
+                "captured_at": datetime.utcnow().isoformat(timespec="milliseconds"),
+                "route": profile.route,
+                "duration_ms": round(seconds * 1000, 2),
+                "statement": statement,
+                "explain": _capture_explain(conn, statement, parameters),
+            })
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        conn = context.connection
+        starts = conn.info.get("profiler_query_start") if conn is not None else None
+        if starts:
+            starts.pop()
+
+
+# ---------------------------------------------------------------------------
+# Routes
+
+
+def query_budget(max_queries: int):
+    # Declare the maximum number of statements a route may run per request
+    def decorator(endpoint):
+        endpoint.query_budget = max_queries
+        return endpoint
+    return decorator
+
+
+def route_budget(scope: dict) -> Optional[int]:
+    endpoint = getattr(scope.get("route"), "endpoint", None)
+    return getattr(endpoint, "query_budget", None)
+
+
+class QueryProfilerMiddleware:
+    # Opens a profile per HTTP request and reports it in the response headers
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.query_profiler_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope)
+        token = _current_profile.set(profile)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                # Headers go out before a streamed body, so they count queries so far
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-queries", str(profile.queries).encode()))
+                headers.append((b"x-db-time", f"{profile.seconds * 1000:.2f}".encode()))
+                suspects = profile.n_plus_one()
+                if suspects:
+                    headers.append((b"x-db-n-plus-one", str(len(suspects)).encode()))
+                budget = route_budget(scope)
+                if budget is not None:
+                    headers.append((b"x-db-query-budget", f"{profile.queries}/{budget}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_profile.reset(token)
+            self._report(scope, profile)
+
+    def _report(self, scope: dict, profile: RequestProfile):
+        route = profile.route
+        for suspect in profile.n_plus_one():
+            logger.warning("Possible N+1 on %s %s: %d x %s", scope["method"], route, suspect["count"], suspect["shape"])
+            n_plus_one_events.append({
+                "captured_at": datetime.utcnow().isoformat(timespec="milliseconds"),
+                "route": route,
+                **suspect,
+            })
+        budget = route_budget(scope)
+        if budget is not None and profile.queries > budget:
+            logger.warning("Query budget exceeded on %s %s: %d > %d", scope["method"], route, profile.queries, budget)
@@ -1,19 +1,272 @@
 # Security event logging
+#
+# Events are handed to a bounded in-memory queue and written as JSON lines by
+# a background thread, in batches. Request validation never waits on disk:
+# if the queue is full the event is dropped and counted, and repeated
+# suspicious_input_detected events for the same user and pattern are
+# collapsed within a time window (counts still pending at shutdown are
+# written as summary events).
 
+import json
 import logging
+import queue
+import threading
+import time
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 from typing import Optional
+from app.config import settings
 
 # Create security specific logger
 security_logger = logging.getLogger('security')
 security_logger.setLevel(logging.WARNING)
 
-# Add file handler for security events
-handler = logging.FileHandler('security.log')
-handler.setFormatter(logging.Formatter(
-    '%(asctime)s - SECURITY - %(levelname)s - %(message)s'
-))
-security_logger.addHandler(handler)
+
+class SecurityLogStats:
+    # Thread-safe counters for the security event pipeline
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {"queued": 0, "written": 0, "dropped": 0, "deduplicated": 0}
+
+    def increment(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counts[name] += amount
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._counts)
+
+
+stats = SecurityLogStats()
+
+
+class JsonFormatter(logging.Formatter):
+    # One JSON object per line; dict messages are merged into the object
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {"level": record.levelname}
+        if isinstance(record.msg, dict):
+            payload.update(record.msg)
+        else:
+            payload["message"] = record.getMessage()
+        return json.dumps(payload, default=str)
+
+
+class RepeatedEventFilter(logging.Filter):
+    """
+    Collapses repeated events of one type per (user_id, pattern) key
+
+    - the first event for a key in each window passes through
+    - repeats within `window` seconds are counted and suppressed
+    - the next event after the window carries `suppressed_count`
+    - summaries() hands over counts no later event has carried yet
+    """
+
+    def __init__(self, event: str, window: float, max_keys: int = 10000):
+        super().__init__()
+        self.event = event
+        self.window = window
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._seen: dict[tuple, list] = {}  # key -> [window start, suppressed count]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        msg = record.msg
+        if not isinstance(msg, dict) or msg.get('event') != self.event:
+            return True
+
+        key = (msg.get('user_id'), msg.get('pattern_matched'))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._seen.get(key)
+            if entry is not None and now - entry[0] < self.window:
+                entry[1] += 1
+                stats.increment("deduplicated")
+                return False
+
+            if entry is not None and entry[1]:
+                record.msg = {**msg, 'suppressed_count': entry[1]}
+            if len(self._seen) >= self.max_keys:
+                self._prune(now)
+            self._seen[key] = [now, 0]
+        return True
+
+    def summaries(self) -> list[dict]:
+        # <event>_summary events for suppressed counts not reported yet (then reset)
+        with self._lock:
+            pending = [(key, entry) for key, entry in self._seen.items() if entry[1]]
+            events = [
+                {
+                    'event': f'{self.event}_summary',
+                    'timestamp': datetime.utcnow().isoformat(),
+                    'user_id': user_id,
+                    'pattern_matched': pattern,
+                    'suppressed_count': entry[1],
+                }
+                for (user_id, pattern), entry in pending
+            ]
+            for _, entry in pending:
+                entry[1] = 0
+        return events
+
+    def _prune(self, now: float):
+        expired = [k for k, (start, _) in self._seen.items() if now - start >= self.window]
+        for k in expired:
+            del self._seen[k]
+        # Still full: forget the oldest keys rather than grow without bound
+        if len(self._seen) >= self.max_keys:
+            for k in sorted(self._seen, key=lambda k: self._seen[k][0])[:len(self._seen) // 2]:
+                del self._seen[k]
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    # Enqueue without blocking; a full queue drops the event and counts it
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Keep dict messages intact for the JSON formatter on the writer thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+            stats.increment("queued")
+        except queue.Full:
+            stats.increment("dropped")
+
+
+class BatchedJsonLinesHandler(logging.Handler):
+    # Buffers formatted lines and appends them to the file batch_size at a time
+
+    def __init__(self, filename: str, batch_size: int):
+        super().__init__()
+        self.filename = filename
+        self.batch_size = batch_size
+        self.buffer: list[str] = []
+        self.buffered_since: Optional[float] = None  # Arrival of the oldest buffered line
+        self.stream = None
+        self.setFormatter(JsonFormatter())
+
+    def emit(self, record: logging.LogRecord):
+        if not self.buffer:
+            self.buffered_since = time.monotonic()
+        self.buffer.append(self.format(record))
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        self.acquire()
+        try:
+            if not self.buffer:
+                return
+            if self.stream is None:
+                # Opened on first write, not at import
+                self.stream = open(self.filename, 'a', encoding='utf-8')
+            self.stream.write("\n".join(self.buffer) + "\n")
+            self.stream.flush()
+            stats.increment("written", len(self.buffer))
+            self.buffer = []
+            self.buffered_since = None
+        finally:
+            self.release()
+
+    def close(self):
+        self.flush()
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+        super().close()
+
+
+class BatchingQueueListener(QueueListener):
+    # Flushes the batched handler once its oldest buffered event is flush_interval old,
+    # so a steady trickle below batch_size is written too, not only when the queue goes idle
+
+    def __init__(self, q: queue.Queue, handler: BatchedJsonLinesHandler, flush_interval: float):
+        super().__init__(q, handler)
+        self.flush_interval = flush_interval
+
+    def enqueue_sentinel(self):
+        # The queue may be full at shutdown; wait for the writer to make room
+        self.queue.put(self._sentinel)
+
+    def _seconds_until_flush(self) -> float:
+        since = [handler.buffered_since for handler in self.handlers if handler.buffered_since is not None]
+        if not since:
+            return self.flush_interval
+        return min(since) + self.flush_interval - time.monotonic()
+
+    def _flush(self):
+        for handler in self.handlers:
+            handler.flush()
+
+    def dequeue(self, block: bool):
+        while True:
+            wait = self._seconds_until_flush()
+            if wait <= 0:
+                self._flush()
+                continue
+            try:
+                return self.queue.get(block=block, timeout=wait)
+            except queue.Empty:
+                if not block:
+                    self._flush()
+                    raise
+
+
+_pipeline_lock = threading.Lock()
+_listener: Optional[BatchingQueueListener] = None
+_queue_handler: Optional[NonBlockingQueueHandler] = None
+_dedup_filter: Optional[RepeatedEventFilter] = None
+
+
+def start_security_logging():
+    # Attach the queue handler and start the writer thread (idempotent)
+    global _listener, _queue_handler, _dedup_filter
+
+    with _pipeline_lock:
+        if _listener is not None:
+            return
+
+        events: queue.Queue = queue.Queue(maxsize=settings.security_log_queue_size)
+        writer = BatchedJsonLinesHandler(settings.security_log_file, settings.security_log_batch_size)
+
+        _queue_handler = NonBlockingQueueHandler(events)
+        _dedup_filter = RepeatedEventFilter(
+            'suspicious_input_detected',
+            window=settings.security_log_dedup_window_seconds
+        )
+        _queue_handler.addFilter(_dedup_filter)
+        security_logger.addHandler(_queue_handler)
+        # Security events only go to the pipeline, never synchronously to the console
+        security_logger.propagate = False
+
+        _listener = BatchingQueueListener(events, writer, settings.security_log_flush_interval)
+        _listener.start()
+
+
+def stop_security_logging():
+    # Summarize suppressed repeats, drain the queue, flush the last batch and stop the writer thread
+    global _listener, _queue_handler, _dedup_filter
+
+    with _pipeline_lock:
+        if _listener is None:
+            return
+        for summary in _dedup_filter.summaries():
+            security_logger.warning(summary)
+        security_logger.removeHandler(_queue_handler)
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+        _queue_handler = None
+        _dedup_filter = None
+
+
+def security_log_stats() -> dict:
+    # Counters of queued, written, dropped and deduplicated events
+    return stats.snapshot()
+
 
 def log_suspicious_input(
         input_text: str,
@@ -21,11 +274,12 @@ def log_suspicious_input(
         user_id: Optional[str] = None
 ):
     # Log potential injection attacks
+    start_security_logging()
     security_logger.warning({
         'event': 'suspicious_input_detected',
         'timestamp': datetime.utcnow().isoformat(),
         'pattern_matched': pattern,
-        'input_sample': input_text[:100],  
+        'input_sample': input_text[:100],
         'input_length': len(input_text),
         'user_id': user_id or 'anonymous'
     })
@@ -36,10 +290,11 @@ def log_validation_failure(
         user_id: Optional[str] = None
 ):
     # Log validation failure for monitoring
+    start_security_logging()
     security_logger.info({
         'event': 'validation_failure',
         'timestamp': datetime.utcnow().isoformat(),
         'input_type': input_type,
         'error': error,
         'user_id': user_id or 'anonymous'
-    })
\ No newline at end of file
+    })
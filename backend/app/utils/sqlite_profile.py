@@ -0,0 +1,98 @@
+# SQLite storage profiles for single-node deployments
+#
+# "performance" (the default) puts file databases in WAL mode, so readers no
+# longer block on a writer, with synchronous=NORMAL (durable at checkpoints,
+# never corrupt), a larger page cache, memory-mapped reads, in-memory temp
+# tables and a busy timeout. The pragmas are applied on every new connection.
+# WAL files are checkpointed and the planner statistics refreshed
+# (PRAGMA optimize) by a background task. "default" leaves SQLite's own
+# settings (rollback journal) untouched.
+
+import asyncio
+import logging
+from typing import Optional
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT = "default"
+PERFORMANCE = "performance"
+PROFILES = (DEFAULT, PERFORMANCE)
+
+
+def is_sqlite_file(database_url: str) -> bool:
+    url = make_url(database_url)
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def profile_pragmas(profile: Optional[str] = None) -> list[str]:
+    # PRAGMA statements run on each new connection for a profile
+    profile = profile or settings.sqlite_profile
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown SQLite profile {profile!r}; expected one of {', '.join(PROFILES)}")
+    if profile == DEFAULT:
+        return []
+    return [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        # Negative cache_size is in KiB
+        f"PRAGMA cache_size=-{settings.sqlite_cache_size_mb * 1024}",
+        f"PRAGMA mmap_size={settings.sqlite_mmap_size_mb * 1024 * 1024}",
+        "PRAGMA temp_store=MEMORY",
+        f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+    ]
+
+
+def apply_sqlite_profile(engine: Engine, profile: Optional[str] = None):
+    # Run the profile's pragmas on every connection a (sync) SQLite engine opens
+    if not is_sqlite_file(engine.url.render_as_string(hide_password=False)):
+        return
+    pragmas = profile_pragmas(profile)
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def sqlite_pool_options(profile: Optional[str] = None) -> dict:
+    # Pool for a SQLite file: connections are local, so no pre-ping round trip, and
+    # a fixed set of persistent connections (no overflow connections that
+    # re-open the file and re-run the pragmas)
+    if (profile or settings.sqlite_profile) == DEFAULT:
+        return {}
+    return {
+        "pool_size": settings.db_pool_size + settings.db_max_overflow,
+        "max_overflow": 0,
+        "pool_pre_ping": False,
+    }
+
+
+async def checkpoint(engine: AsyncEngine, mode: str = "PASSIVE") -> Optional[dict]:
+    # Copy WAL pages back into the database file; None when the database isn't in WAL mode
+    async with engine.connect() as conn:
+        if (await conn.scalar(text("PRAGMA journal_mode"))).lower() != "wal":
+            return None
+        busy, log_pages, checkpointed = (await conn.execute(text(f"PRAGMA wal_checkpoint({mode})"))).one()
+        await conn.execute(text("PRAGMA optimize"))
+    return {"busy": bool(busy), "wal_pages": log_pages, "checkpointed_pages": checkpointed}
+
+
+async def run_maintenance(engine: AsyncEngine):
+    # Background task started by the API's lifespan (performance profile only)
+    while True:
+        await asyncio.sleep(settings.sqlite_checkpoint_interval_seconds)
+        try:
+            result = await checkpoint(engine)
+            logger.debug("SQLite checkpoint: %s", result)
+        except Exception as e:
+            logger.warning("SQLite checkpoint failed: %s: %s", type(e).__name__, e)
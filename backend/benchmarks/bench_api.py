@@ -0,0 +1,523 @@
+# End-to-end API benchmark and load harness
+#
+# Seeds a database of the requested size with seed_data.py (cached between
+# runs), then drives every route of the app with concurrent clients -
+# in-process through ASGI, over a real uvicorn server, or both - and reports
+# p50/p95/p99 latency, throughput and peak RSS per route. Results can be
+# stored as JSON baselines; later runs are compared against them and exit
+# non-zero when a route regresses by more than --threshold.
+#
+# Everything runs offline on one machine. PostgreSQL needs a local server
+# passed with --database-url (and a sync driver such as psycopg2 for seeding).
+#
+# Usage (from backend/):
+#   python -m benchmarks.bench_api --rows 10k --mode both --save-baseline
+#   python -m benchmarks.bench_api --rows 10k --mode both        # compare
+#   python -m benchmarks.bench_api --rows 1m --concurrency 32 --requests 400
+#   python -m benchmarks.bench_api --rows 10m --workers 8 --database-url postgresql://localhost/bench
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+import httpx
+from sqlalchemy import create_engine, func, inspect, select, text
+from sqlalchemy.engine import make_url
+from benchmarks.harness import (
+    RouteResult,
+    Stopwatch,
+    baseline_path,
+    environment,
+    find_regressions,
+    load_baseline,
+    print_report,
+    process_peak_rss_mb,
+    save_baseline,
+    self_peak_rss_mb,
+)
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+DATA_DIR = Path(__file__).resolve().parent / ".data"
+ROW_PRESETS = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+CHART_IDS = ["revenue-over-time", "mrr-growth", "customer-churn", "customer-activity", "cohort-retention"]
+
+# Typeahead input: a few keystrokes, from common to rare prefixes and two-word queries
+SEARCH_PREFIXES = ["a", "s", "jo", "tech", "smith", "group", "inc", "william", "and so", "zq"]
+
+# Rows created by the write routes carry this prefix so they can be cleaned up
+BENCH_PREFIX = "Bench Load"
+
+
+def parse_rows(value: str) -> int:
+    if value.lower() in ROW_PRESETS:
+        return ROW_PRESETS[value.lower()]
+    return int(value.replace("_", ""))
+
+
+# ---------------------------------------------------------------------------
+# Database preparation
+
+
+def default_database_url(rows: int) -> str:
+    return f"sqlite:///{DATA_DIR / f'customers-{rows}.db'}"
+
+
+def count_rows(url: str) -> int:
+    engine = create_engine(url)
+    try:
+        with engine.connect() as conn:
+            if not inspect(conn).has_table("customers"):
+                return 0
+            return conn.execute(text("SELECT COUNT(*) FROM customers")).scalar_one()
+    finally:
+        engine.dispose()
+
+
+def prepare_database(url: str, rows: int, seed: int, workers: int, reseed: bool):
+    # Seed through seed_data.py in a child process so generation doesn't count towards our RSS
+
+    DATA_DIR.mkdir(exist_ok=True)
+    if not reseed and count_rows(url) == rows:
+        print(f"Reusing seeded database ({rows:,} rows)")
+        return
+
+    subprocess.run(
+        [sys.executable, "seed_data.py", "--count", str(rows), "--seed", str(seed), "--workers", str(workers), "--yes"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "DATABASE_URL": url},
+        check=True
+    )
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        # Planner statistics, as a production database would have
+        conn.execute(text("ANALYZE"))
+    engine.dispose()
+
+
+def cleanup_database(url: str):
+    # Remove rows created by the write routes so the dataset size stays fixed
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM customers WHERE company_name LIKE :prefix"), {"prefix": f"{BENCH_PREFIX}%"})
+    engine.dispose()
+
+
+# ---------------------------------------------------------------------------
+# Scenario
+
+
+@dataclass
+class Context:
+    # Facts about the seeded data used to build realistic requests
+    rows: int
+    max_id: int
+    first_signup: datetime
+    last_signup: datetime
+    created: list[int] = field(default_factory=list)
+    app: Optional[object] = None  # Set when the app runs in-process
+
+
+def load_context(url: str, rows: int) -> Context:
+    from app.models.customer import Customer
+
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        max_id, first, last = conn.execute(
+            select(func.max(Customer.id), func.min(Customer.signup_date), func.max(Customer.signup_date))
+        ).one()
+    engine.dispose()
+    return Context(rows=rows, max_id=max_id or 1, first_signup=first, last_signup=last)
+
+
+def new_customer(rng: random.Random) -> dict:
+    return {
+        "company_name": f"{BENCH_PREFIX} {rng.randrange(10 ** 9)}",
+        "industry": rng.choice(["Technology", "Healthcare", "Finance"]),
+        "employee_count": rng.randint(1, 500),
+        "plan": rng.choice(["starter", "growth", "enterprise"]),
+        "mrr": round(rng.uniform(29, 5000), 2),
+    }
+
+
+def random_cursor(rng: random.Random, ctx: Context) -> str:
+    from app.services.pagination import encode_cursor
+
+    span = (ctx.last_signup - ctx.first_signup).total_seconds()
+    return encode_cursor(ctx.first_signup + timedelta(seconds=rng.uniform(0, span)), ctx.max_id)
+
+
+def random_skip(rng: random.Random, ctx: Context) -> int:
+    return rng.randrange(0, max(1, min(ctx.rows, 10_000) - 100))
+
+
+# A request builder returns (method, url, httpx request kwargs)
+Request = tuple[str, str, dict]
+
+
+@dataclass
+class Route:
+    name: str
+    build: Callable[[random.Random, Context], Request]
+    share: float = 1.0        # Fraction of --requests sent to this route
+    write: bool = False       # Writes run after the reads and are not warmed up
+    after: Optional[Callable[[Context, httpx.Response], None]] = None
+    enabled: Optional[Callable[[], bool]] = None  # Routes that only exist behind a setting
+    # Routes that never finish: sends the request itself and reports whether the first event arrived
+    send: Optional[Callable[[httpx.AsyncClient, Context, Request], Awaitable[bool]]] = None
+
+
+def _setting(name: str) -> Callable[[], bool]:
+    # Read when the run starts, after main() has put the app's settings in the environment
+    def enabled() -> bool:
+        from app.config import settings
+        return getattr(settings, name)
+    return enabled
+
+
+def _remember_created(ctx: Context, response: httpx.Response):
+    if response.status_code == 201:
+        ctx.created.append(response.json()["id"])
+
+
+def _bulk_body(rng: random.Random) -> bytes:
+    return "\n".join(json.dumps(new_customer(rng)) for _ in range(100)).encode()
+
+
+# Change feed connections are timed up to their first event, the `ready` position
+READY_EVENT = "ready"
+
+
+def _asgi_scope(kind: str, url: str) -> dict:
+    path, _, query = url.partition("?")
+    return {
+        "type": kind, "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http" if kind == "http" else "ws", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": query.encode(), "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 0),
+        "server": ("bench", 80), "subprotocols": [],
+    }
+
+
+def _is_ready(message: dict) -> bool:
+    if message["type"] == "http.response.body":
+        return f"event: {READY_EVENT}\n".encode() in message.get("body", b"")
+    if message["type"] == "websocket.send":
+        return json.loads(message.get("text") or "{}").get("type") == READY_EVENT
+    return False
+
+
+async def _asgi_first_event(app, scope: dict) -> bool:
+    # httpx.ASGITransport only returns once the app does, which a feed never does:
+    # run the app directly until it sends the ready event, then cancel it
+    pending = [{"type": "websocket.connect"} if scope["type"] == "websocket" else {"type": "http.request", "body": b""}]
+    ready = asyncio.Event()
+
+    async def receive():
+        if pending:
+            return pending.pop()
+        await asyncio.Future()  # The client stays connected until cancelled
+
+    async def send(message):
+        if _is_ready(message):
+            ready.set()
+
+    app_task = asyncio.create_task(app(scope, receive, send))
+    ready_task = asyncio.create_task(ready.wait())
+    await asyncio.wait({app_task, ready_task}, return_when=asyncio.FIRST_COMPLETED)
+    for task in (app_task, ready_task):
+        task.cancel()
+    await asyncio.gather(app_task, ready_task, return_exceptions=True)
+    return ready.is_set()
+
+
+async def _sse_first_event(client: httpx.AsyncClient, ctx: Context, request: Request) -> bool:
+    method, url, kwargs = request
+    if ctx.app is not None:
+        return await _asgi_first_event(ctx.app, _asgi_scope("http", url))
+    async with client.stream(method, url, **kwargs) as response:
+        async for line in response.aiter_lines():
+            if line == f"event: {READY_EVENT}":
+                return True
+    return False
+
+
+async def _ws_first_event(client: httpx.AsyncClient, ctx: Context, request: Request) -> bool:
+    _, url, _ = request
+    if ctx.app is not None:
+        return await _asgi_first_event(ctx.app, _asgi_scope("websocket", url))
+    import websockets  # Installed with uvicorn[standard]
+
+    try:
+        async with websockets.connect(str(client.base_url.copy_with(scheme="ws")).rstrip("/") + url) as websocket:
+            return json.loads(await websocket.recv()).get("type") == READY_EVENT
+    except (OSError, websockets.WebSocketException):
+        return False
+
+
+ROUTES = [
+    Route("GET /", lambda rng, ctx: ("GET", "/", {})),
+    Route("GET /health", lambda rng, ctx: ("GET", "/health", {})),
+    Route("GET /metrics", lambda rng, ctx: ("GET", "/metrics", {}), share=0.1, enabled=_setting("metrics_enabled")),
+    Route("GET /api/customers", lambda rng, ctx: (
+        "GET", f"/api/customers?skip={random_skip(rng, ctx)}&limit=100", {})),
+    Route("GET /api/customers cursor", lambda rng, ctx: (
+        "GET", f"/api/customers?cursor={random_cursor(rng, ctx)}&limit=100&count=none", {})),
+    Route("GET /api/customers filtered", lambda rng, ctx: (
+        "GET", f"/api/customers?plan={rng.choice(['starter', 'growth', 'enterprise'])}&is_active=true"
+               f"&skip={random_skip(rng, ctx)}&count=estimate", {})),
+    Route("GET /api/customers sort=ltv", lambda rng, ctx: (
+        "GET", f"/api/customers?sort=ltv&skip={rng.randrange(0, 1000)}&limit=50&count=none", {}), share=0.5),
+    Route("GET /api/customers min_ltv", lambda rng, ctx: (
+        "GET", f"/api/customers?min_ltv={rng.choice([10_000, 50_000, 100_000])}&limit=50", {}), share=0.5),
+    Route("GET /api/customers fields", lambda rng, ctx: (
+        "GET", f"/api/customers?fields=id,company_name,plan,mrr,lifetime_value&limit=500"
+               f"&skip={random_skip(rng, ctx)}&count=none", {})),
+    Route("GET /api/customers/export", lambda rng, ctx: (
+        "GET", "/api/customers/export?format=ndjson&plan=enterprise&is_active=false", {}), share=0.02),
+    Route("GET /api/customers/search", lambda rng, ctx: (
+        "GET", f"/api/customers/search?q={rng.choice(SEARCH_PREFIXES)}&limit=10", {})),
+    Route("GET /api/customers/{id}", lambda rng, ctx: (
+        "GET", f"/api/customers/{rng.randint(1, ctx.max_id)}", {})),
+    Route("GET /api/customer/stats/summary", lambda rng, ctx: ("GET", "/api/customer/stats/summary", {})),
+    Route("GET /api/customer/stats/ltv", lambda rng, ctx: ("GET", "/api/customer/stats/ltv", {}), share=0.25),
+    Route("GET /api/customer/stats/summary/consistency", lambda rng, ctx: (
+        "GET", "/api/customer/stats/summary/consistency", {}), share=0.05),
+    *[
+        Route(f"GET /api/charts/{chart_id}", (lambda chart_id: lambda rng, ctx: (
+            "GET", f"/api/charts/{chart_id}?granularity={rng.choice(['day', 'week', 'month'])}", {}))(chart_id),
+            share=0.25)
+        for chart_id in CHART_IDS
+    ],
+    Route("GET /api/debug/queries", lambda rng, ctx: ("GET", "/api/debug/queries", {}), share=0.05,
+          enabled=_setting("query_profiler_enabled")),
+    Route("GET /api/changes", lambda rng, ctx: ("GET", "/api/changes", {}), share=0.25, send=_sse_first_event),
+    Route("WEBSOCKET /api/changes/ws", lambda rng, ctx: ("GET", "/api/changes/ws", {}), share=0.25,
+          send=_ws_first_event),
+    Route("POST /api/customers", lambda rng, ctx: (
+        "POST", "/api/customers", {"json": new_customer(rng)}), write=True, after=_remember_created),
+    Route("PATCH /api/customers/{id}", lambda rng, ctx: (
+        "PATCH", f"/api/customers/{rng.choice(ctx.created)}", {"json": {"mrr": round(rng.uniform(29, 5000), 2)}}),
+        write=True),
+    Route("DELETE /api/customers/{id}", lambda rng, ctx: (
+        "DELETE", f"/api/customers/{ctx.created.pop()}", {}), write=True),
+    Route("POST /api/customers/bulk", lambda rng, ctx: (
+        "POST", "/api/customers/bulk",
+        {"content": _bulk_body(rng), "headers": {"content-type": "application/x-ndjson"}}),
+        share=0.1, write=True),
+    Route("POST /api/charts/rollups/rebuild", lambda rng, ctx: ("POST", "/api/charts/rollups/rebuild", {}),
+          share=0.01, write=True),
+]
+
+
+# ---------------------------------------------------------------------------
+# Driver
+
+
+async def run_route(
+    client: httpx.AsyncClient,
+    route: Route,
+    ctx: Context,
+    rng: random.Random,
+    requests: int,
+    concurrency: int
+) -> RouteResult:
+    # Send `requests` requests for one route from `concurrency` concurrent clients
+
+    result = RouteResult(route.name)
+    remaining = iter(range(requests))
+
+    async def client_loop():
+        for _ in remaining:
+            method, url, kwargs = route.build(rng, ctx)
+            start = time.perf_counter()
+            try:
+                if route.send:
+                    response, ok = None, await route.send(client, ctx, (method, url, kwargs))
+                else:
+                    response = await client.request(method, url, **kwargs)
+                    ok = response.status_code < 400
+            except httpx.HTTPError:
+                response, ok = None, False
+            result.record(time.perf_counter() - start, ok)
+            if response is not None and route.after:
+                route.after(ctx, response)
+
+    with Stopwatch() as stopwatch:
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    result.wall_seconds = stopwatch.seconds
+    return result
+
+
+async def drive(client: httpx.AsyncClient, ctx: Context, args) -> dict:
+    rng = random.Random(args.seed)
+    results = {}
+    for route in ROUTES:
+        if route.enabled and not route.enabled():
+            continue
+        requests = max(1, int(args.requests * route.share))
+        if route.name.startswith(("PATCH", "DELETE")):
+            requests = min(requests, len(ctx.created))
+            if requests == 0:
+                continue
+        if not route.write:
+            await run_route(client, route, ctx, rng, min(args.warmup, requests), 1)
+        result = await run_route(client, route, ctx, rng, requests, args.concurrency)
+        results[route.name] = result.summary()
+        print(f"  {route.name:<45} {results[route.name]['p95_ms']:>9.2f} ms p95", flush=True)
+    return results
+
+
+async def run_asgi(ctx: Context, args) -> dict:
+    # In-process: the app and the clients share this event loop
+    from app.main import app
+
+    ctx.app = app
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            routes = await drive(client, ctx, args)
+    return {"routes": routes, "peak_rss_mb": round(self_peak_rss_mb(), 1)}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_ready(base_url: str, server: subprocess.Popen, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise SystemExit(f"uvicorn exited with code {server.returncode}")
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise SystemExit("uvicorn did not become ready in time")
+
+
+async def run_uvicorn(ctx: Context, args) -> dict:
+    # Real HTTP against a uvicorn subprocess; RSS is the server's, not ours
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR,
+        env=os.environ.copy()
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        await wait_until_ready(base_url, server)
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=None) as client:
+            routes = await drive(client, ctx, args)
+        peak_rss = process_peak_rss_mb(server.pid)
+    finally:
+        server.send_signal(signal.SIGINT)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+    return {"routes": routes, "peak_rss_mb": round(peak_rss, 1) if peak_rss else None}
+
+
+# ---------------------------------------------------------------------------
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="End-to-end API benchmark and load harness")
+    parser.add_argument("--rows", type=parse_rows, default="10k", help="10k, 1m, 10m or an exact row count")
+    parser.add_argument("--database-url", default=None, help="Sync database URL (default: SQLite under benchmarks/.data)")
+    parser.add_argument("--mode", choices=["asgi", "uvicorn", "both"], default="asgi")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per route (scaled per route)")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--no-cache", action="store_true", help="Disable the response cache")
+    parser.add_argument("--query-profiler", action="store_true", help="Profile queries (and benchmark /api/debug/queries)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=1, help="Data generator processes")
+    parser.add_argument("--reseed", action="store_true")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative regression (0.2 = 20%%)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    url = args.database_url or default_database_url(args.rows)
+    database = make_url(url).get_backend_name()
+
+    # The app (in-process or uvicorn) reads its settings from the environment
+    os.environ["DATABASE_URL"] = url
+    os.environ["DEBUG"] = "false"
+    os.environ["LOG_LEVEL"] = "WARNING"
+    if args.no_cache:
+        os.environ["RESPONSE_CACHE_TTL_SECONDS"] = "0"
+    if args.query_profiler:
+        os.environ["QUERY_PROFILER_ENABLED"] = "true"
+
+    prepare_database(url, args.rows, args.seed, args.workers, args.reseed)
+    modes = ["asgi", "uvicorn"] if args.mode == "both" else [args.mode]
+
+    failed = False
+    for mode in modes:
+        cleanup_database(url)
+        ctx = load_context(url, args.rows)
+        print(f"\n{mode}: {database}, {args.rows:,} rows, concurrency {args.concurrency}")
+        runner = run_asgi if mode == "asgi" else run_uvicorn
+        report = asyncio.run(runner(ctx, args))
+        report["meta"] = {
+            "database": database,
+            "rows": args.rows,
+            "mode": mode,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "response_cache": not args.no_cache,
+            "query_profiler": args.query_profiler,
+            "recorded_at": datetime.utcnow().isoformat(timespec="seconds"),
+            **environment(),
+        }
+        print()
+        print_report(report)
+
+        label = mode + ("-nocache" if args.no_cache else "") + ("-profiler" if args.query_profiler else "")
+        path = baseline_path(database, args.rows, label)
+        if args.save_baseline:
+            save_baseline(path, report)
+            print(f"Saved baseline {path}")
+            continue
+
+        baseline = load_baseline(path)
+        if baseline is None:
+            print(f"No baseline at {path} (run with --save-baseline)")
+            continue
+        regressions = find_regressions(report, baseline, args.threshold)
+        if regressions:
+            failed = True
+            print(f"Regressions above {args.threshold:.0%} vs {path.name}:")
+            for line in regressions:
+                print(f"  {line}")
+        else:
+            print(f"No regressions above {args.threshold:.0%} vs {path.name}")
+
+    cleanup_database(url)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
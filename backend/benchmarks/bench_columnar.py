@@ -0,0 +1,123 @@
+# Benchmark: analytics aggregates from the columnar snapshot vs SQL
+#
+# Seeds (or reuses) the bench_api database of the requested size, builds the
+# in-memory columnar snapshot once, then runs the segmented summary and LTV
+# aggregates both ways. Reports build time, snapshot memory (column bytes and
+# the process RSS growth), the cost of an incremental refresh after a small
+# batch of updates, and per-query latency for each path. The RSS growth also
+# covers SQLite's page cache and memory-mapped reads during the build
+# (SQLITE_PROFILE=default leaves those out).
+#
+# Usage (from backend/):
+#   python -m benchmarks.bench_columnar --rows 1m
+#   python -m benchmarks.bench_columnar --rows 10m --workers 8 --repeat 5
+
+import argparse
+import asyncio
+import inspect
+import os
+import random
+import statistics
+import time
+from datetime import datetime
+from benchmarks.bench_api import default_database_url, parse_rows, prepare_database
+from benchmarks.harness import self_peak_rss_mb
+
+# Segments the dashboard asks for: whole table, an industry, an MRR band and both
+SEGMENTS = [
+    {},
+    {"industry": ["Technology"]},
+    {"min_mrr": 500.0, "max_mrr": 2000.0},
+    {"industry": ["Healthcare"], "min_mrr": 100.0},
+]
+
+
+async def timed(fn, repeat: int) -> float:
+    # Median latency of fn() (sync or async) in milliseconds
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        if inspect.isawaitable(result):
+            await result
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+async def run(rows: int, repeat: int):
+    # App modules read DATABASE_URL at import time, so import them here
+    from sqlalchemy import update
+    from app.database import AsyncSessionLocal, dispose_engines
+    from app.models.customer import Customer
+    from app.security.input_validator import CustomerFilterInput
+    from app.services.columnar import columnar_snapshot
+    from app.services.filters import compile_filters, snapshot_filters
+    from app.services.stats import aggregate_by_plan, build_summary, ltv_summary
+
+    async with AsyncSessionLocal() as db:
+        rss_before = self_peak_rss_mb()
+        start = time.perf_counter()
+        await columnar_snapshot.ensure_fresh(db)
+        build_seconds = time.perf_counter() - start
+        rss_after = self_peak_rss_mb()
+        print(f"Snapshot build: {columnar_snapshot.rows:,} rows in {build_seconds:.2f}s")
+        print(f"Snapshot memory: {columnar_snapshot.nbytes / 2**20:.1f} MB of columns, "
+              f"peak RSS +{rss_after - rss_before:.1f} MB ({columnar_snapshot.nbytes / max(rows, 1):.0f} bytes/row)")
+
+        # Incremental refresh after a burst of single-row writes
+        rng = random.Random(7)
+        for customer_id in rng.sample(range(1, rows + 1), k=min(1000, rows)):
+            await db.execute(
+                update(Customer).where(Customer.id == customer_id).values(updated_at=datetime.utcnow())
+            )
+        await db.commit()
+        columnar_snapshot.mark_dirty()
+        start = time.perf_counter()
+        await columnar_snapshot.ensure_fresh(db)
+        print(f"Incremental refresh (1,000 updated rows): {(time.perf_counter() - start) * 1000:.1f} ms")
+        print()
+
+        print(f"{'query':<52} {'sql ms':>10} {'columnar ms':>12} {'speedup':>9}")
+        for segment in SEGMENTS:
+            spec = CustomerFilterInput(**segment)
+            clauses, snapshot_kwargs = compile_filters(spec), snapshot_filters(spec)
+            label = ", ".join(f"{key}={value}" for key, value in segment.items()) or "all customers"
+            queries = [
+                (
+                    f"summary ({label})",
+                    lambda: aggregate_by_plan(db, clauses),
+                    lambda: build_summary(columnar_snapshot.per_plan(**snapshot_kwargs)),
+                ),
+                (
+                    f"ltv ({label})",
+                    lambda: ltv_summary(db, None, clauses),
+                    lambda: columnar_snapshot.ltv_summary(**snapshot_kwargs),
+                ),
+            ]
+            for name, sql, columnar in queries:
+                sql_ms = await timed(sql, repeat)
+                columnar_ms = await timed(columnar, repeat)
+                print(f"{name:<52} {sql_ms:>10.1f} {columnar_ms:>12.2f} {sql_ms / columnar_ms:>8.0f}x")
+
+    await dispose_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=parse_rows, default=parse_rows("1m"), help="10k, 1m, 10m or a number")
+    parser.add_argument("--repeat", type=int, default=10, help="Runs per query (median reported)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--reseed", action="store_true")
+    args = parser.parse_args()
+
+    url = default_database_url(args.rows)
+    prepare_database(url, args.rows, args.seed, args.workers, args.reseed)
+    os.environ["DATABASE_URL"] = url
+    os.environ.setdefault("DEBUG", "false")
+    os.environ.setdefault("CHURN_JOB_ENABLED", "false")
+    asyncio.run(run(args.rows, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
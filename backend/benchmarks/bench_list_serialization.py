@@ -0,0 +1,72 @@
+# Benchmark: customer list through the ORM/response-model path vs ?fields= projection
+#
+# Runs the real endpoint in-process against DATABASE_URL (seed it first, e.g.
+# python seed_data.py --count 100000) with the response cache disabled.
+#
+# Usage (from backend/):
+#   python -m benchmarks.bench_list_serialization [--limit 500] [--requests 50]
+
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+from app.main import app
+from app.services.cache import response_cache
+from app.services.projection import PROJECTABLE_FIELDS
+
+ALL_FIELDS = ",".join(PROJECTABLE_FIELDS)
+NARROW_FIELDS = "id,company_name,plan,mrr,lifetime_value"
+
+
+async def time_requests(client: httpx.AsyncClient, url: str, count: int) -> list[float]:
+    timings = []
+    for i in range(count):
+        start = time.perf_counter()
+        response = await client.get(url)
+        timings.append(time.perf_counter() - start)
+        response.raise_for_status()
+    return timings
+
+
+async def run(limit: int, count: int, sort: str):
+    # Every request must hit the database and the serializer
+    response_cache.ttl = 0
+
+    cases = [
+        ("orm + CustomerResponse", f"/api/customers?limit={limit}&sort={sort}&count=none"),
+        ("projection, all fields", f"/api/customers?limit={limit}&sort={sort}&count=none&fields={ALL_FIELDS}"),
+        ("projection, 5 fields", f"/api/customers?limit={limit}&sort={sort}&count=none&fields={NARROW_FIELDS}"),
+    ]
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Both paths must return the same page
+        baseline = (await client.get(cases[0][1])).json()
+        projected = (await client.get(cases[1][1])).json()
+        assert baseline == projected, "projection output differs from the response-model path"
+
+        print(f"{limit} rows per page, sort={sort}, {count} requests each")
+        results = {}
+        for name, url in cases:
+            await time_requests(client, url, 3)  # warm up
+            timings = await time_requests(client, url, count)
+            results[name] = statistics.median(timings)
+            print(f"  {name:<24} median {results[name] * 1000:8.2f} ms")
+
+    base = results[cases[0][0]]
+    for name, _ in cases[1:]:
+        print(f"  {name}: {base / results[name]:.1f}x faster")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--limit", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--sort", choices=["signup_date", "ltv"], default="signup_date")
+    args = parser.parse_args()
+    asyncio.run(run(args.limit, args.requests, args.sort))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# Benchmark: company name typeahead
+#
+# 1. The in-memory NameIndex over 1M company names from the data generator:
+#    build time, memory and per-query latency for typeahead prefixes (1-6
+#    characters, one or two words) drawn from the indexed names.
+#    --names rows takes the company_name column of generated customer rows
+#    (names repeat across accounts, as in a seeded database); --names faker
+#    generates that many Faker company names (mostly distinct - the worst case).
+# 2. GET /api/customers/search end to end (in-process ASGI) against the
+#    bench_api database of --rows customers, next to the LIKE '%q%' query it
+#    replaces.
+#
+# Usage (from backend/):
+#   python -m benchmarks.bench_search
+#   python -m benchmarks.bench_search --names faker --count 1000000 --skip-endpoint
+#   python -m benchmarks.bench_search --rows 10m --workers 8
+
+import argparse
+import asyncio
+import os
+import random
+import time
+import tracemalloc
+from faker import Faker
+from benchmarks.bench_api import default_database_url, parse_rows, prepare_database
+from benchmarks.harness import RouteResult, Stopwatch, print_report
+
+
+def generated_names(kind: str, count: int, seed: int, workers: int) -> list[str]:
+    if kind == "faker":
+        fake = Faker()
+        fake.seed_instance(seed)
+        return [fake.company() for _ in range(count)]
+
+    from app.utils.data_generator import iter_shards
+
+    names = []
+    for shard in iter_shards(count, seed=seed, workers=workers):
+        names.extend(shard["company_name"])
+    return names
+
+
+def typeahead_queries(names: list[str], count: int, rng: random.Random) -> list[str]:
+    # What a user has typed so far: a prefix of a name's first word, sometimes plus part of the next
+    queries = []
+    for _ in range(count):
+        first, *rest = rng.choice(names).replace(",", "").split()
+        query = first[:rng.randint(1, 6)]
+        if rest and rng.random() < 0.3:
+            query = f"{first} {rest[0][:rng.randint(1, 3)]}"
+        queries.append(query)
+    return queries
+
+
+def bench_index(args) -> dict:
+    from app.services.search import NameIndex
+
+    print(f"Generating {args.count:,} company names ({args.names})...")
+    names = generated_names(args.names, args.count, args.seed, args.workers)
+    index = NameIndex()
+    with Stopwatch() as build:
+        index.extend(names)
+        index.match("warm", 1)
+        index.match("warm up", 1)
+    # Memory held by the index (traced separately; tracing slows the build down)
+    tracemalloc.start()
+    index_copy = NameIndex()
+    index_copy.extend(names)
+    index_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del index_copy
+    print(f"Index build: {len(index):,} distinct names, {len(index.vocabulary):,} words in {build.seconds:.2f}s, "
+          f"{index_bytes / 2**20:.1f} MB")
+
+    queries = typeahead_queries(names, args.queries, random.Random(args.seed))
+    result = RouteResult(f"NameIndex.match (limit {args.limit})")
+    start = time.perf_counter()
+    for query in queries:
+        t = time.perf_counter()
+        ok = bool(index.match(query, args.limit))
+        result.record(time.perf_counter() - t, ok)
+    result.wall_seconds = time.perf_counter() - start
+    return {result.name: result.summary()}
+
+
+async def bench_endpoint(args) -> dict:
+    # App modules read DATABASE_URL at import time, so import them here
+    import httpx
+    from sqlalchemy import select
+    from app.database import AsyncSessionLocal, dispose_engines
+    from app.main import app
+    from app.models.customer import Customer
+
+    async with AsyncSessionLocal() as db:
+        names = (await db.scalars(select(Customer.company_name).distinct())).all()
+    queries = typeahead_queries(names, args.queries, random.Random(args.seed))
+    routes = {}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        with Stopwatch() as build:
+            (await client.get("/api/customers/search", params={"q": "a"})).raise_for_status()
+        print(f"Endpoint: index built on first request in {build.seconds:.2f}s")
+
+        result = RouteResult("GET /api/customers/search")
+        start = time.perf_counter()
+        for query in queries:
+            t = time.perf_counter()
+            response = await client.get("/api/customers/search", params={"q": query, "limit": args.limit})
+            result.record(time.perf_counter() - t, response.status_code == 200)
+        result.wall_seconds = time.perf_counter() - start
+        routes[result.name] = result.summary()
+
+    # The query this replaces: a full scan per keystroke, so only a few samples
+    like = RouteResult("SQL LIKE '%q%' (baseline)")
+    async with AsyncSessionLocal() as db:
+        start = time.perf_counter()
+        for query in queries[:args.baseline_queries]:
+            t = time.perf_counter()
+            await db.execute(
+                select(Customer.id, Customer.company_name)
+                .where(Customer.company_name.like(f"%{query}%"))
+                .order_by(Customer.company_name)
+                .limit(args.limit)
+            )
+            like.record(time.perf_counter() - t, True)
+        like.wall_seconds = time.perf_counter() - start
+    routes[like.name] = like.summary()
+
+    await dispose_engines()
+    return routes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--names", choices=["rows", "faker"], default="rows")
+    parser.add_argument("--count", type=parse_rows, default=parse_rows("1m"), help="Names to index (10k, 1m or a number)")
+    parser.add_argument("--rows", type=parse_rows, default=parse_rows("1m"), help="Customers in the endpoint database")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--baseline-queries", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--reseed", action="store_true")
+    parser.add_argument("--skip-endpoint", action="store_true")
+    args = parser.parse_args()
+
+    # Before anything imports the app's settings
+    if not args.skip_endpoint:
+        url = default_database_url(args.rows)
+        prepare_database(url, args.rows, args.seed, args.workers, args.reseed)
+        os.environ["DATABASE_URL"] = url
+    os.environ.setdefault("DEBUG", "false")
+    os.environ.setdefault("CHURN_JOB_ENABLED", "false")
+
+    routes = bench_index(args)
+    if not args.skip_endpoint:
+        routes.update(asyncio.run(bench_endpoint(args)))
+
+    print()
+    print_report({"routes": routes})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# Benchmark: concurrent read/write throughput of the SQLite storage profiles
+#
+# Seeds a SQLite file once, then for each profile ("default" rollback journal
+# vs "performance" WAL + tuned pragmas) runs reader threads issuing the
+# customer list page + count queries the API uses, alongside writer threads
+# updating single customers one transaction at a time (like PATCH). Reports
+# per-operation latency, throughput and "database is locked" errors.
+#
+# Usage (from backend/):
+#   python -m benchmarks.bench_sqlite_profile [--rows 100000] [--seconds 10] [--readers 8] [--writers 2]
+
+import argparse
+import random
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from app.models.customer import Base, Customer, PlanType
+from app.security.input_validator import CustomerFilterInput
+from app.services.filters import compile_filters
+from app.services.pagination import SortField, count_query, page_query
+from app.utils.data_generator import bulk_insert_shard, iter_shards
+from app.utils.sqlite_profile import DEFAULT, PERFORMANCE, apply_sqlite_profile, sqlite_pool_options
+from benchmarks.harness import RouteResult, print_report
+
+PLANS = [None, *PlanType]
+
+
+def seed(path: Path, rows: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        for shard in iter_shards(rows, seed=42, now=datetime.utcnow()):
+            bulk_insert_shard(db, shard)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    engine.dispose()
+
+
+def make_engine(path: Path, profile: str, threads: int):
+    options = sqlite_pool_options(profile) or {"pool_size": threads}
+    options["pool_size"] = max(options["pool_size"], threads)
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False}, **options)
+    apply_sqlite_profile(engine, profile)
+    return engine
+
+
+def reader(engine, result: RouteResult, stop: threading.Event, rng: random.Random):
+    while not stop.is_set():
+        plan = rng.choice(PLANS)
+        filters = compile_filters(CustomerFilterInput(plan=[plan] if plan else None, is_active=rng.choice([None, True])))
+        start = time.perf_counter()
+        ok = True
+        try:
+            with engine.connect() as conn:
+                conn.execute(page_query(select(Customer), filters, SortField.SIGNUP_DATE, skip=rng.randrange(0, 1000), limit=101)).all()
+                conn.execute(count_query(filters)).scalar()
+        except OperationalError:
+            ok = False
+        result.record(time.perf_counter() - start, ok)
+
+
+def writer(engine, result: RouteResult, stop: threading.Event, rng: random.Random, rows: int):
+    while not stop.is_set():
+        start = time.perf_counter()
+        ok = True
+        try:
+            with engine.begin() as conn:
+                conn.execute(
+                    update(Customer)
+                    .where(Customer.id == rng.randint(1, rows))
+                    .values(mrr=round(rng.uniform(10, 5000), 2), last_activity=datetime.utcnow())
+                )
+        except OperationalError:
+            ok = False
+        result.record(time.perf_counter() - start, ok)
+
+
+def run_profile(path: Path, profile: str, rows: int, seconds: float, readers: int, writers: int) -> dict:
+    engine = make_engine(path, profile, readers + writers)
+    reads, writes = RouteResult(f"{profile}: read"), RouteResult(f"{profile}: write")
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=reader, args=(engine, reads, stop, random.Random(i)))
+        for i in range(readers)
+    ] + [
+        threading.Thread(target=writer, args=(engine, writes, stop, random.Random(1000 + i), rows))
+        for i in range(writers)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    reads.wall_seconds = writes.wall_seconds = time.perf_counter() - start
+    engine.dispose()
+    return {r.name: r.summary() for r in (reads, writes)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-sqlite-") as tmp:
+        seeded = Path(tmp) / "seed.db"
+        print(f"Seeding {args.rows} customers...")
+        seed(seeded, args.rows)
+
+        routes = {}
+        for profile in (DEFAULT, PERFORMANCE):
+            # Each profile starts from an identical rollback-journal file
+            path = Path(tmp) / f"{profile}.db"
+            shutil.copyfile(seeded, path)
+            print(f"Running {profile} profile: {args.readers} readers, {args.writers} writers, {args.seconds:.0f}s")
+            routes.update(run_profile(path, profile, args.rows, args.seconds, args.readers, args.writers))
+
+    print()
+    print_report({"routes": routes})
+    for kind in ("read", "write"):
+        before = routes[f"{DEFAULT}: {kind}"]["throughput_rps"]
+        after = routes[f"{PERFORMANCE}: {kind}"]["throughput_rps"]
+        if before:
+            print(f"{kind} throughput: {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# Benchmark: API process cold start
+#
+# What an autoscaled worker pays before it can serve traffic, over --runs
+# fresh processes:
+# 1. `python -X importtime -c "import app.main"`: import time of app.main and
+#    the packages that take longest to import (self time, summed per package).
+# 2. A uvicorn server started from scratch: time from spawning the process to
+#    the first 200 from /health (interpreter start, imports, lifespan startup
+#    and the first database round trip).
+# The database is a throwaway SQLite file unless --database-url is given:
+# startup creates missing tables and indexes, which shouldn't touch a real one.
+#
+# Usage (from backend/):
+#   python -m benchmarks.bench_startup
+#   python -m benchmarks.bench_startup --runs 20 --top 15
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from pathlib import Path
+from benchmarks.bench_api import free_port
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def import_times(env: dict) -> tuple[float, Counter]:
+    # Cumulative import time of app.main (seconds) and self time per top-level package
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    total, packages = 0.0, Counter()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        packages[name.strip().split(".")[0]] += int(self_us) / 1e6
+        if name.strip() == "app.main":
+            total = int(cumulative_us) / 1e6
+    return total, packages
+
+
+def first_response_seconds(env: dict, timeout: float = 60.0) -> float:
+    # Spawn uvicorn and poll /health until it answers 200
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/health"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env=env
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                raise SystemExit(f"uvicorn exited with code {server.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            time.sleep(0.005)
+        raise SystemExit("uvicorn did not become ready in time")
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def describe(samples: list[float]) -> str:
+    ms = [s * 1000 for s in samples]
+    return f"median {statistics.median(ms):8.1f} ms   min {min(ms):8.1f}   max {max(ms):8.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10, help="Fresh processes per measurement")
+    parser.add_argument("--top", type=int, default=10, help="Slowest packages to list")
+    parser.add_argument("--database-url", default=None, help="Sync database URL (default: a temporary SQLite file)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-startup-") as tmp:
+        env = {
+            **os.environ,
+            "DATABASE_URL": args.database_url or f"sqlite:///{tmp}/customers.db",
+            "ASYNC_DATABASE_URL": "",
+            "DEBUG": "false",
+            "LOG_LEVEL": "WARNING",
+            "CHURN_JOB_ENABLED": "false",
+            "SECURITY_LOG_FILE": os.path.join(tmp, "security.log"),
+        }
+        # Warm-up: bytecode caches written and the database created, as on a deployed image
+        import_times(env)
+        first_response_seconds(env)
+
+        imports, packages = [], Counter()
+        for _ in range(args.runs):
+            total, per_package = import_times(env)
+            imports.append(total)
+            packages.update(per_package)
+        responses = [first_response_seconds(env) for _ in range(args.runs)]
+
+    print(f"Cold start over {args.runs} fresh processes")
+    print(f"  import app.main            {describe(imports)}")
+    print(f"  spawn -> first /health 200 {describe(responses)}")
+    print()
+    print("Slowest packages to import (self time, mean per process):")
+    for package, seconds in packages.most_common(args.top):
+        print(f"  {package:<28} {seconds / args.runs * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# Shared pieces of the API load harness: latency stats, peak RSS and baselines
+
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+import numpy as np
+
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+
+
+@dataclass
+class RouteResult:
+    # Latencies (seconds) and outcome of one route's phase
+    name: str
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    wall_seconds: float = 0.0
+
+    def record(self, seconds: float, ok: bool):
+        self.latencies.append(seconds)
+        if not ok:
+            self.errors += 1
+
+    def summary(self) -> dict:
+        samples = np.array(self.latencies) * 1000
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99]) if len(samples) else (0.0, 0.0, 0.0)
+        return {
+            "requests": len(samples),
+            "errors": self.errors,
+            "p50_ms": round(float(p50), 3),
+            "p95_ms": round(float(p95), 3),
+            "p99_ms": round(float(p99), 3),
+            "throughput_rps": round(len(samples) / self.wall_seconds, 1) if self.wall_seconds else 0.0,
+        }
+
+
+class Stopwatch:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.start
+
+
+def self_peak_rss_mb() -> float:
+    # Peak resident set size of this process (ru_maxrss is KiB on Linux)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def process_peak_rss_mb(pid: int) -> Optional[float]:
+    # Peak RSS (VmHWM) of another process; None when /proc is unavailable
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+def environment() -> dict:
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def baseline_path(database: str, rows: int, mode: str) -> Path:
+    return BASELINE_DIR / f"{database}-{rows}-{mode}.json"
+
+
+def save_baseline(path: Path, report: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+
+
+def load_baseline(path: Path) -> Optional[dict]:
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def find_regressions(report: dict, baseline: dict, threshold: float) -> list[str]:
+    # Slower p95/p99, lower throughput or higher peak RSS than baseline by more than threshold
+
+    regressions = []
+    for name, current in report["routes"].items():
+        previous = baseline["routes"].get(name)
+        if previous is None:
+            continue
+        for key in ("p95_ms", "p99_ms"):
+            if previous[key] > 0 and current[key] > previous[key] * (1 + threshold):
+                regressions.append(f"{name}: {key} {previous[key]:.2f} -> {current[key]:.2f}")
+        if current["throughput_rps"] < previous["throughput_rps"] * (1 - threshold):
+            regressions.append(
+                f"{name}: throughput {previous['throughput_rps']:.1f} -> {current['throughput_rps']:.1f} rps"
+            )
+        if current["errors"] > previous["errors"]:
+            regressions.append(f"{name}: errors {previous['errors']} -> {current['errors']}")
+
+    previous_rss = baseline.get("peak_rss_mb")
+    current_rss = report.get("peak_rss_mb")
+    if previous_rss and current_rss and current_rss > previous_rss * (1 + threshold):
+        regressions.append(f"peak RSS {previous_rss:.1f} -> {current_rss:.1f} MB")
+    return regressions
+
+
+def print_report(report: dict):
+    print(f"{'route':<34}{'reqs':>7}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rps':>10}")
+    for name, r in report["routes"].items():
+        print(
+            f"{name:<34}{r['requests']:>7}{r['errors']:>5}"
+            f"{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['throughput_rps']:>10.1f}"
+        )
+    if report.get("peak_rss_mb") is not None:
+        print(f"peak RSS: {report['peak_rss_mb']:.1f} MB")
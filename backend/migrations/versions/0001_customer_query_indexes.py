@@ -0,0 +1,56 @@
+"""Composite, covering and partial indexes for the customer queries
+
+Brings databases created before these indexes existed in the model up to
+date (create_all never adds indexes to an existing table). Fresh databases
+get them from create_all, so every step is idempotent.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+
+from alembic import context, op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# (name, columns, extra dialect kwargs)
+INDEXES = [
+    ("ix_customers_signup_date_id", ["signup_date", "id"], {}),
+    ("ix_customers_last_activity", ["last_activity"], {}),
+    ("ix_customers_churned_date", ["churned_date"], {}),
+    ("ix_customers_ltv_inputs", ["plan", "is_active", "mrr", "signup_date", "churned_date"], {}),
+    ("ix_customers_is_active_plan", ["is_active", "plan", "signup_date", "id"], {}),
+    ("ix_customers_active_signup_date_id", ["signup_date", "id"], {
+        "sqlite_where": sa.text("is_active = 1"),
+        "postgresql_where": sa.text("is_active"),
+    }),
+]
+
+
+def _has_customers_table() -> bool:
+    # Offline (--sql) runs can't inspect; assume the table exists
+    if context.is_offline_mode():
+        return True
+    return sa.inspect(op.get_bind()).has_table("customers")
+
+
+def upgrade():
+    if not _has_customers_table():
+        # The API creates the table (with every index) on startup
+        return
+    for name, columns, kwargs in INDEXES:
+        op.create_index(name, "customers", columns, if_not_exists=True, **kwargs)
+    # Superseded by the (is_active, plan, ...) composite
+    op.drop_index("ix_customers_is_active", table_name="customers", if_exists=True)
+
+
+def downgrade():
+    if not _has_customers_table():
+        return
+    op.create_index("ix_customers_is_active", "customers", ["is_active"], if_not_exists=True)
+    for name, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name="customers", if_exists=True)
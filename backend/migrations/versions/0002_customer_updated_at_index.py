@@ -0,0 +1,33 @@
+"""Index on customers.updated_at for the columnar snapshot's incremental refresh
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+
+from alembic import context, op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def _has_customers_table() -> bool:
+    # Offline (--sql) runs can't inspect; assume the table exists
+    if context.is_offline_mode():
+        return True
+    return sa.inspect(op.get_bind()).has_table("customers")
+
+
+def upgrade():
+    if not _has_customers_table():
+        return
+    op.create_index("ix_customers_updated_at", "customers", ["updated_at"], if_not_exists=True)
+
+
+def downgrade():
+    if not _has_customers_table():
+        return
+    op.drop_index("ix_customers_updated_at", table_name="customers", if_exists=True)
@@ -0,0 +1,41 @@
+"""Indexes for the customer filter compiler: sort=mrr, MRR ranges, industry and employee buckets
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+
+from alembic import context, op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_customers_mrr_id": ["mrr", "id"],
+    "ix_customers_industry_signup_date": ["industry", "signup_date", "id"],
+    "ix_customers_employee_count": ["employee_count"],
+}
+
+
+def _has_customers_table() -> bool:
+    # Offline (--sql) runs can't inspect; assume the table exists
+    if context.is_offline_mode():
+        return True
+    return sa.inspect(op.get_bind()).has_table("customers")
+
+
+def upgrade():
+    if not _has_customers_table():
+        return
+    for name, columns in INDEXES.items():
+        op.create_index(name, "customers", columns, if_not_exists=True)
+
+
+def downgrade():
+    if not _has_customers_table():
+        return
+    for name in INDEXES:
+        op.drop_index(name, table_name="customers", if_exists=True)
@@ -1,24 +1,53 @@
 # Script to populate the database with demo data.
+#
+# Usage:
+#   python seed_data.py                              # 200 demo customers
+#   python seed_data.py --count 10000000 --seed 42 --workers 8 --yes
+#   python seed_data.py --seed 42 --now 2026-01-01T00:00:00   # same rows on every run
 
+import argparse
+import os
+from datetime import datetime
 from app.database import SessionLocal, create_tables, engine
 from app.utils.data_generator import seed_database
 from app.models.customer import Base
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Seed the database with synthetic customers")
+    parser.add_argument("--count", type=int, default=200, help="Number of customers to generate")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for a reproducible dataset (with --now)")
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help=f"Generator processes (this machine has {os.cpu_count()} CPUs)"
+    )
+    parser.add_argument(
+        "--now", type=datetime.fromisoformat, default=None,
+        help="Reference time (ISO 8601) the dates are generated back from (default: the current UTC time)"
+    )
+    parser.add_argument("--yes", action="store_true", help="Delete existing customers without asking")
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
+
     print("Creating database tables...")
     create_tables()
-    
+
     print("\nSeeding database with customer data...")
     db = SessionLocal()
-    
+
     try:
         # Check if already seeded
         from app.models.customer import Customer
         existing_count = db.query(Customer).count()
-        
+
         if existing_count > 0:
-            response = input(f"Database already has {existing_count} customers. Delete and reseed? (y/n): ")
+            if args.yes:
+                response = 'y'
+            else:
+                response = input(f"Database already has {existing_count} customers. Delete and reseed? (y/n): ")
             if response.lower() == 'y':
                 print("Deleting existing data...")
                 db.query(Customer).delete()
@@ -26,16 +55,15 @@ def main():
             else:
                 print("Cancelled.")
                 return
-        
-        # Seed with 200 customers
-        seed_database(db, count=200)
-        
+
+        seed_database(db, count=args.count, seed=args.seed, workers=args.workers, now=args.now)
+
         print("\n✅ Database setup complete!")
         print("You can now run the API server with: uvicorn app.main:app --reload")
-        
+
     finally:
         db.close()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,55 @@
+# Shared test setup
+#
+# The app reads its settings (and creates its engines) on import, so the
+# database and log paths are pointed at a throwaway directory before any
+# test module imports it. Tests never touch customer_data.db.
+
+import os
+import tempfile
+from datetime import datetime
+import pytest
+
+_TMP_DIR = tempfile.mkdtemp(prefix="dataspeaks-tests-")
+
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP_DIR}/customers.db"
+os.environ["ASYNC_DATABASE_URL"] = ""
+os.environ["DEBUG"] = "false"
+# Tests run the churn job explicitly instead of on app startup
+os.environ["CHURN_JOB_ENABLED"] = "false"
+os.environ["SECURITY_LOG_FILE"] = os.path.join(_TMP_DIR, "security.log")
+
+
+SEED_ROWS = 500
+
+
+@pytest.fixture(scope="session")
+def seeded_database() -> str:
+    # The app's (primary) database with SEED_ROWS customers; returns its file path
+    from sqlalchemy import select
+    from app.database import SessionLocal, create_tables, engine
+    from app.models.customer import Customer
+    from app.utils.data_generator import bulk_insert_shard, iter_shards
+
+    create_tables()
+    with SessionLocal() as db:
+        if db.scalar(select(Customer.id).limit(1)) is None:
+            for shard in iter_shards(SEED_ROWS, seed=11, now=datetime.utcnow()):
+                bulk_insert_shard(db, shard)
+    return engine.url.database
+
+
+@pytest.fixture(scope="session")
+def app_routes() -> list[tuple[str, object]]:
+    # (full path, route) for every route of the app. Newer FastAPI versions keep
+    # each included router as one entry in app.routes, so those are walked with their prefix
+    from app.main import app
+
+    def walk(routes, prefix: str):
+        for route in routes:
+            included = getattr(route, "original_router", None)
+            if included is not None:
+                yield from walk(included.routes, prefix + route.include_context.prefix)
+            else:
+                yield prefix + route.path, route
+
+    return list(walk(app.routes, ""))
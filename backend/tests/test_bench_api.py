@@ -0,0 +1,56 @@
+# API benchmark coverage
+#
+# bench_api.ROUTES must drive every route the app serves, so a new endpoint
+# can't be left out of the load harness, and must not name routes that no
+# longer exist. Route names are "<METHOD> <path>" plus an optional variant,
+# where the path is the template ({id} for {customer_id}) or a concrete path
+# such as one chart id.
+#
+# Run from backend/: pytest tests/test_bench_api.py
+
+import re
+from fastapi.routing import APIRoute
+from starlette.routing import WebSocketRoute
+from benchmarks.bench_api import ROUTES
+
+# FastAPI's own schema and documentation pages
+UNBENCHMARKED = {"/openapi.json", "/docs", "/docs/oauth2-redirect", "/redoc"}
+
+PARAM = re.compile(r"\{[^}]*\}")
+
+
+def _pattern(method: str, path: str) -> re.Pattern:
+    # Parameters match one path segment, or a parameter in the benchmark's name
+    return re.compile(re.escape(method + " ") + "[^/]+".join(re.escape(part) for part in PARAM.split(path)))
+
+
+def _served(app_routes) -> list[tuple[str, str]]:
+    served = []
+    for path, route in app_routes:
+        if path in UNBENCHMARKED:
+            continue
+        if isinstance(route, WebSocketRoute):
+            served.append(("WEBSOCKET", path))
+        elif isinstance(route, APIRoute):
+            served.extend((method, path) for method in route.methods)
+    return served
+
+
+def test_every_route_is_benchmarked(app_routes):
+    served = _served(app_routes)
+    assert len(served) > 10
+    patterns = {route: _pattern(*route) for route in served}
+
+    covered, unmatched = set(), []
+    for route in ROUTES:
+        name = " ".join(route.name.split(" ")[:2])
+        matches = [r for r, pattern in patterns.items() if pattern.fullmatch(name)]
+        if not matches:
+            unmatched.append(route.name)
+            continue
+        # /api/customers/search is its own route, not a {customer_id}
+        covered.add(min(matches, key=lambda r: r[1].count("{")))
+
+    missing = [f"{method} {path}" for method, path in served if (method, path) not in covered]
+    assert not missing, f"routes missing from bench_api.ROUTES: {missing}"
+    assert not unmatched, f"bench_api.ROUTES entries with no route: {unmatched}"
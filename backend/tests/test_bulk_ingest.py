@@ -0,0 +1,186 @@
+# Bulk customer ingest
+#
+# POST /api/customers/bulk against the seeded test database: per-row error
+# reports that never fail the rest of the upload, batching, malformed NDJSON
+# and CSV, CSV quoting, and the churn fields historical imports may carry.
+# Every customer inserted here is named "Ingest ..." and deleted afterwards.
+#
+# Run from backend/: pytest tests/test_bulk_ingest.py
+
+import json
+from datetime import datetime
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from app.config import settings
+from app.database import SessionLocal
+from app.models.customer import Customer
+
+NDJSON = {"Content-Type": "application/x-ndjson"}
+CSV = {"Content-Type": "text/csv"}
+
+
+@pytest.fixture
+def client(seeded_database):
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+        for customer in _ingested():
+            client.delete(f"/api/customers/{customer.id}")
+
+
+def _ingested() -> list[Customer]:
+    with SessionLocal() as db:
+        return db.scalars(
+            select(Customer).where(Customer.company_name.startswith("Ingest ")).order_by(Customer.id)
+        ).all()
+
+
+def _ndjson(*rows) -> str:
+    return "\n".join(row if isinstance(row, str) else json.dumps(row) for row in rows)
+
+
+def _row(name: str, **values) -> dict:
+    return {"company_name": f"Ingest {name}", "plan": "starter", "mrr": 49.0, **values}
+
+
+def test_row_errors_do_not_fail_the_upload(client):
+    body = _ndjson(
+        _row("A"),
+        "{not json",
+        "[1, 2]",
+        "",
+        _row("B", mrr=-5),
+        {"plan": "growth", "mrr": 10},
+        _row("C", plan="platinum"),
+        _row("D", employee_count=12, industry="Retail"),
+    )
+    result = client.post("/api/customers/bulk", content=body, headers=NDJSON).json()
+
+    assert result["inserted"] == 2
+    assert result["failed"] == 5
+    assert not result["errors_truncated"]
+    # Blank lines are skipped, not counted
+    errors = {error["row"]: error["errors"] for error in result["errors"]}
+    assert sorted(errors) == [2, 3, 4, 5, 6]
+    assert errors[2][0].startswith("Invalid JSON")
+    assert errors[3] == ["Each record must be an object"]
+    assert errors[4][0].startswith("mrr:")
+    assert errors[5][0].startswith("company_name:")
+    assert errors[6][0].startswith("plan:")
+    assert [c.company_name for c in _ingested()] == ["Ingest A", "Ingest D"]
+
+
+def test_error_report_is_truncated(client):
+    body = _ndjson(*["{broken"] * 5, _row("After Errors"))
+    result = client.post("/api/customers/bulk", params={"max_errors": 2}, content=body, headers=NDJSON).json()
+    assert (result["inserted"], result["failed"]) == (1, 5)
+    assert [error["row"] for error in result["errors"]] == [1, 2]
+    assert result["errors_truncated"]
+
+
+def test_batches(client):
+    rows = [_row(f"Batch {i}", mrr=float(i)) for i in range(7)]
+    rows.insert(3, _row("Batch bad", mrr="lots"))
+    result = client.post("/api/customers/bulk", params={"batch_size": 2}, content=_ndjson(*rows), headers=NDJSON).json()
+    assert (result["inserted"], result["failed"]) == (7, 1)
+    assert result["errors"][0]["row"] == 4
+    assert [c.mrr for c in _ingested()] == [float(i) for i in range(7)]
+
+
+def test_csv_quoting(client):
+    body = (
+        "company_name,plan,mrr,industry\r\n"
+        '"Ingest Quote, Comma",growth,150.5,Retail\r\n'
+        '"Ingest ""Doubled"" Quotes",starter,10,\r\n'
+        '"Ingest Multi\nLine",enterprise,2000,"Tech\nnology"\r\n'
+        "\r\n"
+        "Ingest Plain,starter,5,Health\r\n"
+    )
+    result = client.post("/api/customers/bulk", content=body, headers=CSV).json()
+    assert (result["inserted"], result["failed"]) == (4, 0), result
+
+    stored = {c.company_name: c for c in _ingested()}
+    assert set(stored) == {"Ingest Quote, Comma", 'Ingest "Doubled" Quotes', "Ingest Multi\nLine", "Ingest Plain"}
+    assert stored["Ingest Quote, Comma"].mrr == 150.5
+    # Empty cells mean "not provided"
+    assert stored['Ingest "Doubled" Quotes'].industry is None
+    assert stored["Ingest Multi\nLine"].industry == "Tech\nnology"
+
+
+def test_malformed_csv(client):
+    body = (
+        "company_name,plan,mrr\n"
+        "Ingest Good,starter,10\n"
+        "Ingest Short,starter\n"
+        "Ingest Long,starter,10,extra\n"
+        '"Ingest Unterminated,starter,10\n'
+        "Ingest Swallowed,starter,10\n"
+    )
+    result = client.post("/api/customers/bulk", content=body, headers=CSV).json()
+    assert result["inserted"] == 1
+    errors = {error["row"]: error["errors"][0] for error in result["errors"]}
+    assert errors == {
+        2: "Expected 3 columns, got 2",
+        3: "Expected 3 columns, got 4",
+        4: "Unterminated quoted field",
+    }
+
+
+def test_stray_quote_inside_a_field(client):
+    # A quote that doesn't open a field is a literal character, not the start of a multi-line record
+    body = "company_name,plan,mrr\n" 'Ingest Acme "Corp,starter,10\n' + "".join(
+        f"Ingest After {i},starter,{i}\n" for i in range(3)
+    )
+    result = client.post("/api/customers/bulk", content=body, headers=CSV).json()
+    assert (result["inserted"], result["failed"]) == (4, 0), result
+    assert [c.company_name for c in _ingested()] == [
+        'Ingest Acme "Corp', "Ingest After 0", "Ingest After 1", "Ingest After 2"
+    ]
+
+
+def test_unterminated_quote_resyncs(client, monkeypatch):
+    monkeypatch.setattr(settings, "bulk_ingest_max_record_lines", 3)
+    body = (
+        "company_name,plan,mrr\n"
+        '"Ingest Open,starter,10\n'
+        "Ingest Lost,starter,10\n"
+        "Ingest Lost Too,starter,10\n"
+        "Ingest After,starter,10\n"
+        '"Ingest Multi\nLine",starter,10\n'
+    )
+    result = client.post("/api/customers/bulk", content=body, headers=CSV).json()
+    assert (result["inserted"], result["failed"]) == (2, 1), result
+    assert result["errors"][0]["row"] == 1
+    assert result["errors"][0]["errors"][0].startswith("Unterminated quoted field")
+    assert [c.company_name for c in _ingested()] == ["Ingest After", "Ingest Multi\nLine"]
+
+
+def test_churn_fields(client):
+    body = _ndjson(
+        _row("Churned", signup_date="2024-01-10T09:00:00", churned_date="2024-06-01T00:00:00"),
+        _row("Inactive", is_active=False),
+        _row("Active"),
+        _row("Contradiction", is_active=True, churned_date="2024-06-01T00:00:00"),
+        _row("Backwards", signup_date="2024-06-10T09:00:00", churned_date="2024-06-01T00:00:00"),
+    )
+    result = client.post("/api/customers/bulk", content=body, headers=NDJSON).json()
+    assert (result["inserted"], result["failed"]) == (3, 2)
+    errors = {error["row"]: error["errors"][0] for error in result["errors"]}
+    assert "churned_date requires is_active=false" in errors[4]
+    assert "churned_date is before signup_date" in errors[5]
+
+    stored = {c.company_name: c for c in _ingested()}
+    assert not stored["Ingest Churned"].is_active
+    assert stored["Ingest Churned"].churned_date == datetime(2024, 6, 1)
+    assert not stored["Ingest Inactive"].is_active and stored["Ingest Inactive"].churned_date is None
+    assert stored["Ingest Active"].is_active
+
+
+def test_content_type_and_encoding(client):
+    assert client.post("/api/customers/bulk", content="x", headers={"Content-Type": "text/plain"}).status_code == 415
+    body = "company_name,plan,mrr\nIngest Csv Param,starter,1\n"
+    assert client.post("/api/customers/bulk", params={"format": "csv"}, content=body).json()["inserted"] == 1
+    latin1 = '{"company_name": "Ingest Café", "plan": "starter", "mrr": 1}'.encode("latin-1")
+    assert client.post("/api/customers/bulk", content=latin1, headers=NDJSON).status_code == 400
@@ -0,0 +1,147 @@
+# Change feed
+#
+# Broadcaster behaviour (replay after a last event id, reset when the id can't
+# be resumed, lagging subscribers dropped without blocking publish) and the
+# SSE / WebSocket endpoints end to end: writes through the API arrive as
+# events and a reconnect with the last seen id replays what was missed.
+#
+# Run from backend/: pytest tests/test_change_feed.py
+
+import asyncio
+import json
+import pytest
+from fastapi.testclient import TestClient
+from app.routers.changes import stream_changes
+from app.services.change_feed import RESET, ChangeBroadcaster, FeedClosed, change_feed
+
+
+def test_replay_after_last_event_id():
+    async def run():
+        feed = ChangeBroadcaster(queue_size=10, replay_size=10, max_subscribers=10)
+        first = feed.publish("customer.created", {"customer": {"id": 1}})
+        feed.publish("customer.updated", {"customer": {"id": 1}})
+        feed.publish("customer.deleted", {"customer": {"id": 1}})
+
+        subscription = feed.subscribe(first.id)
+        replayed = [await subscription.next(0.1) for _ in range(2)]
+        assert [e.type for e in replayed] == ["customer.updated", "customer.deleted"]
+        assert await subscription.next(0.01) is None
+
+        live = feed.publish("customer.created", {"customer": {"id": 2}})
+        assert await subscription.next(0.1) == live
+
+        # Already up to date: nothing to replay
+        up_to_date = feed.subscribe(live.id)
+        assert await up_to_date.next(0.01) is None
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("last_event_id", ["other-3", "garbage", "{epoch}-1", "{epoch}-99"])
+def test_reset_when_events_cannot_be_replayed(last_event_id):
+    async def run():
+        feed = ChangeBroadcaster(queue_size=10, replay_size=2, max_subscribers=10)
+        for customer_id in range(5):
+            feed.publish("customer.created", {"customer": {"id": customer_id}})
+
+        # Another process's id, a malformed id, one evicted from the buffer, one from the future
+        subscription = feed.subscribe(last_event_id.format(epoch=feed.epoch))
+        event = await subscription.next(0.1)
+        assert event.type == RESET
+        assert event.id == feed.last_event_id
+
+    asyncio.run(run())
+
+
+def test_lagging_subscriber_is_dropped_and_resumes():
+    async def run():
+        feed = ChangeBroadcaster(queue_size=3, replay_size=100, max_subscribers=10)
+        slow = feed.subscribe()
+        events = [feed.publish("customer.created", {"customer": {"id": i}}) for i in range(5)]
+
+        # Publishing never waited; the slow client was dropped once its queue filled
+        assert feed.stats()["subscribers"] == 0 and feed.stats()["lagged_disconnects"] == 1
+        with pytest.raises(FeedClosed):
+            await slow.next(0.1)
+        assert slow.lagged
+
+        # Reconnecting with the last id it saw (none) replays everything from the buffer
+        resumed = feed.subscribe(f"{feed.epoch}-0")
+        assert [await resumed.next(0.1) for _ in events] == events
+
+    asyncio.run(run())
+
+
+def test_subscriber_limit():
+    feed = ChangeBroadcaster(queue_size=1, replay_size=1, max_subscribers=1)
+
+    async def run():
+        assert feed.subscribe() is not None
+        assert feed.subscribe() is None
+
+    asyncio.run(run())
+
+
+@pytest.fixture
+def client(seeded_database):
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+def _create(client, name):
+    response = client.post("/api/customers", json={
+        "company_name": name, "plan": "starter", "mrr": 99.0, "industry": "Technology", "employee_count": 10
+    })
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def test_websocket_receives_writes_and_resumes(client):
+    with client.websocket_connect("/api/changes/ws") as ws:
+        ready = json.loads(ws.receive_text())
+        assert ready["type"] == "ready"
+
+        customer_id = _create(client, "Feed Test Co")
+        created = json.loads(ws.receive_text())
+        assert created["type"] == "customer.created"
+        assert created["customer"] == {"id": customer_id, "plan": "starter", "is_active": True, "mrr": 99.0}
+
+        assert client.patch(f"/api/customers/{customer_id}", json={"mrr": 149.0}).status_code == 200
+        updated = json.loads(ws.receive_text())
+        assert updated["type"] == "customer.updated" and updated["customer"]["mrr"] == 149.0
+
+    # Writes while disconnected are replayed after the last id the client saw
+    assert client.delete(f"/api/customers/{customer_id}").status_code == 204
+    with client.websocket_connect(f"/api/changes/ws?last_event_id={updated['id']}") as ws:
+        deleted = json.loads(ws.receive_text())
+        assert deleted["type"] == "customer.deleted"
+        assert deleted["customer"] == {"id": customer_id}
+
+    assert client.get("/health").json()["change_feed"]["last_event_id"] == deleted["id"]
+
+
+class _ConnectedRequest:
+    async def is_disconnected(self):
+        return False
+
+
+def test_sse_stream_format_and_resume():
+    async def run():
+        first = change_feed.publish("customer.created", {"customer": {"id": 7}})
+        second = change_feed.publish("customer.deleted", {"customer": {"id": 7}})
+
+        response = await stream_changes(_ConnectedRequest(), last_event_id=None, since=first.id)
+        assert response.media_type == "text/event-stream"
+        body = response.body_iterator
+        assert (await anext(body)).startswith("retry: ")
+        message = await anext(body)
+        await body.aclose()
+
+        lines = message.rstrip("\n").split("\n")
+        assert lines[:2] == [f"id: {second.id}", "event: customer.deleted"]
+        assert json.loads(lines[2].removeprefix("data: "))["customer"] == {"id": 7}
+        assert change_feed.stats()["subscribers"] == 0
+
+    asyncio.run(run())
@@ -0,0 +1,228 @@
+# Chart data after historical writes
+#
+# Writes that reach into the past - backdated creates, historical bulk
+# imports, reactivations, MRR edits and deletes - must show up in the cached
+# cohort matrix and the daily chart rollups on the next read, while ordinary
+# edits keep the cache. After any of them the rollup table must equal a live
+# aggregate of the customers table - also when the write commits while a
+# chart request is aggregating the same days.
+#
+# Run from backend/: pytest tests/test_charts.py
+
+import json
+from datetime import date, datetime, time, timedelta
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from app.database import AsyncSessionLocal, SessionLocal
+from app.models.customer import Customer
+from app.models.rollup import DailyCustomerRollup, RollupGeneration
+from app.services import analytics
+from app.services.analytics import ROLLUP_METRICS, aggregate_days, changed_days, commit_with_rollups, rollup_row
+from app.services.cohorts import ClosedCohorts, CohortEngine, cohort_engine, month_index, month_label
+
+# Mid-month, several months back: a closed cohort month
+BACKDATED = (datetime.utcnow().replace(day=15) - timedelta(days=240)).replace(hour=12, minute=0, second=0, microsecond=0)
+
+
+def test_record_change_only_drops_changed_closed_cells():
+    engine = CohortEngine()
+    current = month_index(datetime.utcnow().date())
+    closed = ClosedCohorts(current, current - 3, np.zeros(3, np.int64), np.zeros((3, 3), np.int64))
+
+    def kept(old, new) -> bool:
+        engine._closed = closed
+        engine.record_change(old, new)
+        return engine._closed is closed
+
+    assert kept(None, (current, None))                  # signup this month
+    assert kept((current - 2, None), (current - 2, None))  # edit that moves nothing
+    assert kept((current - 2, None), (current - 2, current))  # churned this month: open cells
+    assert not kept(None, (current - 2, None))          # backdated signup
+    assert not kept((current - 2, current - 1), (current - 2, None))  # reactivated
+    assert not kept((current - 2, None), None)          # deleted
+
+
+@pytest.fixture
+def client(seeded_database):
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+def _cohort(client, label: str) -> dict:
+    response = client.get("/api/charts/cohort-retention", params={"start": "2000-01-01"})
+    assert response.status_code == 200, response.text
+    return next((c for c in response.json()["cohorts"] if c["cohort"] == label), {"size": 0, "retained": [0]})
+
+
+def test_cohort_matrix_follows_writes_into_closed_months(client):
+    label = month_label(month_index(BACKDATED))
+    size = _cohort(client, label)["size"]
+
+    created = client.post("/api/customers", json={
+        "company_name": "Backdated Co", "plan": "growth", "mrr": 300.0, "signup_date": BACKDATED.isoformat()
+    })
+    assert created.status_code == 201, created.text
+    assert _cohort(client, label)["size"] == size + 1
+
+    rows = [
+        {"company_name": f"Imported {i}", "plan": "starter", "mrr": 49.0, "signup_date": BACKDATED.isoformat()}
+        for i in range(3)
+    ]
+    ingested = client.post(
+        "/api/customers/bulk",
+        content="\n".join(json.dumps(row) for row in rows),
+        headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert ingested.json()["inserted"] == 3
+    assert _cohort(client, label)["size"] == size + 4
+
+    # An edit that moves no cohort cell keeps the cache
+    assert client.patch(f"/api/customers/{created.json()['id']}", json={"mrr": 350.0}).status_code == 200
+    assert cohort_engine._closed is not None
+
+    assert client.delete(f"/api/customers/{created.json()['id']}").status_code == 204
+    assert _cohort(client, label)["size"] == size + 3
+
+    # Leave the shared seeded database as it was
+    with SessionLocal() as db:
+        imported = db.scalars(select(Customer.id).where(Customer.company_name.startswith("Imported "))).all()
+    for customer_id in imported:
+        assert client.delete(f"/api/customers/{customer_id}").status_code == 204
+    assert _cohort(client, label)["size"] == size
+
+
+def test_reactivation_in_closed_month_updates_retention(client):
+    cutoff = datetime.utcnow().replace(day=1) - timedelta(days=1)
+    with SessionLocal() as db:
+        churned = db.scalar(
+            select(Customer)
+            .where(Customer.is_active == False, Customer.churned_date < cutoff.replace(day=1))
+            .limit(1)
+        )
+    assert churned is not None, "seed data should have customers churned in closed months"
+    label = month_label(month_index(churned.signup_date))
+
+    retained = _cohort(client, label)["retained"][-1]
+    assert client.patch(f"/api/customers/{churned.id}", json={"is_active": True}).status_code == 200
+    assert _cohort(client, label)["retained"][-1] == retained + 1
+
+    assert client.patch(f"/api/customers/{churned.id}", json={"is_active": False}).status_code == 200
+    assert _cohort(client, label)["retained"][-1] == retained
+
+
+def _stored_rollups() -> dict:
+    with SessionLocal() as db:
+        return {
+            row.day: {m: getattr(row, m) for m in ROLLUP_METRICS}
+            for row in db.scalars(select(DailyCustomerRollup).order_by(DailyCustomerRollup.day))
+        }
+
+
+def _live_rollups(client) -> dict:
+    # Every completed day that has events, aggregated from the customers table now
+    async def aggregate():
+        async with AsyncSessionLocal() as db:
+            end = datetime.combine(date.today(), time.min)
+            return await aggregate_days(db, datetime(1970, 1, 1), end)
+    return {row["day"]: {m: row[m] for m in ROLLUP_METRICS} for row in client.portal.call(aggregate)}
+
+
+def _assert_rollups_current(client):
+    assert client.get("/api/charts/revenue-over-time").status_code == 200
+    stored, live = _stored_rollups(), _live_rollups(client)
+    days = sorted(stored)
+    # One row for every day from the first signup to yesterday, zeros included
+    assert days[0] == min(live)
+    assert days[-1] == date.today() - timedelta(days=1)
+    assert len(days) == (days[-1] - days[0]).days + 1
+    for day in days:
+        expected = live.get(day, {m: 0 for m in ROLLUP_METRICS})
+        assert stored[day] == pytest.approx(expected), day
+
+
+def test_rollups_follow_historical_writes(client):
+    _assert_rollups_current(client)
+    with SessionLocal() as db:
+        seeded = db.scalar(
+            select(Customer).where(Customer.is_active == True, Customer.signup_date < BACKDATED).limit(1)
+        )
+
+    created = client.post("/api/customers", json={
+        "company_name": "Backfilled Co", "plan": "enterprise", "mrr": 2500.0,
+        "signup_date": BACKDATED.isoformat(), "last_activity": (BACKDATED + timedelta(days=3)).isoformat()
+    }).json()
+    rows = [
+        {
+            "company_name": f"Backfill {i}", "plan": "growth", "mrr": 100.0 + i,
+            "signup_date": (BACKDATED - timedelta(days=30 * i)).isoformat(),
+            "last_activity": (BACKDATED + timedelta(days=i)).isoformat()
+        }
+        for i in range(5)
+    ]
+    ingested = client.post(
+        "/api/customers/bulk",
+        content="\n".join(json.dumps(row) for row in rows),
+        headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert ingested.json()["inserted"] == 5
+    assert client.patch(f"/api/customers/{seeded.id}", json={"mrr": seeded.mrr + 1000}).status_code == 200
+    _assert_rollups_current(client)
+
+    # Restore the shared seeded database
+    assert client.patch(f"/api/customers/{seeded.id}", json={"mrr": seeded.mrr}).status_code == 200
+    with SessionLocal() as db:
+        backfilled = db.scalars(select(Customer.id).where(Customer.company_name.startswith("Backfill"))).all()
+    for customer_id in backfilled:
+        assert client.delete(f"/api/customers/{customer_id}").status_code == 204
+    assert created["id"] in backfilled
+    _assert_rollups_current(client)
+
+
+def test_rollup_holes_are_filled(client):
+    # Tables extended before days without events got zero rows, or with rows deleted out of band
+    _assert_rollups_current(client)
+    with SessionLocal() as db:
+        days = sorted(db.scalars(select(DailyCustomerRollup.day)))
+        holes = [days[0], days[len(days) // 3], days[len(days) // 2], days[-1]]
+        db.query(DailyCustomerRollup).filter(DailyCustomerRollup.day.in_(holes)).delete()
+        db.commit()
+    _assert_rollups_current(client)
+
+
+def test_write_during_extension_is_not_overwritten(client, monkeypatch):
+    # A backdated write commits after the extension aggregated its day but before it inserts,
+    # as a write in another worker would: the stale row must not land
+    _assert_rollups_current(client)
+    day = BACKDATED.date()
+    with SessionLocal() as db:
+        db.query(DailyCustomerRollup).filter(DailyCustomerRollup.day == day).delete()
+        db.commit()
+        generation = db.scalar(select(RollupGeneration.generation))
+
+    calls = []
+
+    async def racing_aggregate(db, start, end):
+        rows = await aggregate_days(db, start, end)
+        if not calls:
+            async with AsyncSessionLocal() as other:
+                customer = Customer(company_name="Racing Write", plan="growth", mrr=700.0, signup_date=BACKDATED)
+                other.add(customer)
+                await commit_with_rollups(other, changed_days(None, rollup_row(customer)))
+        calls.append((start, end))
+        return rows
+
+    monkeypatch.setattr(analytics, "aggregate_days", racing_aggregate)
+    _assert_rollups_current(client)
+    # Aggregated again after the write
+    assert sum(start.date() == day for start, _ in calls) == 2
+    monkeypatch.undo()
+
+    with SessionLocal() as db:
+        assert db.scalar(select(RollupGeneration.generation)) == generation + 1
+        created = db.scalar(select(Customer.id).where(Customer.company_name == "Racing Write"))
+    assert client.delete(f"/api/customers/{created}").status_code == 204
+    _assert_rollups_current(client)
@@ -0,0 +1,99 @@
+# Churn detection job
+#
+# Runs detect_churn against its own small SQLite database with chunks smaller
+# than the table, and checks the rows it marked, the churned_date it recorded
+# and that the stats snapshot delta matches a full recompute.
+#
+# Run from backend/: pytest tests/test_churn_job.py
+
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from app.config import settings
+from app.models.customer import Base, Customer, PlanType
+from app.services.churn import detect_churn
+from app.services.stats import aggregate_by_plan, stats_snapshot
+
+NOW = datetime(2026, 6, 15, 12, 0)
+
+
+def _customer(name, plan, last_activity, is_active=True, churned_date=None, signup_days_ago=400):
+    return Customer(
+        company_name=name,
+        plan=plan,
+        mrr=100.0 if plan == PlanType.STARTER else 1000.0,
+        is_active=is_active,
+        signup_date=NOW - timedelta(days=signup_days_ago),
+        last_activity=last_activity,
+        churned_date=churned_date,
+    )
+
+
+CUSTOMERS = [
+    _customer("Recent", PlanType.STARTER, NOW - timedelta(days=3)),
+    _customer("Stale Starter", PlanType.STARTER, NOW - timedelta(days=200)),
+    _customer("Stale Growth", PlanType.GROWTH, NOW - timedelta(days=91)),
+    _customer("Borderline", PlanType.GROWTH, NOW - timedelta(days=89)),
+    _customer("Never Active, Old", PlanType.GROWTH, None, signup_days_ago=120),
+    _customer("Never Active, New", PlanType.STARTER, None, signup_days_ago=10),
+    _customer("Already Churned", PlanType.STARTER, NOW - timedelta(days=300), is_active=False,
+              churned_date=NOW - timedelta(days=250)),
+]
+EXPECTED_CHURNED = {"Stale Starter", "Stale Growth", "Never Active, Old"}
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "churn_inactivity_days", 90)
+    monkeypatch.setattr(settings, "churn_job_chunk_size", 2)
+    monkeypatch.setattr(settings, "churn_job_chunk_pause_seconds", 0)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/churn.db")
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with factory() as db:
+            db.add_all(CUSTOMERS)
+            await db.commit()
+
+    asyncio.run(setup())
+    yield factory
+    asyncio.run(engine.dispose())
+    stats_snapshot.invalidate()
+
+
+def test_marks_inactive_customers_churned(session_factory):
+    async def run():
+        async with session_factory() as db:
+            stats_snapshot.load(await aggregate_by_plan(db), stats_snapshot.version)
+        result = await detect_churn(session_factory, now=NOW)
+        async with session_factory() as db:
+            customers = (await db.scalars(select(Customer).order_by(Customer.id))).all()
+            recomputed = await aggregate_by_plan(db)
+        return result, customers, recomputed
+
+    result, customers, recomputed = asyncio.run(run())
+
+    assert result["churned"] == len(EXPECTED_CHURNED)
+    assert result["per_plan"] == {"starter": 1, "growth": 2}
+    assert result["chunks"] == 4
+    for customer in customers:
+        if customer.company_name in EXPECTED_CHURNED:
+            assert not customer.is_active and customer.churned_date == NOW, customer.company_name
+        elif customer.company_name == "Already Churned":
+            assert customer.churned_date == NOW - timedelta(days=250)
+        else:
+            assert customer.is_active and customer.churned_date is None, customer.company_name
+
+    snapshot = stats_snapshot.per_plan()
+    for plan in PlanType:
+        assert snapshot[plan]["active"] == recomputed[plan]["active"]
+        assert snapshot[plan]["mrr"] == pytest.approx(recomputed[plan]["mrr"])
+
+
+def test_second_run_is_a_no_op(session_factory):
+    asyncio.run(detect_churn(session_factory, now=NOW))
+    assert asyncio.run(detect_churn(session_factory, now=NOW + timedelta(hours=1)))["churned"] == 0
@@ -0,0 +1,234 @@
+# Columnar analytics snapshot
+#
+# ColumnarSnapshot against its own small SQLite database (partitions smaller
+# than the table): the updated_at watermark refresh and its overlap window,
+# deletes recorded by this process, reconcile after deletes and inserts made
+# behind its back, and concurrent callers sharing one refresh. Then the
+# summary and LTV endpoints against the seeded test database, columnar and
+# source=sql side by side.
+#
+# Run from backend/: pytest tests/test_columnar.py
+
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from app.config import settings
+from app.models.customer import Base, Customer, PlanType
+from app.services.cache import response_cache
+from app.services.columnar import PLANS, ColumnarSnapshot, columnar_snapshot
+
+UPDATED = datetime(2026, 6, 15, 12, 0)
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "columnar_max_staleness_seconds", 60)
+    monkeypatch.setattr(settings, "columnar_watermark_overlap_seconds", 2)
+    monkeypatch.setattr(settings, "columnar_reconcile_interval_seconds", 3600)
+    monkeypatch.setattr(settings, "columnar_batch_size", 2)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/columnar.db")
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with factory() as db:
+            db.add_all(
+                Customer(
+                    company_name=f"Columnar {i}", plan=PLANS[i % len(PLANS)], mrr=10.0 * i,
+                    industry="Retail" if i % 2 else None, signup_date=datetime(2025, 1, 1 + i),
+                    updated_at=UPDATED - timedelta(minutes=i)
+                )
+                for i in range(1, 6)
+            )
+            await db.commit()
+
+    asyncio.run(setup())
+    yield factory
+    asyncio.run(engine.dispose())
+
+
+def _run(session_factory, *steps):
+    # Each step is an async fn(db); all run in one event loop, each with its own session
+    async def run():
+        for step in steps:
+            async with session_factory() as db:
+                await step(db)
+
+    asyncio.run(run())
+
+
+def _snapshot_rows(snapshot: ColumnarSnapshot) -> dict:
+    c = snapshot.columns
+    return {
+        int(i): (PLANS[plan], float(mrr), bool(active))
+        for i, plan, mrr, active in zip(c["id"], c["plan"], c["mrr"], c["is_active"])
+    }
+
+
+async def _table_rows(db) -> dict:
+    rows = await db.execute(select(Customer.id, Customer.plan, Customer.mrr, Customer.is_active))
+    return {i: (plan, mrr, active) for i, plan, mrr, active in rows}
+
+
+def _write(statement):
+    async def write(db):
+        await db.execute(statement)
+        await db.commit()
+    return write
+
+
+def test_watermark_refresh_and_overlap(session_factory):
+    snapshot = ColumnarSnapshot()
+    seen = {}
+
+    async def check(db):
+        seen["table"] = await _table_rows(db)
+        seen["snapshot"] = _snapshot_rows(snapshot)
+
+    _run(session_factory, snapshot.ensure_fresh, check)
+    assert seen["snapshot"] == seen["table"]
+    assert list(snapshot.columns["id"]) == [1, 2, 3, 4, 5]
+    assert snapshot.watermark.astype(datetime) == UPDATED - timedelta(minutes=1)
+
+    watermark = snapshot.watermark.astype(datetime)
+    _run(
+        session_factory,
+        # Same-second write, a late commit inside the overlap, and one older than the overlap
+        _write(update(Customer).where(Customer.id == 1).values(mrr=111.0, updated_at=watermark)),
+        _write(insert(Customer).values(
+            company_name="Columnar Late", plan=PlanType.ENTERPRISE, mrr=500.0, is_active=True,
+            signup_date=datetime(2025, 2, 1), updated_at=watermark - timedelta(seconds=1)
+        )),
+        _write(update(Customer).where(Customer.id == 2).values(mrr=222.0, updated_at=watermark - timedelta(seconds=10))),
+    )
+
+    # Still within max staleness and nothing in this process marked it dirty
+    _run(session_factory, snapshot.ensure_fresh)
+    assert snapshot.rows == 5 and _snapshot_rows(snapshot)[1][1] == 10.0
+
+    snapshot.mark_dirty()
+    _run(session_factory, snapshot.ensure_fresh)
+    rows = _snapshot_rows(snapshot)
+    assert rows[1] == (PlanType.GROWTH, 111.0, True)
+    assert rows[6] == (PlanType.ENTERPRISE, 500.0, True)
+    # Older than watermark - overlap: not re-read (the overlap bounds how late a commit may land)
+    assert rows[2][1] == 20.0
+    assert snapshot.watermark.astype(datetime) == watermark
+    assert list(snapshot.columns["id"]) == [1, 2, 3, 4, 5, 6]
+
+
+def test_record_delete(session_factory):
+    snapshot = ColumnarSnapshot()
+    _run(session_factory, snapshot.ensure_fresh, _write(delete(Customer).where(Customer.id.in_([2, 4]))))
+    assert snapshot.rows == 5
+
+    snapshot.record_delete(2)
+    snapshot.record_delete(4)
+    snapshot.record_delete(99)
+    _run(session_factory, snapshot.ensure_fresh)
+    assert list(snapshot.columns["id"]) == [1, 3, 5]
+    # Dropped from every column alike
+    assert all(len(array) == 3 for array in snapshot.columns.values())
+    assert snapshot.summary()["total_mrr"] == 90.0
+
+
+def test_reconcile_after_out_of_band_writes(session_factory, monkeypatch):
+    snapshot = ColumnarSnapshot()
+    seen = {}
+
+    async def check(db):
+        seen["table"] = await _table_rows(db)
+
+    _run(
+        session_factory,
+        snapshot.ensure_fresh,
+        # Behind the snapshot's back: deletes, and an insert without updated_at
+        _write(delete(Customer).where(Customer.id.in_([1, 3]))),
+        _write(insert(Customer).values(
+            company_name="Columnar No Timestamp", plan=PlanType.STARTER, mrr=7.0, is_active=False,
+            signup_date=datetime(2025, 3, 1), updated_at=None
+        )),
+    )
+    snapshot.mark_dirty()
+    _run(session_factory, snapshot.ensure_fresh)
+    # Neither shows up in an incremental refresh
+    assert list(snapshot.columns["id"]) == [1, 2, 3, 4, 5]
+
+    monkeypatch.setattr(settings, "columnar_reconcile_interval_seconds", 0)
+    snapshot.mark_dirty()
+    _run(session_factory, snapshot.ensure_fresh, check)
+    assert _snapshot_rows(snapshot) == seen["table"]
+    assert list(snapshot.columns["id"]) == [2, 4, 5, 6]
+
+
+def test_concurrent_callers_share_one_refresh(session_factory, monkeypatch):
+    snapshot = ColumnarSnapshot()
+    _run(session_factory, snapshot.ensure_fresh)
+    refreshes = []
+    refresh = snapshot._refresh
+
+    async def counting_refresh(db):
+        refreshes.append(db)
+        await refresh(db)
+
+    monkeypatch.setattr(snapshot, "_refresh", counting_refresh)
+    # Past max staleness: every caller finds it stale before the first one takes the lock
+    snapshot.refreshed_at -= settings.columnar_max_staleness_seconds
+
+    async def callers():
+        async def call():
+            async with session_factory() as db:
+                await snapshot.ensure_fresh(db)
+        await asyncio.gather(*(call() for _ in range(5)))
+
+    asyncio.run(callers())
+    assert len(refreshes) == 1
+
+
+@pytest.fixture
+def client(seeded_database):
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+def _assert_close(columnar, sql, path=()):
+    # Same keys everywhere; numbers equal up to summation order
+    if isinstance(sql, dict):
+        assert set(columnar) == set(sql), path
+        for key in sql:
+            _assert_close(columnar[key], sql[key], (*path, key))
+    else:
+        assert columnar == pytest.approx(sql), path
+
+
+SEGMENTS = [
+    {},
+    {"plan": ["growth"]},
+    {"plan": ["starter", "enterprise"], "is_active": "true"},
+    {"is_active": "false"},
+    {"industry": ["Technology", "Retail"]},
+    {"industry": ["No Such Industry"]},
+    {"min_mrr": 100, "max_mrr": 1000},
+    {"signup_from": "2025-01-01", "signup_to": "2025-06-30", "plan": ["growth"]},
+]
+
+
+def test_columnar_matches_sql(client):
+    columnar_snapshot.invalidate()
+    response_cache.invalidate()
+    for segment in SEGMENTS:
+        for endpoint in ("summary", "ltv"):
+            if endpoint == "summary" and not segment:
+                continue  # unfiltered summary comes from the stats snapshot
+            url = f"/api/customer/stats/{endpoint}"
+            columnar = client.get(url, params={**segment, "source": "columnar"}).json()
+            sql = client.get(url, params={**segment, "source": "sql"}).json()
+            assert columnar.pop("snapshot")["rows"] == columnar_snapshot.rows
+            assert "snapshot" not in sql
+            _assert_close(columnar, sql, (endpoint, str(segment)))
@@ -0,0 +1,93 @@
+# Synthetic customer generator
+#
+# A seed and a reference time must reproduce the same rows however many
+# worker processes generate them, and seed_database() must pass the time
+# through. The rows themselves follow the generator's model: the plan mix
+# of PLAN_WEIGHTS, MRR and employee counts inside the plan's ranges, and
+# churn between signup and now.
+#
+# Run from backend/: pytest tests/test_data_generator.py
+
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from app.models.customer import Base, Customer
+from app.utils import data_generator
+from app.utils.data_generator import CustomerDataGenerator, iter_shards, seed_database
+
+NOW = datetime(2026, 3, 1, 9, 30)
+ROWS = 20_000
+
+
+def _rows(shards) -> list[tuple]:
+    rows = []
+    for shard in shards:
+        rows += zip(*shard.values())
+    return rows
+
+
+@pytest.fixture(scope="module")
+def rows() -> list[dict]:
+    rows = []
+    for shard in iter_shards(ROWS, seed=3, now=NOW):
+        rows += [dict(zip(shard, row)) for row in zip(*shard.values())]
+    return rows
+
+
+def test_same_rows_for_any_worker_count(monkeypatch):
+    # Small shards, so four workers each get several
+    monkeypatch.setattr(data_generator, "SHARD_SIZE", 700)
+    single = _rows(iter_shards(5_000, seed=42, workers=1, now=NOW))
+    assert len(single) == 5_000
+    assert _rows(iter_shards(5_000, seed=42, workers=4, now=NOW)) == single
+
+    assert _rows(iter_shards(5_000, seed=43, workers=1, now=NOW)) != single
+    later = _rows(iter_shards(5_000, seed=42, workers=1, now=NOW + timedelta(days=1)))
+    assert later != single
+
+
+def test_seed_database_passes_now_through(tmp_path):
+    dumps = []
+    for name in ("first", "second"):
+        engine = create_engine(f"sqlite:///{tmp_path}/{name}.db")
+        Base.metadata.create_all(engine)
+        with Session(engine) as db:
+            seed_database(db, count=300, seed=5, now=NOW)
+            dumps.append(db.execute(
+                select(Customer.company_name, Customer.plan, Customer.mrr, Customer.signup_date, Customer.churned_date)
+                .order_by(Customer.id)
+            ).all())
+        engine.dispose()
+    assert len(dumps[0]) == 300
+    assert dumps[0] == dumps[1]
+    assert max(signup for *_, signup, _ in dumps[0]) <= NOW
+
+
+def test_plan_mix(rows):
+    weights = CustomerDataGenerator.PLAN_WEIGHTS
+    total = sum(weights.values())
+    for plan, weight in weights.items():
+        share = sum(row["plan"] == plan for row in rows) / len(rows)
+        assert share == pytest.approx(weight / total, abs=0.015), plan
+
+
+def test_mrr_and_employees_within_plan_ranges(rows):
+    gen = CustomerDataGenerator
+    for row in rows:
+        mrr_min, mrr_max = gen.MRR_RANGES[row["plan"]]
+        employees_min, employees_max = gen.EMPLOYEE_RANGES[row["plan"]]
+        assert mrr_min <= row["mrr"] <= mrr_max, row
+        assert employees_min <= row["employee_count"] <= employees_max, row
+
+
+def test_dates(rows):
+    start = NOW - timedelta(days=730)
+    churned = [row for row in rows if not row["is_active"]]
+    assert 0 < len(churned) < len(rows)
+    for row in rows:
+        assert start <= row["signup_date"] <= NOW, row
+        assert row["last_activity"] <= NOW, row
+        assert (row["churned_date"] is None) == row["is_active"], row
+    for row in churned:
+        assert row["signup_date"] <= row["churned_date"] <= NOW, row
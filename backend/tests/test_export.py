@@ -0,0 +1,108 @@
+# Customer table export
+#
+# GET /api/customers/export against the seeded test database: CSV escaping,
+# NDJSON and Arrow IPC decode to the same rows as the table, and the list
+# filters are applied in the export query.
+#
+# Run from backend/: pytest tests/test_export.py
+
+import csv
+import io
+import json
+from datetime import date
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from app.database import SessionLocal
+from app.models.customer import Customer, PlanType
+from app.services.export import COLUMN_NAMES
+
+# A day no seeded customer signed up on, so filtering on it selects only the rows created here
+EXPORT_DAY = date(2001, 2, 3)
+AWKWARD_NAMES = ['Export "Quoted", Inc.', "Export Multi\nLine", "Export Ünïcødé ✓", "Export Plain"]
+
+
+@pytest.fixture
+def client(seeded_database):
+    from app.main import app
+
+    with TestClient(app) as client:
+        created = [
+            client.post("/api/customers", json={
+                "company_name": name, "plan": "growth", "mrr": 12.5 * (i + 1), "industry": None if i else "Retail",
+                "signup_date": f"{EXPORT_DAY.isoformat()}T0{i}:00:00"
+            }).json()["id"]
+            for i, name in enumerate(AWKWARD_NAMES)
+        ]
+        yield client
+        for customer_id in created:
+            client.delete(f"/api/customers/{customer_id}")
+
+
+def _export(client, fmt: str, **params):
+    response = client.get("/api/customers/export", params={"format": fmt, **params})
+    assert response.status_code == 200, response.text
+    return response
+
+
+def _export_day() -> dict:
+    return {"signup_from": EXPORT_DAY.isoformat(), "signup_to": EXPORT_DAY.isoformat()}
+
+
+def test_csv_escaping(client):
+    response = _export(client, "csv", **_export_day())
+    assert response.headers["content-type"].startswith("text/csv")
+    assert 'filename="customers.csv"' in response.headers["content-disposition"]
+
+    rows = list(csv.reader(io.StringIO(response.text, newline="")))
+    assert rows[0] == COLUMN_NAMES
+    records = [dict(zip(COLUMN_NAMES, row)) for row in rows[1:]]
+    assert [r["company_name"] for r in records] == AWKWARD_NAMES
+    assert records[0]["industry"] == "Retail" and records[1]["industry"] == ""
+    assert records[0]["plan"] == "growth"
+    assert records[0]["signup_date"] == f"{EXPORT_DAY.isoformat()}T00:00:00"
+
+
+def test_formats_round_trip(client):
+    pytest.importorskip("pyarrow")
+    import pyarrow.ipc
+
+    with SessionLocal() as db:
+        expected = [
+            {name: getattr(customer, name) for name in COLUMN_NAMES}
+            for customer in db.scalars(select(Customer).order_by(Customer.id))
+        ]
+    for row in expected:
+        row["plan"] = row["plan"].value
+
+    ndjson = [json.loads(line) for line in _export(client, "ndjson").text.splitlines()]
+    arrow = pyarrow.ipc.open_stream(_export(client, "arrow").content).read_all()
+    assert arrow.schema.names == COLUMN_NAMES
+    arrow = arrow.to_pylist()
+
+    assert len(ndjson) == len(arrow) == len(expected)
+    for row, from_ndjson, from_arrow in zip(expected, ndjson, arrow):
+        for name in COLUMN_NAMES:
+            value = row[name]
+            assert from_arrow[name] == value, name
+            assert from_ndjson[name] == (value.isoformat() if hasattr(value, "isoformat") else value), name
+
+
+def test_filters_are_applied(client):
+    params = {"plan": ["enterprise"], "is_active": "true", "min_mrr": 1000}
+    with SessionLocal() as db:
+        expected = db.scalars(
+            select(Customer.id)
+            .where(Customer.plan == PlanType.ENTERPRISE, Customer.is_active == True, Customer.mrr >= 1000)
+            .order_by(Customer.id)
+        ).all()
+    assert expected, "seed data should match the filter"
+
+    ndjson = [json.loads(line) for line in _export(client, "ndjson", **params).text.splitlines()]
+    assert [row["id"] for row in ndjson] == expected
+    csv_rows = list(csv.DictReader(io.StringIO(_export(client, "csv", **params).text, newline="")))
+    assert [int(row["id"]) for row in csv_rows] == expected
+
+    # No match: just the header (CSV) or nothing at all
+    assert _export(client, "csv", **_export_day(), plan=["starter"]).text.strip() == ",".join(COLUMN_NAMES)
+    assert _export(client, "ndjson", **_export_day(), plan=["starter"]).text == ""
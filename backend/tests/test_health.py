@@ -0,0 +1,58 @@
+# Health check
+#
+# /health against the seeded test database, then with the API's engine
+# pointed at a database that can't be opened: a 503 whose body says only what
+# kind of failure it was, with the driver's message in the server log.
+#
+# Run from backend/: pytest tests/test_health.py
+
+import logging
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from app import database, main
+from app.config import settings
+
+
+@pytest.fixture
+def client(seeded_database):
+    with TestClient(main.app) as client:
+        yield client
+
+
+def test_healthy(client):
+    response = client.get("/health")
+    assert response.status_code == 200
+    health = response.json()
+    assert health["status"] == "healthy"
+    assert health["database"] == "connected"
+    assert health["database_error"] is None
+    assert health["pool"] is None or 0 <= health["pool"]["saturation"] <= 1
+
+
+def test_database_error_is_not_exposed(client, monkeypatch, tmp_path, caplog):
+    missing = tmp_path / "no-such-dir" / "secret-name.db"
+    broken = create_async_engine(f"sqlite+aiosqlite:///{missing}")
+    monkeypatch.setattr(database, "async_engine", broken)
+
+    with caplog.at_level(logging.WARNING, logger=database.logger.name):
+        response = client.get("/health")
+    client.portal.call(broken.dispose)
+
+    assert response.status_code == 503
+    health = response.json()
+    assert health["status"] == "unhealthy"
+    assert health["database"] == "unavailable"
+    assert health["database_error"] == "connection failed"
+    assert "OperationalError" not in response.text and "secret-name" not in response.text
+
+    failure = next(r for r in caplog.records if r.getMessage() == "Database health probe failed")
+    assert "OperationalError" in "".join(logging.Formatter().formatException(failure.exc_info))
+
+
+def test_database_timeout(client, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "health_db_timeout_seconds", 0)
+    with caplog.at_level(logging.WARNING, logger=database.logger.name):
+        health = client.get("/health").json()
+    assert health["database_error"] == "timeout"
+    assert any("timed out" in r.getMessage() for r in caplog.records)
@@ -0,0 +1,92 @@
+# Lifetime value in Python and SQL
+#
+# Customer.lifetime_months / lifetime_value are hybrid properties: the Python
+# rule is used for single rows, the SQL expression for sorting, filtering and
+# aggregating in the database. Both must agree for every kind of customer -
+# under 60 days, churned with and without a churned_date, reactivated, and
+# around the 30-day month boundaries.
+#
+# Timestamps sit half a day away from whole-day boundaries so the few
+# milliseconds between Python's and SQL's "now" can't change the result.
+#
+# Run from backend/: pytest tests/test_lifetime_value.py
+
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from app.models.customer import Base, Customer, PlanType
+
+NOW = datetime.utcnow()
+
+
+def _days_ago(days: float) -> datetime:
+    return NOW - timedelta(days=days + 0.5)
+
+
+# name: (signup days ago, is_active, churned days ago or None, expected lifetime months)
+CASES = {
+    "new": (3, True, None, 1),
+    "under-60-days": (45, True, None, 1),
+    "day-59": (59, True, None, 1),
+    "day-60": (60, True, None, 2),
+    "day-89": (89, True, None, 2),
+    "day-90": (90, True, None, 3),
+    "long-lived": (400, True, None, 13),
+    "churned": (400, False, 100, 10),
+    "churned-quickly": (400, False, 380, 1),
+    "churned-at-month-boundary": (200, False, 110, 3),
+    "inactive-without-churned-date": (400, False, None, 13),
+    "reactivated": (400, True, 100, 13),
+    "future-signup": (-10, True, None, 1),
+}
+
+
+@pytest.fixture(scope="module")
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        for name, (signup, is_active, churned, _) in CASES.items():
+            session.add(Customer(
+                company_name=name, plan=PlanType.GROWTH, mrr=99.9, is_active=is_active,
+                signup_date=_days_ago(signup), churned_date=_days_ago(churned) if churned is not None else None
+            ))
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+def test_python_and_sql_agree(db):
+    rows = db.execute(select(Customer, Customer.lifetime_months, Customer.lifetime_value)).all()
+    assert len(rows) == len(CASES)
+    for customer, sql_months, sql_ltv in rows:
+        expected = CASES[customer.company_name][3]
+        assert customer.lifetime_months == expected, customer.company_name
+        assert sql_months == expected, customer.company_name
+        assert sql_ltv == pytest.approx(customer.lifetime_value), customer.company_name
+        assert customer.is_churned == db.scalar(select(Customer.is_churned).where(Customer.id == customer.id))
+
+
+def test_sql_clock_keeps_fractions_of_a_second(db):
+    # Exactly 60 days old as of a moment ago; a whole-second SQL clock would still count 59 days
+    customer = Customer(company_name="just-60-days", plan=PlanType.STARTER, mrr=1.0, signup_date=datetime.utcnow() - timedelta(days=60))
+    db.add(customer)
+    db.commit()
+    try:
+        assert db.scalar(select(Customer.lifetime_months).where(Customer.id == customer.id)) == customer.lifetime_months == 2
+    finally:
+        db.delete(customer)
+        db.commit()
+
+
+def test_sql_filter_and_sort_match_python(db):
+    customers = db.scalars(select(Customer)).all()
+    threshold = 99.9 * 3
+
+    in_sql = set(db.scalars(select(Customer.company_name).where(Customer.lifetime_value >= threshold)))
+    assert in_sql == {c.company_name for c in customers if c.lifetime_value >= threshold}
+
+    by_sql = db.scalars(select(Customer.company_name).order_by(Customer.lifetime_value.desc(), Customer.id)).all()
+    by_python = [c.company_name for c in sorted(customers, key=lambda c: (-c.lifetime_value, c.id))]
+    assert by_sql == by_python
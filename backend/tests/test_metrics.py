@@ -0,0 +1,73 @@
+# Prometheus metrics
+#
+# Request metrics are labelled with the matched route template, never the
+# concrete path: customer ids, 404s and paths that match no route must not
+# add label values. Query metrics are labelled with a fixed set of statement
+# types.
+#
+# Run from backend/: pytest tests/test_metrics.py
+
+import re
+from types import SimpleNamespace
+import pytest
+from fastapi.testclient import TestClient
+from app.utils.metrics import _STATEMENT_TYPES, route_template, statement_type
+
+LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+@pytest.fixture
+def client(seeded_database):
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+def _label_values(client, metric: str, label: str) -> set[str]:
+    body = client.get("/metrics").text
+    values = set()
+    for line in body.splitlines():
+        if line.startswith(metric + "{"):
+            values.add(dict(LABEL.findall(line))[label])
+    return values
+
+
+def test_routes_are_labelled_by_template(client):
+    from app.main import app
+
+    for path in (
+        "/api/customers/1", "/api/customers/2", "/api/customers/987654321", "/api/customers/not-a-number",
+        "/api/customers?limit=3&plan=growth", "/api/no-such-route/123456", "/wp-admin/setup-config.php",
+    ):
+        client.get(path)
+
+    routes = _label_values(client, "http_requests_total", "route")
+    assert "/api/customers/{customer_id}" in routes
+    assert "/api/customers" in routes
+    assert "unmatched" in routes
+    # Every label is a declared route (/metrics is left out of the schema)
+    assert routes <= set(app.openapi()["paths"]) | {"/metrics", "unmatched"}
+    for concrete in ("987654321", "123456", "not-a-number", "wp-admin", "limit="):
+        assert not any(concrete in route for route in routes), concrete
+
+
+def test_route_template_recovers_the_mount_prefix():
+    scope = {
+        "route": SimpleNamespace(path="/customers/{customer_id:int}"),
+        "path_params": {"customer_id": 42},
+        "path": "/api/v2/customers/42",
+    }
+    assert route_template(scope) == "/api/v2/customers/{customer_id:int}"
+    assert route_template({"path": "/anything/42"}) == "unmatched"
+
+
+def test_statement_labels_are_bounded(client):
+    client.get("/api/customers", params={"limit": 5})
+    statements = _label_values(client, "db_queries_total", "statement")
+    assert "SELECT" in statements
+    assert statements <= _STATEMENT_TYPES | {"OTHER"}
+
+    assert statement_type("  select 1") == "SELECT"
+    assert statement_type("VACUUM customers") == "OTHER"
+    assert statement_type("") == "OTHER"
@@ -0,0 +1,156 @@
+# Customer list pagination
+#
+# Walking next_cursor visits every row exactly once, in the order offset
+# paging returns them, and ends with a null next_cursor. Count modes,
+# rejected cursors, and the skip/limit response shape clients relied on
+# before cursors existed.
+#
+# Run from backend/: pytest tests/test_pagination.py
+
+import base64
+import json
+from datetime import datetime
+import pytest
+from fastapi.testclient import TestClient
+from app.models.schemas import CustomerResponse
+from app.services.pagination import decode_cursor, encode_cursor
+
+PAGE = 37  # Doesn't divide the seeded row count, so the last page is short
+
+SEGMENTS = [
+    {},
+    {"plan": "growth"},
+    {"is_active": "true", "min_mrr": 100},
+    {"fields": "id,company_name"},
+]
+
+
+@pytest.fixture
+def client(seeded_database):
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+def _get(client, **params) -> dict:
+    response = client.get("/api/customers", params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _walk_cursor(client, segment: dict) -> list[int]:
+    ids, pages = [], 0
+    body = _get(client, **segment, limit=PAGE)
+    while True:
+        ids += [c["id"] for c in body["customers"]]
+        pages += 1
+        assert pages <= 100, "next_cursor never ran out"
+        if body["next_cursor"] is None:
+            return ids
+        assert len(body["customers"]) == PAGE
+        body = _get(client, **segment, limit=PAGE, cursor=body["next_cursor"], count="none")
+        assert body["page"] is None and body["total"] is None
+
+
+def _walk_offset(client, segment: dict) -> tuple[list[int], int]:
+    ids, skip = [], 0
+    while True:
+        body = _get(client, **segment, limit=PAGE, skip=skip)
+        ids += [c["id"] for c in body["customers"]]
+        skip += PAGE
+        if skip >= body["total"]:
+            assert body["next_cursor"] is None
+            return ids, body["total"]
+
+
+@pytest.mark.parametrize("segment", SEGMENTS)
+def test_cursor_walk_matches_offset_paging(client, segment):
+    cursor_ids = _walk_cursor(client, segment)
+    offset_ids, total = _walk_offset(client, segment)
+    assert total > PAGE
+    assert len(cursor_ids) == len(set(cursor_ids)) == total
+    assert cursor_ids == offset_ids
+
+
+def test_last_page(client):
+    total = _get(client, limit=1)["total"]
+    last = _get(client, limit=PAGE, skip=total - 5)
+    assert len(last["customers"]) == 5 and last["next_cursor"] is None
+
+    # A page that ends exactly on the last row
+    full = _get(client, limit=5, skip=total - 5)
+    assert full["next_cursor"] is None
+    # One row earlier there is still a next page, holding only the last row
+    before = _get(client, limit=5, skip=total - 6)
+    after = _get(client, limit=5, cursor=before["next_cursor"])
+    assert [c["id"] for c in after["customers"]] == [full["customers"][-1]["id"]]
+    assert after["next_cursor"] is None
+
+
+def test_count_modes(client):
+    exact = _get(client, limit=1, plan="growth")["total"]
+    assert isinstance(exact, int) and exact > 0
+    assert _get(client, limit=1, plan="growth", count="none")["total"] is None
+    estimate = _get(client, limit=1, plan="growth", count="estimate")["total"]
+    assert isinstance(estimate, int) and estimate == exact
+    # Filters the snapshot doesn't know fall back to an exact count
+    assert isinstance(_get(client, limit=1, industry="Retail", count="estimate")["total"], int)
+    assert client.get("/api/customers", params={"count": "approximate"}).status_code == 422
+
+
+def _encode(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def test_rejected_cursors(client):
+    valid = _get(client, limit=5)["next_cursor"]
+    assert decode_cursor(valid)[1] > 0
+    for cursor in (
+        "not-a-cursor",
+        "%%%",
+        valid[:-4],        # Truncated
+        "A" + valid[1:],   # Altered: no longer JSON
+        _encode({"d": "yesterday", "i": 1}),
+        _encode({"d": "2025-01-01T00:00:00"}),
+        _encode({"d": "2025-01-01T00:00:00", "i": "last"}),
+        _encode([1, 2]),
+    ):
+        response = client.get("/api/customers", params={"cursor": cursor})
+        assert response.status_code == 400, cursor
+        assert "cursor" in response.json()["detail"].lower()
+
+
+@pytest.mark.parametrize("sort", ["ltv", "mrr"])
+def test_cursor_requires_signup_date_order(client, sort):
+    cursor = _get(client, limit=5)["next_cursor"]
+    response = client.get("/api/customers", params={"cursor": cursor, "sort": sort})
+    assert response.status_code == 400
+    assert "sort=signup_date" in response.json()["detail"]
+    # Those orderings page by offset and never hand out a cursor
+    assert _get(client, limit=5, sort=sort)["next_cursor"] is None
+
+
+def test_offset_response_shape(client):
+    # What skip/limit callers got before cursors: exact total, a page number and full customer rows
+    body = _get(client, skip=20, limit=10, plan="growth", is_active="true")
+    assert set(body) == {"total", "customers", "page", "page_size", "next_cursor"}
+    assert isinstance(body["total"], int)
+    assert body["page"] == 3 and body["page_size"] == 10
+    assert len(body["customers"]) == 10
+    for customer in body["customers"]:
+        assert set(customer) == set(CustomerResponse.model_fields)
+        assert customer["plan"] == "growth" and customer["is_active"]
+    signups = [c["signup_date"] for c in body["customers"]]
+    assert signups == sorted(signups, reverse=True)
+
+    assert _get(client)["page_size"] == 100 and _get(client)["page"] == 1
+    assert client.get("/api/customers", params={"limit": 0}).status_code == 422
+    assert client.get("/api/customers", params={"skip": -1}).status_code == 422
+    assert client.get("/api/customers", params={"limit": 501}).status_code == 422
+
+
+def test_cursor_round_trip():
+    signup = datetime(2025, 3, 4, 5, 6, 7, 891011)
+    assert decode_cursor(encode_cursor(signup, 42)) == (signup, 42)
+    assert "=" not in encode_cursor(signup, 42)
@@ -0,0 +1,93 @@
+# List endpoint field projection
+#
+# ?fields= skips the ORM and CustomerResponse: Core rows are encoded straight
+# to JSON and lifetime_months / lifetime_value come from SQL. The result must
+# be indistinguishable from the full pydantic path - same keys, types, date
+# formats, enum values and nulls - with orjson and with the stdlib fallback.
+#
+# Run from backend/: pytest tests/test_projection.py
+
+import json
+import pytest
+from fastapi.testclient import TestClient
+from app.models.schemas import CustomerResponse
+from app.services import projection
+from app.services.cache import response_cache
+
+ALL_FIELDS = ",".join(CustomerResponse.model_fields)
+
+# The seeded customers signed up within the last two years; this selects only the ones added here
+BEFORE_SEED = {"signup_to": "2023-12-31"}
+
+
+@pytest.fixture
+def client(seeded_database):
+    from app.main import app
+
+    with TestClient(app) as client:
+        # Edge cases: all optional fields null, timestamps with and without microseconds, churned
+        rows = [
+            {"company_name": "Projection Nulls", "plan": "starter", "mrr": 0, "signup_date": "2023-05-06T07:08:09"},
+            {
+                "company_name": "Projection Full", "plan": "enterprise", "mrr": 1234.56, "industry": "Retail",
+                "employee_count": 250, "signup_date": "2023-05-06T07:08:09.123456",
+                "last_activity": "2024-02-29T23:59:59.000001"
+            },
+            {
+                "company_name": "Projection Churned", "plan": "growth", "mrr": 99.99,
+                "signup_date": "2022-01-31T00:00:00", "churned_date": "2023-03-01T12:00:00"
+            },
+        ]
+        client.post(
+            "/api/customers/bulk",
+            content="\n".join(json.dumps(row) for row in rows),
+            headers={"Content-Type": "application/x-ndjson"}
+        )
+        yield client
+        for customer in _listing(client, BEFORE_SEED)["customers"]:
+            client.delete(f"/api/customers/{customer['id']}")
+
+
+def _listing(client, params: dict) -> dict:
+    response = client.get("/api/customers", params={"limit": 500, "count": "none", **params})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _assert_same(projected: list[dict], full: list[dict], fields: list[str]):
+    assert len(projected) == len(full)
+    for row, expected in zip(projected, full):
+        assert list(row) == fields
+        for name in fields:
+            value, want = row[name], expected[name]
+            assert type(value) is type(want), (name, value, want)
+            if name == "lifetime_value":
+                # SQL and Python each read the clock; the month count is what must match
+                assert value == pytest.approx(want), name
+            else:
+                assert value == want, (name, expected["id"])
+
+
+@pytest.mark.parametrize("use_orjson", [True, False], ids=["orjson", "stdlib"])
+def test_projection_matches_full_response(client, monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(projection, "orjson", None)
+    response_cache.invalidate()
+
+    added = _listing(client, BEFORE_SEED)["customers"]
+    assert [c["company_name"] for c in added] == ["Projection Full", "Projection Nulls", "Projection Churned"]
+
+    for params in ({}, BEFORE_SEED):
+        full = _listing(client, params)["customers"]
+        _assert_same(_listing(client, {**params, "fields": ALL_FIELDS})["customers"], full, list(CustomerResponse.model_fields))
+
+        # Any subset and order of fields comes back in response order
+        subset = ["lifetime_months", "churned_date", "signup_date", "is_active", "mrr", "plan", "id", "id"]
+        in_order = [name for name in CustomerResponse.model_fields if name in subset]
+        _assert_same(_listing(client, {**params, "fields": ",".join(subset)})["customers"], full, in_order)
+
+
+def test_invalid_fields(client):
+    for fields in ("", "id,password", " , "):
+        response = client.get("/api/customers", params={"fields": fields})
+        assert response.status_code in (400, 422), fields
@@ -0,0 +1,157 @@
+# Per-route query budgets
+#
+# Runs every budgeted route against the seeded test database with the query
+# profiler on and the response cache off, and fails if a route executes more
+# SQL statements than its @query_budget allows. Also covers the profiler's
+# N+1 detection and slow-query capture.
+#
+# Run from backend/: pytest tests/test_query_budgets.py
+
+import logging
+import pytest
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from app.config import settings
+from app.database import SessionLocal
+from app.main import app
+from app.models.customer import Customer
+from app.services.cache import response_cache
+from app.utils.query_profiler import profile_queries, slow_queries, statement_shape
+
+# Routes whose cost grows with the request body rather than being bounded
+UNBUDGETED = {"/customers/bulk"}
+
+
+@pytest.fixture(scope="module")
+def client(seeded_database):
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def profiler(monkeypatch):
+    # Every request hits the database: cached responses would run zero queries
+    monkeypatch.setattr(settings, "query_profiler_enabled", True)
+    monkeypatch.setattr(response_cache, "ttl", 0)
+
+
+def _budget_exceeded(caplog) -> list[str]:
+    return [r.getMessage() for r in caplog.records if "Query budget exceeded" in r.getMessage()]
+
+
+def test_every_route_declares_a_budget(app_routes):
+    api = [(path, route) for path, route in app_routes if isinstance(route, APIRoute) and path.startswith("/api/")]
+    assert len(api) > 10
+    missing = [
+        path for path, route in api
+        if not path.startswith("/api/debug/")
+        and path.removeprefix("/api") not in UNBUDGETED
+        and getattr(route.endpoint, "query_budget", None) is None
+    ]
+    assert not missing, f"routes without @query_budget: {missing}"
+
+
+READ_CASES = [
+    "/api/customers",
+    "/api/customers?count=estimate&plan=growth&is_active=true",
+    "/api/customers?count=none&limit=10",
+    "/api/customers?sort=ltv&min_ltv=100&skip=20",
+    "/api/customers?fields=id,company_name,lifetime_value",
+    "/api/customers/1",
+    "/api/customers/999999",
+    "/api/customer/stats/summary",
+    "/api/customer/stats/ltv",
+    "/api/customer/stats/ltv?is_active=true",
+    "/api/customer/stats/summary/consistency",
+    "/api/charts/revenue-over-time",
+    "/api/charts/customer-churn?granularity=day",
+    "/api/charts/mrr-growth?granularity=week",
+    "/api/charts/customer-activity",
+    "/api/charts/cohort-retention",
+]
+
+
+@pytest.mark.parametrize("url", READ_CASES)
+def test_read_routes_within_budget(client, caplog, url):
+    response = client.get(url)
+    assert response.status_code in (200, 404), response.text
+    used, budget = map(int, response.headers["x-db-query-budget"].split("/"))
+    assert used == int(response.headers["x-db-queries"])
+    assert used <= budget, f"{url}: {used} queries, budget {budget}"
+    assert not _budget_exceeded(caplog)
+
+
+def test_cursor_page_within_budget(client):
+    first = client.get("/api/customers", params={"limit": 25, "count": "none"}).json()
+    response = client.get("/api/customers", params={"limit": 25, "cursor": first["next_cursor"]})
+    used, budget = map(int, response.headers["x-db-query-budget"].split("/"))
+    assert used <= budget
+
+
+def test_export_within_budget(client, caplog):
+    # Streamed: headers go out before the rows are read, so check the final count in the log
+    caplog.set_level(logging.WARNING, logger="app.utils.query_profiler")
+    response = client.get("/api/customers/export")
+    assert response.status_code == 200
+    assert not _budget_exceeded(caplog)
+
+
+def test_write_routes_within_budget(client, caplog):
+    caplog.set_level(logging.WARNING, logger="app.utils.query_profiler")
+    # Backdated, so every write also deletes the completed chart rollup days it changes
+    created = client.post("/api/customers", json={
+        "company_name": "Budget Test", "plan": "starter", "mrr": 50, "signup_date": "2024-01-15T09:00:00"
+    })
+    assert created.status_code == 201
+    customer_id = created.json()["id"]
+    responses = [
+        created,
+        client.patch(f"/api/customers/{customer_id}", json={"plan": "growth", "mrr": 150}),
+        client.patch(f"/api/customers/{customer_id}", json={"is_active": False}),
+        client.delete(f"/api/customers/{customer_id}"),
+        client.post("/api/charts/rollups/rebuild"),
+    ]
+    for response in responses:
+        assert response.status_code < 400, response.text
+        used, budget = map(int, response.headers["x-db-query-budget"].split("/"))
+        assert used <= budget, f"{response.request.method} {response.request.url}: {used} > {budget}"
+    assert not _budget_exceeded(caplog)
+
+
+def test_headers_absent_when_disabled(client, monkeypatch):
+    monkeypatch.setattr(settings, "query_profiler_enabled", False)
+    response = client.get("/api/customers/1")
+    assert "x-db-queries" not in response.headers
+    assert client.get("/api/debug/queries").status_code == 404
+
+
+def test_statement_shape_collapses_literals():
+    a = statement_shape("SELECT * FROM customers WHERE id IN (?, ?, ?) AND mrr > 10")
+    b = statement_shape("SELECT *\n  FROM customers WHERE id IN (?, ?) AND mrr > 250.5")
+    assert a == b == "SELECT * FROM customers WHERE id IN (?) AND mrr > ?"
+
+
+def test_n_plus_one_detected(client):
+    # One SELECT per customer is the classic N+1 shape
+    with profile_queries() as profile, SessionLocal() as db:
+        for customer_id in range(1, settings.query_profiler_n_plus_one_threshold + 2):
+            db.get(Customer, customer_id)
+        db.scalar(select(Customer.id).limit(1))
+    suspects = profile.n_plus_one()
+    assert profile.queries == settings.query_profiler_n_plus_one_threshold + 2
+    assert len(suspects) == 1
+    assert suspects[0]["count"] == settings.query_profiler_n_plus_one_threshold + 1
+    assert "WHERE customers.id = ?" in suspects[0]["shape"]
+
+
+def test_slow_queries_captured_with_plan(client, monkeypatch):
+    monkeypatch.setattr(settings, "query_profiler_slow_ms", 0)
+    slow_queries.clear()
+    client.get("/api/customers", params={"plan": "growth", "limit": 5})
+    report = client.get("/api/debug/queries", params={"clear": True}).json()
+    captured = [q for q in report["slow_queries"] if q["route"] == "/api/customers"]
+    assert captured, report
+    assert all(q["statement"].lstrip().upper().startswith("SELECT") for q in captured)
+    assert any("customers" in q["explain"] for q in captured)
+    assert client.get("/api/debug/queries").json()["slow_queries"] == []
@@ -0,0 +1,241 @@
+# Query-plan regression suite
+#
+# Seeds a throwaway SQLite database, runs EXPLAIN QUERY PLAN for every query
+# shape the routers issue and fails if one of them falls back to a full table
+# scan or sorts the customers table for ORDER BY. Index scans in index order
+# ("SCAN customers USING INDEX ...") are fine - LIMIT stops them early.
+#
+# Run from backend/: pytest tests/test_query_plans.py
+
+import re
+from datetime import date, datetime, timedelta
+from pathlib import Path
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect, or_, select, func, text
+from sqlalchemy.orm import Session
+from app.models.customer import Base, Customer, PlanType
+from app.models.rollup import DailyCustomerRollup
+from app.security.input_validator import CustomerFilterInput
+from app.services.analytics import Granularity, bucket_expr, daily_aggregate_query
+from app.services.cohorts import _grouped_query
+from app.services.columnar import COLUMNS
+from app.services.filters import compile_filters
+from app.services.pagination import SortField, count_query, page_query
+from app.services.projection import projection_query
+from app.services.search import search_rows_query
+from app.services.stats import aggregate_by_plan_query, ltv_by_plan_query
+from app.utils.data_generator import bulk_insert_shard, iter_shards
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+SEED_ROWS = 20_000
+NOW = datetime(2026, 6, 15, 12, 0)
+
+FULL_SCAN = re.compile(r"^SCAN (TABLE )?customers$")
+ORDER_BY_SORT = "USE TEMP B-TREE FOR ORDER BY"
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    # Seeded database with the model's indexes and planner statistics
+    path = tmp_path_factory.mktemp("plans") / "customers.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        for shard in iter_shards(SEED_ROWS, seed=7, now=NOW):
+            bulk_insert_shard(db, shard)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    yield engine
+    engine.dispose()
+
+
+def explain(engine, query) -> list[str]:
+    sql = query.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+    with engine.connect() as conn:
+        return [row[3] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+
+def assert_indexed(plan: list[str], allow_sort: bool = False):
+    scans = [step for step in plan if FULL_SCAN.match(step)]
+    assert not scans, f"full table scan: {plan}"
+    if not allow_sort:
+        assert ORDER_BY_SORT not in plan, f"temp sort for ORDER BY: {plan}"
+
+
+FILTER_CASES = [
+    (plan, is_active)
+    for plan in (None, PlanType.GROWTH)
+    for is_active in (None, True, False)
+]
+
+
+def customer_filters(plan, is_active, **filters) -> list:
+    return compile_filters(CustomerFilterInput(plan=[plan] if plan else None, is_active=is_active, **filters))
+
+
+def _case_id(case) -> str:
+    plan, is_active = case
+    return f"plan={plan.value if plan else '*'}-active={is_active}"
+
+
+@pytest.mark.parametrize("case", FILTER_CASES, ids=_case_id)
+def test_list_offset_page(engine, case):
+    filters = customer_filters(*case)
+    assert_indexed(explain(engine, page_query(select(Customer), filters, SortField.SIGNUP_DATE, skip=200, limit=101)))
+
+
+@pytest.mark.parametrize("case", FILTER_CASES, ids=_case_id)
+def test_list_cursor_page(engine, case):
+    filters = customer_filters(*case)
+    after = (NOW - timedelta(days=100), 5000)
+    assert_indexed(explain(engine, page_query(select(Customer), filters, SortField.SIGNUP_DATE, after=after, limit=101)))
+
+
+@pytest.mark.parametrize("case", FILTER_CASES, ids=_case_id)
+def test_list_projection_page(engine, case):
+    base = projection_query(["id", "company_name", "mrr", "lifetime_value"])
+    assert_indexed(explain(engine, page_query(base, customer_filters(*case), SortField.SIGNUP_DATE, limit=101)))
+
+
+@pytest.mark.parametrize("case", FILTER_CASES, ids=_case_id)
+def test_list_ltv_page(engine, case):
+    # LTV is time dependent and can't be indexed: the ranking sorts, but only
+    # over the covering index, and rows are fetched by primary key
+    plan = explain(engine, page_query(select(Customer), customer_filters(*case), SortField.LTV, limit=101))
+    assert_indexed(plan, allow_sort=True)
+    assert any("ix_customers_ltv_inputs" in step or "ix_customers_is_active_plan" in step for step in plan), plan
+
+
+@pytest.mark.parametrize("case", FILTER_CASES, ids=_case_id)
+def test_count(engine, case):
+    plan = explain(engine, count_query(customer_filters(*case)))
+    assert_indexed(plan)
+    assert all("COVERING INDEX" in step for step in plan), plan
+
+
+def test_count_with_ltv_filter(engine):
+    filters = customer_filters(PlanType.STARTER, True, min_ltv=1000, max_ltv=5000)
+    assert_indexed(explain(engine, count_query(filters)))
+
+
+FILTER_SPECS = {
+    "plans": {"plan": ["starter", "growth"]},
+    "plans-active": {"plan": ["starter", "enterprise"], "is_active": True},
+    "industries": {"industry": ["Technology", "Healthcare"]},
+    "signup-range": {"signup_from": date(2025, 1, 1), "signup_to": date(2025, 3, 31)},
+    "mrr-range": {"min_mrr": 500, "max_mrr": 2000},
+    "employees": {"employees": ["1-10", "11-50", "1001+"]},
+    "combined": {"plan": ["growth"], "is_active": True, "industry": ["Retail"], "signup_from": date(2025, 6, 1)},
+}
+
+
+@pytest.mark.parametrize("sort", [SortField.SIGNUP_DATE, SortField.MRR])
+@pytest.mark.parametrize("spec", FILTER_SPECS.values(), ids=FILTER_SPECS.keys())
+def test_compiled_filter_page(engine, spec, sort):
+    # Every filter combination reads an index; a sort is only acceptable over an
+    # index range search (a signup window sorted by MRR), never a whole-index scan
+    filters = compile_filters(CustomerFilterInput(**spec))
+    plan = explain(engine, page_query(select(Customer), filters, sort, skip=100, limit=101))
+    assert_indexed(plan, allow_sort=plan[0].startswith("SEARCH"))
+
+
+@pytest.mark.parametrize("spec", FILTER_SPECS.values(), ids=FILTER_SPECS.keys())
+def test_compiled_filter_count(engine, spec):
+    assert_indexed(explain(engine, count_query(compile_filters(CustomerFilterInput(**spec)))))
+
+
+def test_mrr_range_uses_mrr_index(engine):
+    plan = explain(engine, count_query(customer_filters(None, None, min_mrr=5000)))
+    assert any("ix_customers_mrr_id" in step for step in plan), plan
+
+
+def test_summary_aggregate(engine):
+    plan = explain(engine, aggregate_by_plan_query())
+    assert_indexed(plan)
+    assert plan == ["SCAN customers USING COVERING INDEX ix_customers_ltv_inputs"]
+
+
+@pytest.mark.parametrize("is_active", [None, True, False])
+def test_ltv_aggregate(engine, is_active):
+    plan = explain(engine, ltv_by_plan_query(is_active))
+    assert_indexed(plan)
+    assert all("COVERING INDEX ix_customers_ltv_inputs" in step for step in plan), plan
+
+
+def test_daily_rollup_aggregate(engine):
+    # GROUP BY on day expressions needs a temp b-tree; the scans must be index range searches
+    plan = explain(engine, daily_aggregate_query(NOW - timedelta(days=30), NOW, "sqlite"))
+    assert_indexed(plan)
+    for index in ("ix_customers_signup_date_id", "ix_customers_churned_date", "ix_customers_last_activity"):
+        assert any(index in step for step in plan), plan
+
+
+def test_columnar_refresh_watermark(engine):
+    plan = explain(engine, select(*COLUMNS).where(Customer.updated_at >= NOW))
+    assert any("ix_customers_updated_at" in step for step in plan), plan
+
+
+def test_search_index_loads(engine):
+    assert_indexed(explain(engine, select(Customer.company_name).distinct()))
+    assert_indexed(explain(engine, select(func.max(Customer.updated_at))))
+    plan = explain(engine, select(Customer.company_name).where(Customer.updated_at >= NOW))
+    assert any("ix_customers_updated_at" in step for step in plan), plan
+
+
+def test_search_rows(engine):
+    # Sorting the few rows of the matched names is fine; they must come from the name index
+    plan = explain(engine, search_rows_query(["Smith LLC", "Smith Ltd"], 10))
+    assert_indexed(plan, allow_sort=True)
+    assert any("ix_customers_company_name" in step for step in plan), plan
+
+
+def test_first_signup_lookup(engine):
+    assert explain(engine, select(func.min(Customer.signup_date))) == [
+        "SEARCH customers USING COVERING INDEX ix_customers_signup_date_id"
+    ]
+
+
+def test_cohort_queries(engine):
+    cutoff = datetime(NOW.year, NOW.month, 1)
+    assert_indexed(explain(engine, _grouped_query(Customer.signup_date < cutoff, churn_cutoff=cutoff)))
+    assert_indexed(explain(engine, _grouped_query(
+        or_(Customer.signup_date >= cutoff, Customer.churned_date >= cutoff),
+        churn_cutoff=None
+    )))
+
+
+@pytest.mark.parametrize("granularity", list(Granularity))
+def test_chart_rollup_buckets(engine, granularity):
+    day = DailyCustomerRollup.day
+    bucket = bucket_expr(day, granularity, "sqlite").label("bucket")
+    query = (
+        select(bucket, func.sum(DailyCustomerRollup.signups))
+        .where(day >= NOW.date() - timedelta(days=90), day <= NOW.date())
+        .group_by(bucket)
+        .order_by(bucket)
+    )
+    assert not any(FULL_SCAN.match(step) for step in explain(engine, query))
+
+
+def test_migration_matches_model(tmp_path):
+    # A database created before the indexes existed ends up with the model's index set
+    path = tmp_path / "legacy.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for index in inspect(conn).get_indexes("customers"):
+            if index["name"] not in ("ix_customers_id", "ix_customers_company_name"):
+                conn.execute(text(f"DROP INDEX {index['name']}"))
+        conn.execute(text("CREATE INDEX ix_customers_is_active ON customers (is_active)"))
+
+    config = Config(str(BACKEND_DIR / "alembic.ini"))
+    config.set_main_option("sqlalchemy.url", f"sqlite:///{path}")
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, "head")
+
+    expected = {index.name for index in Customer.__table__.indexes}
+    actual = {index["name"] for index in inspect(engine).get_indexes("customers")}
+    assert actual == expected
+    engine.dispose()
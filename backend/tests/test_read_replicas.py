@@ -0,0 +1,155 @@
+# Read replica routing
+#
+# Uses two local SQLite files: the seeded test database as the primary and a
+# copy of it as the replica. Customer 1 is renamed on the replica only, so
+# each response shows which database served it. A read whose replica fails
+# mid-request is answered from the primary.
+#
+# Run from backend/: pytest tests/test_read_replicas.py
+
+import shutil
+import sqlite3
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine
+from app import database, main
+from app.config import settings
+from app.database import READ_YOUR_WRITES_COOKIE, ReplicaSet, SessionLocal
+from app.models.rollup import DailyCustomerRollup
+from app.services.cache import response_cache
+
+REPLICA_MARK = "Replica "
+
+
+@pytest.fixture(scope="module")
+def replica_path(seeded_database, tmp_path_factory):
+    path = tmp_path_factory.mktemp("replica") / "replica.db"
+    # Online copy (includes pages still in the primary's WAL)
+    with sqlite3.connect(seeded_database) as source, sqlite3.connect(path) as replica:
+        source.backup(replica)
+        replica.execute("UPDATE customers SET company_name = ? || company_name WHERE id = 1", (REPLICA_MARK,))
+    return path
+
+
+def _use_replicas(monkeypatch, *urls) -> ReplicaSet:
+    replicas = ReplicaSet([create_async_engine(url) for url in urls])
+    monkeypatch.setattr(database, "replicas", replicas)
+    monkeypatch.setattr(main, "replicas", replicas)
+    monkeypatch.setattr(response_cache, "ttl", 0)
+    return replicas
+
+
+def _dispose(client, replicas: ReplicaSet):
+    # Pooled aiosqlite connections belong to the client's event loop
+    for replica in replicas.engines:
+        client.portal.call(replica.dispose)
+
+
+@pytest.fixture
+def client(replica_path, monkeypatch):
+    replicas = _use_replicas(monkeypatch, f"sqlite+aiosqlite:///{replica_path}")
+    with TestClient(main.app) as client:
+        yield client
+        _dispose(client, replicas)
+
+
+def _served_by_replica(client) -> bool:
+    return client.get("/api/customers/1").json()["company_name"].startswith(REPLICA_MARK)
+
+
+def test_reads_go_to_the_replica(client):
+    assert _served_by_replica(client)
+    listing = client.get("/api/customers", params={"limit": 500}).json()["customers"]
+    assert any(c["company_name"].startswith(REPLICA_MARK) for c in listing)
+
+
+def test_reads_follow_writes_to_the_primary(client, monkeypatch):
+    created = client.post("/api/customers", json={"company_name": "Sticky Reads", "plan": "starter", "mrr": 10})
+    assert created.status_code == 201
+    assert READ_YOUR_WRITES_COOKIE in created.cookies
+
+    # The new row only exists on the primary
+    assert client.get(f"/api/customers/{created.json()['id']}").status_code == 200
+    assert not _served_by_replica(client)
+
+    # Once the window has passed (cookie gone) reads return to the replica
+    client.cookies.clear()
+    assert _served_by_replica(client)
+    assert client.delete(f"/api/customers/{created.json()['id']}").status_code == 204
+
+
+def test_no_cookie_without_replicas(monkeypatch, seeded_database):
+    _use_replicas(monkeypatch)
+    with TestClient(main.app) as client:
+        created = client.post("/api/customers", json={"company_name": "No Replica", "plan": "starter", "mrr": 10})
+        assert READ_YOUR_WRITES_COOKIE not in created.cookies
+        client.delete(f"/api/customers/{created.json()['id']}")
+
+
+def test_unhealthy_replica_falls_back_to_primary(monkeypatch, replica_path, tmp_path):
+    replicas = _use_replicas(
+        monkeypatch,
+        f"sqlite+aiosqlite:///{tmp_path}/missing/replica.db",
+        f"sqlite+aiosqlite:///{replica_path}",
+    )
+    with TestClient(main.app) as client:
+        client.portal.call(replicas.check)
+        assert [r["healthy"] for r in replicas.state()] == [False, True]
+        assert all(_served_by_replica(client) for _ in range(4))
+
+        monkeypatch.setattr(replicas, "engines", replicas.engines[:1])
+        assert not _served_by_replica(client)
+        health = client.get("/health").json()
+        assert health["status"] == "degraded"
+        assert health["replicas"][0]["healthy"] is False
+        # Driver messages stay in the server log
+        assert health["replicas"][0]["error"] == "connection failed"
+        _dispose(client, replicas)
+
+
+def test_failed_connection_takes_replica_out(monkeypatch, tmp_path):
+    replicas = _use_replicas(monkeypatch, f"sqlite+aiosqlite:///{tmp_path}/missing/replica.db")
+    with TestClient(main.app, raise_server_exceptions=False) as client:
+        # The request that hits the dead replica is retried on the primary; the following ones start there
+        assert client.get("/api/customers/1").status_code == 200
+        assert replicas.choose() is None
+        assert client.get("/api/customers/1").status_code == 200
+
+
+def test_replica_broken_between_requests(monkeypatch, replica_path, tmp_path):
+    broken = tmp_path / "replica.db"
+    shutil.copy(replica_path, broken)
+    replicas = _use_replicas(monkeypatch, f"sqlite+aiosqlite:///{broken}")
+    with TestClient(main.app, raise_server_exceptions=False) as client:
+        assert _served_by_replica(client)
+
+        # Gone before the next request: its connection opens an empty database
+        _dispose(client, replicas)
+        broken.unlink()
+        response = client.get("/api/customers/1")
+        assert response.status_code == 200
+        assert not response.json()["company_name"].startswith(REPLICA_MARK)
+        assert replicas.state()[0]["healthy"] is False
+        assert client.get("/api/charts/revenue-over-time").status_code == 200
+        _dispose(client, replicas)
+
+
+def test_rollup_catch_up_writes_to_primary(client, replica_path):
+    # Missing days seen on the replica are aggregated and inserted on the primary
+    with SessionLocal() as db:
+        db.query(DailyCustomerRollup).delete()
+        db.commit()
+    with sqlite3.connect(replica_path) as conn:
+        conn.execute(f"DELETE FROM {DailyCustomerRollup.__tablename__}")
+    response = client.get("/api/charts/revenue-over-time")
+    assert response.status_code == 200
+    with SessionLocal() as db:
+        assert db.scalar(select(func.count()).select_from(DailyCustomerRollup)) > 0
+
+
+def test_stickiness_window_from_settings(client, monkeypatch):
+    monkeypatch.setattr(settings, "read_your_writes_seconds", 30)
+    created = client.post("/api/customers", json={"company_name": "Window", "plan": "starter", "mrr": 10})
+    assert created.headers["set-cookie"].split("Max-Age=")[1].startswith("30;")
+    client.delete(f"/api/customers/{created.json()['id']}")
@@ -0,0 +1,83 @@
+# Response cache and ETags
+#
+# The customer read endpoints against the seeded test database: ETag / 304
+# round trips, a write making the next read a 200 with the new body, the
+# generation bump making earlier entries unreachable, and clients inside
+# their read-your-writes window bypassing cached entries.
+#
+# Run from backend/: pytest tests/test_response_cache.py
+
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app.database import READ_YOUR_WRITES_COOKIE
+from app.services.cache import response_cache
+
+STALE = b'{"stale":true}'
+
+
+@pytest.fixture
+def client(seeded_database):
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+def test_etag_round_trip(client):
+    first = client.get("/api/customers/1")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    again = client.get("/api/customers/1", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+
+    assert client.get("/api/customers/1", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_write_makes_next_read_a_200(client):
+    created = client.post("/api/customers", json={"company_name": "Cache Co", "plan": "starter", "mrr": 10.0}).json()
+    url = f"/api/customers/{created['id']}"
+    etag = client.get(url).headers["etag"]
+
+    assert client.patch(url, json={"mrr": 20.0}).status_code == 200
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["mrr"] == 20.0
+    assert response.headers["etag"] != etag
+
+    assert client.delete(url).status_code == 204
+    assert client.get(url, headers={"If-None-Match": response.headers["etag"]}).status_code == 404
+
+
+def test_generation_bump_hides_cached_entries(client):
+    key = response_cache.key("customer", {"id": 1})
+    response_cache.put(key, STALE)
+    assert client.get("/api/customers/1").content == STALE
+
+    generation = response_cache.generation
+    response_cache.invalidate()
+    assert response_cache.generation == generation + 1
+    assert response_cache.key("customer", {"id": 1}) != key
+    assert client.get("/api/customers/1").json()["id"] == 1
+
+
+def test_read_your_writes_window_skips_cache_reads(client):
+    response_cache.invalidate()
+    response_cache.put(response_cache.key("customer", {"id": 1}), STALE)
+    assert client.get("/api/customers/1").content == STALE
+
+    # Entries cached before the client's write (e.g. by another worker) are not served to it
+    client.cookies.set(READ_YOUR_WRITES_COOKIE, f"{time.time() + 30:.3f}")
+    fresh = client.get("/api/customers/1")
+    assert fresh.json()["id"] == 1
+    assert client.get("/api/customers/1", headers={"If-None-Match": fresh.headers["etag"]}).status_code == 304
+
+    # Window over: cached entries are served again
+    client.cookies.set(READ_YOUR_WRITES_COOKIE, f"{time.time() - 1:.3f}")
+    response_cache.invalidate()
+    response_cache.put(response_cache.key("customer", {"id": 1}), STALE)
+    assert client.get("/api/customers/1").content == STALE
+    response_cache.invalidate()
@@ -0,0 +1,98 @@
+# Company name typeahead
+#
+# NameIndex matching and ranking on a handful of names, then the search
+# endpoint against the seeded test database: names written through the API
+# are searchable at once, names written behind the API's back after the
+# watermark refresh, and deleted customers never come back.
+#
+# Run from backend/: pytest tests/test_search.py
+
+from sqlalchemy import create_engine, text
+import pytest
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.services.search import NameIndex
+
+NAMES = [
+    "Smith-Jones and Partners",
+    "Smithers LLC",
+    "Jones, Smith and Lee",
+    "Smith LLC",
+    "Blacksmith Inc",
+]
+
+
+@pytest.fixture
+def index():
+    index = NameIndex()
+    assert index.extend(NAMES + ["Smith LLC"]) == len(NAMES)
+    return index
+
+
+def test_prefix_ranking(index):
+    # First-word matches before later-word matches, shorter names first; no infix matches
+    assert index.match("smith", 10) == [
+        "Smith LLC", "Smithers LLC", "Smith-Jones and Partners", "Jones, Smith and Lee"
+    ]
+    assert index.match("SMITH", 2) == ["Smith LLC", "Smithers LLC"]
+
+
+def test_every_word_must_match(index):
+    assert index.match("smith l", 10) == ["Smith LLC", "Smithers LLC", "Jones, Smith and Lee"]
+    assert index.match("jones smith", 10) == ["Jones, Smith and Lee", "Smith-Jones and Partners"]
+    assert index.match("smith zzz", 10) == []
+    assert index.match("  ,. ", 10) == []
+
+
+def test_names_added_later_are_found(index):
+    index.add("Smithfield Foods")
+    index.add("Zeta Smith")
+    assert index.match("smithf", 10) == ["Smithfield Foods"]
+    assert "Zeta Smith" in index.match("smi", 10)
+
+
+@pytest.fixture
+def client(seeded_database):
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+def _search(client, q, **params):
+    response = client.get("/api/customers/search", params={"q": q, **params})
+    assert response.status_code == 200, response.text
+    return response.json()["results"]
+
+
+def test_search_endpoint_follows_writes(client, seeded_database, monkeypatch):
+    results = _search(client, "a", limit=7)
+    assert 0 < len(results) <= 7
+
+    created = client.post("/api/customers", json={"company_name": "Quokka Analytics", "plan": "growth", "mrr": 250.0})
+    customer_id = created.json()["id"]
+    assert [r["id"] for r in _search(client, "quok")] == [customer_id]
+
+    client.patch(f"/api/customers/{customer_id}", json={"company_name": "Wombat Analytics"})
+    assert [r["company_name"] for r in _search(client, "wom an")] == ["Wombat Analytics"]
+    # The old name stays indexed until the next rebuild, but no customer matches it
+    assert _search(client, "quokka") == []
+
+    # Written by another process: found once the index is past its staleness bound
+    engine = create_engine(f"sqlite:///{seeded_database}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO customers (company_name, plan, mrr, is_active, signup_date, created_at, updated_at) "
+            "VALUES ('Xylophone Holdings', 'STARTER', 10, 1, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"
+        ))
+    engine.dispose()
+    monkeypatch.setattr(settings, "search_index_max_staleness_seconds", 0)
+    assert [r["company_name"] for r in _search(client, "xylo")] == ["Xylophone Holdings"]
+
+    assert client.delete(f"/api/customers/{customer_id}").status_code == 204
+    assert _search(client, "wombat") == []
+
+
+def test_search_validation(client):
+    assert client.get("/api/customers/search").status_code == 422
+    assert client.get("/api/customers/search", params={"q": "a", "limit": 500}).status_code == 422
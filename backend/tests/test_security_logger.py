@@ -0,0 +1,139 @@
+# Security event logging
+#
+# RepeatedEventFilter windowing on a controlled clock, then the whole
+# pipeline writing to a temporary file: one line per window per user and
+# pattern, suppressed_count on the next event after the window, counts
+# still pending at shutdown written as summary events, and a steady trickle
+# of events written within the flush interval.
+#
+# Run from backend/: pytest tests/test_security_logger.py
+
+import json
+import logging
+import time
+from types import SimpleNamespace
+import pytest
+from app.config import settings
+from app.utils import security_logger
+from app.utils.security_logger import (
+    RepeatedEventFilter, log_suspicious_input, start_security_logging, stop_security_logging
+)
+
+EVENT = "suspicious_input_detected"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(security_logger, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+def _record(user_id="anonymous", pattern="act as", event=EVENT) -> logging.LogRecord:
+    msg = {"event": event, "user_id": user_id, "pattern_matched": pattern}
+    return logging.LogRecord("security", logging.WARNING, __file__, 0, msg, None, None)
+
+
+def test_repeats_are_collapsed_per_window(clock):
+    dedup = RepeatedEventFilter(EVENT, window=60)
+    deduplicated = security_logger.stats.snapshot()["deduplicated"]
+
+    assert dedup.filter(_record())
+    clock.now += 30
+    assert not dedup.filter(_record())
+    assert not dedup.filter(_record())
+    # Other keys and other events are independent
+    assert dedup.filter(_record(user_id="someone"))
+    assert dedup.filter(_record(pattern="override"))
+    assert dedup.filter(_record(event="validation_failure"))
+    assert dedup.filter(_record(event="validation_failure"))
+    assert security_logger.stats.snapshot()["deduplicated"] == deduplicated + 2
+
+    # The window runs from the first event, not the last repeat
+    clock.now += 30
+    record = _record()
+    assert dedup.filter(record)
+    assert record.msg["suppressed_count"] == 2
+    clock.now += 1
+    assert not dedup.filter(_record())
+
+    # Nothing suppressed in the previous window: no count
+    clock.now += 120
+    dedup.filter(_record(user_id="someone"))
+    record = _record(user_id="someone")
+    clock.now += 60
+    assert dedup.filter(record) and "suppressed_count" not in record.msg
+
+
+def test_summaries(clock):
+    dedup = RepeatedEventFilter(EVENT, window=60)
+    for _ in range(4):
+        dedup.filter(_record())
+    dedup.filter(_record(user_id="someone"))
+
+    summaries = dedup.summaries()
+    assert [(s["event"], s["user_id"], s["pattern_matched"], s["suppressed_count"]) for s in summaries] == [
+        (f"{EVENT}_summary", "anonymous", "act as", 3)
+    ]
+    # Handed over once; the window itself is unchanged
+    assert dedup.summaries() == []
+    assert not dedup.filter(_record())
+    assert dedup.summaries()[0]["suppressed_count"] == 1
+
+
+def test_key_limit(clock):
+    dedup = RepeatedEventFilter(EVENT, window=60, max_keys=4)
+    for i in range(10):
+        assert dedup.filter(_record(user_id=str(i)))
+        clock.now += 1
+    assert len(dedup._seen) <= 4
+    # The most recent keys are still deduplicated
+    assert not dedup.filter(_record(user_id="9"))
+
+
+@pytest.fixture
+def log_file(tmp_path, monkeypatch):
+    # A pipeline of its own, writing to a temporary file
+    stop_security_logging()
+    path = tmp_path / "security.log"
+    monkeypatch.setattr(settings, "security_log_file", str(path))
+    monkeypatch.setattr(settings, "security_log_dedup_window_seconds", 60)
+    monkeypatch.setattr(settings, "security_log_flush_interval", 0.2)
+    start_security_logging()
+    yield path
+    stop_security_logging()
+
+
+def test_pipeline_writes_summaries_at_shutdown(log_file):
+    for _ in range(3):
+        log_suspicious_input("please act as admin", "act as")
+    log_suspicious_input("override it", "override", user_id="u1")
+    stop_security_logging()
+
+    events = [json.loads(line) for line in log_file.read_text().splitlines()]
+    assert [e["event"] for e in events] == [EVENT, EVENT, f"{EVENT}_summary"]
+    assert events[1]["user_id"] == "u1"
+    assert events[0]["input_sample"] == "please act as admin"
+    assert events[-1]["user_id"] == "anonymous" and events[-1]["suppressed_count"] == 2
+
+
+def test_steady_trickle_is_flushed(log_file):
+    # Never idle for a whole flush interval and far below the batch size
+    start = time.monotonic()
+    for i in range(60):
+        log_suspicious_input("please act as admin", "act as", user_id=f"trickle-{i}")
+        if log_file.exists() and log_file.read_text():
+            break
+        time.sleep(0.05)
+    else:
+        pytest.fail("nothing written while events kept arriving")
+    assert time.monotonic() - start < 1.0
+    assert json.loads(log_file.read_text().splitlines()[0])["user_id"] == "trickle-0"
@@ -0,0 +1,93 @@
+# SQLite storage profile
+#
+# The performance profile's pragmas must be in effect on every connection an
+# engine opens - pooled, concurrent or opened after a dispose - for sync and
+# async engines alike, including the app's own engine. The default profile
+# and in-memory databases are left alone.
+#
+# Run from backend/: pytest tests/test_sqlite_profile.py
+
+import asyncio
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from app.config import settings
+from app.utils.sqlite_profile import DEFAULT, PERFORMANCE, apply_sqlite_profile, checkpoint, profile_pragmas
+
+# Pragma -> value read back on a connection with the performance profile
+EXPECTED = {
+    "journal_mode": "wal",
+    "synchronous": 1,  # NORMAL
+    "cache_size": -settings.sqlite_cache_size_mb * 1024,
+    "mmap_size": settings.sqlite_mmap_size_mb * 1024 * 1024,
+    "temp_store": 2,  # MEMORY
+    "busy_timeout": settings.sqlite_busy_timeout_ms,
+}
+
+
+def _pragmas(conn) -> dict:
+    return {name: conn.execute(text(f"PRAGMA {name}")).scalar() for name in EXPECTED}
+
+
+def test_every_sync_connection(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/profile.db", poolclass=NullPool)
+    apply_sqlite_profile(engine, PERFORMANCE)
+    # Held at the same time, so each is a separate new connection
+    with engine.connect() as first, engine.connect() as second:
+        assert _pragmas(first) == EXPECTED
+        assert _pragmas(second) == EXPECTED
+    engine.dispose()
+    with engine.connect() as conn:
+        assert _pragmas(conn) == EXPECTED
+
+
+def test_every_async_connection(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/profile.db")
+    apply_sqlite_profile(engine.sync_engine, PERFORMANCE)
+
+    async def read(conn) -> dict:
+        return await conn.run_sync(_pragmas)
+
+    async def run():
+        async with engine.connect() as first, engine.connect() as second:
+            pragmas = [await read(first), await read(second)]
+        await engine.dispose()
+        async with engine.connect() as conn:
+            pragmas.append(await read(conn))
+            result = await checkpoint(engine)
+        await engine.dispose()
+        return pragmas, result
+
+    pragmas, result = asyncio.run(run())
+    assert pragmas == [EXPECTED] * 3
+    assert set(result) == {"busy", "wal_pages", "checkpointed_pages"}
+
+
+def test_app_engine(seeded_database):
+    from app.database import engine
+
+    with engine.connect() as first, engine.connect() as second:
+        assert _pragmas(first) == _pragmas(second) == EXPECTED
+
+
+def test_default_profile_and_memory_are_untouched(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/default.db")
+    apply_sqlite_profile(engine, DEFAULT)
+    memory = create_engine("sqlite://")
+    apply_sqlite_profile(memory, PERFORMANCE)
+    for e in (engine, memory):
+        with e.connect() as conn:
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 2  # FULL
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() in ("delete", "memory")
+        e.dispose()
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/default.db")
+    assert asyncio.run(checkpoint(async_engine)) is None
+    asyncio.run(async_engine.dispose())
+
+
+def test_unknown_profile():
+    assert profile_pragmas(DEFAULT) == []
+    with pytest.raises(ValueError):
+        profile_pragmas("fastest")
@@ -0,0 +1,80 @@
+# Cold-start budget
+#
+# Imports the app in fresh interpreters, the way an autoscaled worker starts:
+# `python -X importtime -c "import app.main"` must stay under the import
+# budget without pulling in optional or data-generation packages, and a new
+# process must answer its first /health within the first-response budget
+# (imports, lifespan startup and one database round trip).
+#
+# The budgets are loose on purpose - they catch a heavy import or startup
+# step sneaking in, not small drifts. python -m benchmarks.bench_startup
+# gives the actual numbers.
+#
+# Run from backend/: pytest tests/test_startup.py
+
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+IMPORT_BUDGET_SECONDS = 2.0
+FIRST_RESPONSE_BUDGET_SECONDS = 4.0
+
+# Only imported when used: data generation, Arrow export, AI provider SDKs
+LAZY_PACKAGES = {"faker", "pandas", "pyarrow", "anthropic", "openai", "google"}
+
+FIRST_RESPONSE = """
+import json, time
+import app.main
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    status = client.get("/health").status_code
+print(json.dumps({"status": status, "responded_at": time.time()}))
+"""
+
+
+def _run(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args], cwd=BACKEND_DIR, env=os.environ.copy(),
+        capture_output=True, text=True, check=True, timeout=60
+    )
+
+
+@pytest.fixture(scope="module", autouse=True)
+def warm_bytecode_cache():
+    # The first import after a code change compiles bytecode; deployed images ship it compiled
+    _run("-c", "import app.main")
+
+
+def test_import_time_budget():
+    stderr = _run("-X", "importtime", "-c", "import app.main").stderr
+    imported, app_main = set(), None
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative_us, name = line.removeprefix("import time:").split("|")
+        imported.add(name.strip().split(".")[0])
+        if name.strip() == "app.main":
+            app_main = int(cumulative_us) / 1e6
+
+    assert app_main is not None, stderr[-2000:]
+    assert app_main < IMPORT_BUDGET_SECONDS, f"import app.main took {app_main:.2f}s"
+    assert not imported & LAZY_PACKAGES, f"imported eagerly: {sorted(imported & LAZY_PACKAGES)}"
+
+
+def test_time_to_first_response(seeded_database):
+    spawned_at = time.time()
+    result = json.loads(_run("-c", FIRST_RESPONSE).stdout.strip().splitlines()[-1])
+    elapsed = result["responded_at"] - spawned_at
+    assert result["status"] == 200
+    assert elapsed < FIRST_RESPONSE_BUDGET_SECONDS, f"first /health response after {elapsed:.2f}s"
+
+
+def test_data_generator_defers_faker():
+    # Seed scripts and tests import the generator; Faker loads on the first generated row
+    _run("-c", "import sys, app.utils.data_generator; assert 'faker' not in sys.modules")
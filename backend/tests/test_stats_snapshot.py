@@ -0,0 +1,127 @@
+# Summary statistics snapshot
+#
+# Deltas from single writes and churn runs, recomputes that race a write
+# (never replacing the snapshot), and /summary/consistency staying consistent
+# through creates, updates, bulk imports and deletes against the seeded
+# test database.
+#
+# Run from backend/: pytest tests/test_stats_snapshot.py
+
+import json
+import pytest
+from fastapi.testclient import TestClient
+from app.models.customer import PlanType
+from app.services.stats import StatsSnapshot, build_summary
+
+
+def _per_plan(**overrides) -> dict:
+    per_plan = {plan: {"total": 0, "active": 0, "mrr": 0.0} for plan in PlanType}
+    per_plan.update({PlanType(plan): values for plan, values in overrides.items()})
+    return per_plan
+
+
+@pytest.fixture
+def snapshot() -> StatsSnapshot:
+    snapshot = StatsSnapshot(ttl=60)
+    snapshot.load(_per_plan(starter={"total": 3, "active": 2, "mrr": 100.0}), snapshot.version)
+    return snapshot
+
+
+def test_deltas(snapshot):
+    snapshot.record_change(None, (PlanType.GROWTH, True, 250.0))
+    snapshot.record_change((PlanType.STARTER, True, 50.0), (PlanType.STARTER, False, 50.0))
+    snapshot.record_change((PlanType.STARTER, False, 50.0), None)
+    snapshot.record_churn({PlanType.GROWTH: (1, 250.0)})
+
+    per_plan = snapshot.per_plan()
+    assert per_plan[PlanType.STARTER] == {"total": 2, "active": 1, "mrr": 50.0}
+    assert per_plan[PlanType.GROWTH] == {"total": 1, "active": 0, "mrr": 0.0}
+    assert snapshot.summary() == build_summary(per_plan)
+    assert snapshot.is_fresh()
+
+
+def test_recompute_racing_a_write_is_not_installed(snapshot):
+    racing = _per_plan(starter={"total": 4, "active": 3, "mrr": 110.0})
+    expected = _per_plan(starter={"total": 4, "active": 3, "mrr": 110.0})
+
+    # Recompute started after the commit but before the delta was recorded:
+    # it already counts the write, and the delta is still to come
+    with snapshot.writing():
+        snapshot.load(racing, snapshot.version)
+        snapshot.record_change(None, (PlanType.STARTER, True, 10.0))
+    assert snapshot.per_plan() == expected
+    assert snapshot.is_fresh()
+
+    # Recompute started before the write, installed after it finished
+    version = snapshot.version
+    with snapshot.writing():
+        snapshot.record_change(None, (PlanType.GROWTH, False, 10.0))
+    expected[PlanType.GROWTH]["total"] = 1
+    snapshot.load(_per_plan(), version)
+    assert snapshot.per_plan() == expected
+
+    # No write overlapping the recompute
+    snapshot.load(_per_plan(), snapshot.version)
+    assert snapshot.per_plan() == _per_plan()
+
+
+def test_first_recompute_racing_a_write_is_not_fresh():
+    snapshot = StatsSnapshot(ttl=60)
+    version = snapshot.version
+    with snapshot.writing():
+        snapshot.load(_per_plan(), version)
+    assert snapshot.per_plan() == _per_plan()
+    assert not snapshot.is_fresh()
+
+
+def test_failed_write_releases_the_marker(snapshot):
+    with pytest.raises(RuntimeError):
+        with snapshot.writing():
+            raise RuntimeError("commit failed")
+    snapshot.load(_per_plan(), snapshot.version)
+    assert snapshot.is_fresh()
+
+
+@pytest.fixture
+def client(seeded_database):
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+def _assert_consistent(client):
+    response = client.get("/api/customer/stats/summary/consistency")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["consistent"], body["differences"]
+
+
+def test_snapshot_stays_consistent_through_writes(client):
+    # Load the snapshot so the writes below are applied as deltas
+    assert client.get("/api/customer/stats/summary", params={"fresh": "true"}).status_code == 200
+
+    created = client.post("/api/customers", json={"company_name": "Snapshot Co", "plan": "growth", "mrr": 420.0})
+    assert created.status_code == 201
+    customer_id = created.json()["id"]
+    _assert_consistent(client)
+
+    assert client.patch(f"/api/customers/{customer_id}", json={"plan": "enterprise", "mrr": 1800.0}).status_code == 200
+    _assert_consistent(client)
+    assert client.patch(f"/api/customers/{customer_id}", json={"is_active": False}).status_code == 200
+    _assert_consistent(client)
+
+    rows = [{"company_name": f"Snapshot Bulk {i}", "plan": "starter", "mrr": 30.0 + i} for i in range(4)]
+    ingested = client.post(
+        "/api/customers/bulk",
+        content="\n".join(json.dumps(row) for row in rows),
+        headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert ingested.json()["inserted"] == 4
+    _assert_consistent(client)
+
+    listing = client.get("/api/customers", params={"limit": 500, "fields": "id,company_name"}).json()["customers"]
+    for customer in listing:
+        if customer["company_name"].startswith("Snapshot "):
+            assert client.delete(f"/api/customers/{customer['id']}").status_code == 204
+    _assert_consistent(client)